@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Measure the memory x-python uses for each frame and each live generator.
+
+Frames are made for a small function, chained through f_back as in a
+deep recursion, and kept alive along with the generators. The bytes
+allocated are measured with tracemalloc and divided by the number of
+objects made.
+
+Usage: frame-memory.py [--count N]
+"""
+import sys
+import tracemalloc
+
+from xpython.pyobj import Generator
+from xpython.vm import PyVM
+
+
+def function(n, m=1):
+    total = n + m
+    return total
+
+
+def generator(n):
+    yield n
+
+
+def bytes_per_object(make, count: int) -> float:
+    """Return the average number of bytes allocated by each of `count`
+    calls to `make`, with everything made kept alive."""
+    make()  # Warm up caches, such as the decoded code.
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(count):
+        kept.append(make())
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def main(args):
+    count = 10000
+    if "--count" in args:
+        count = int(args[args.index("--count") + 1])
+
+    vm = PyVM()
+    f_globals = {"__builtins__": __builtins__, "__name__": "__main__"}
+
+    def make_frame():
+        frame = vm.make_frame(function.__code__, {"n": 1}, f_globals)
+        vm.frame = frame
+        return frame
+
+    def make_generator():
+        frame = vm.make_frame(generator.__code__, {"n": 1}, f_globals)
+        return Generator(frame, "generator", "generator", vm)
+
+    print("bytes per frame:     %8.1f" % bytes_per_object(make_frame, count))
+    vm.frame = None
+    print("bytes per generator: %8.1f" % bytes_per_object(make_generator, count))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
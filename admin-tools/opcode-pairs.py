@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Count adjacent pairs of opcodes in bytecode files.
+
+This is what was used to pick the superinstructions in
+xpython.decode.SUPERINSTRUCTIONS. By default pairs are counted as they
+appear in the code; with --run the files are run under x-python and the
+pairs of instructions executed are counted instead.
+
+Usage: opcode-pairs.py [--run] [--top N] PYC-FILE...
+"""
+import contextlib
+import io
+import sys
+from collections import Counter
+
+from xdis import iscode, load_module
+from xdis.bytecode import get_instructions_bytes
+from xdis.op_imports import get_opcode_module
+
+
+def static_pairs(code, opc, pairs: Counter):
+    prev = None
+    for inst in get_instructions_bytes(code, opc):
+        if inst.opname in ("CACHE", "EXTENDED_ARG"):
+            continue
+        # A jump target can be reached from elsewhere, so the pair
+        # it ends is not always run together.
+        if prev is not None and not inst.is_jump_target:
+            pairs[prev, inst.opname] += 1
+        prev = inst.opname
+    for const in code.co_consts:
+        if iscode(const):
+            static_pairs(const, opc, pairs)
+
+
+def run_pairs(code, version, impl, pairs: Counter):
+    from xpython.execfile import exec_code_object
+
+    last = {}
+
+    def callback(event, offset, opname, byte_code, line_number, int_arg, event_arg, vm):
+        if event in ("instruction", "line"):
+            frame = id(vm.frame)
+            prev = last.get(frame)
+            if prev is not None and offset != 0:
+                pairs[prev, opname] += 1
+            last[frame] = opname
+        return True
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            exec_code_object(
+                code,
+                {"__name__": "__main__", "__builtins__": __builtins__},
+                version,
+                impl,
+                callback=callback,
+            )
+        except Exception:
+            pass
+
+
+def main(args):
+    run = "--run" in args
+    if run:
+        args.remove("--run")
+    top = 40
+    if "--top" in args:
+        i = args.index("--top")
+        top = int(args[i + 1])
+        del args[i : i + 2]
+
+    pairs = Counter()
+    for path in args:
+        try:
+            version, _, _, code, impl, *_ = load_module(path)
+        except Exception as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+            continue
+        if run:
+            run_pairs(code, version, impl, pairs)
+        else:
+            static_pairs(code, get_opcode_module(version, impl), pairs)
+
+    for (first, second), count in pairs.most_common(top):
+        print(f"{count:10} {first} {second}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
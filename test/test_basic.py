@@ -1,5 +1,7 @@
 """Basic Python interpreter tests for x-python."""
 
+import textwrap
+
 try:
     import vmtest
 except ImportError:
@@ -7,6 +9,10 @@ except ImportError:
 
 from xdis.version_info import PYTHON3, PYTHON_VERSION_TRIPLE, version_tuple_to_str
 
+from xpython.builtins import SPECIAL_BUILTINS, register_special_builtin
+import xpython.vm
+from xpython.vm import PyVM
+
 PY2 = not PYTHON3
 
 
@@ -37,6 +43,717 @@ class TestBasic(vmtest.VmTestCase):
     def test_import(self):
         self.self_checking()
 
+    def test_extended_arg(self):
+        # With more than 256 names, some instructions need EXTENDED_ARG.
+        self.assert_ok(
+            "\n".join("x%d = %d" % (i, i) for i in range(300)) + "\nprint(x299 + x1)\n"
+        )
+
+    def test_operators(self):
+        self.assert_ok(
+            """\
+            x, y = 13, 5
+            print(x + y, x - y, x * y, x / y, x // y, x % y, x ** y)
+            print(x << y, x >> 1, x & y, x | y, x ^ y, -x, +x, ~x, not x)
+            z = 7
+            z += 3; z -= 1; z *= 4; z //= 3; z %= 5; z **= 3
+            z <<= 2; z >>= 1; z &= 0xff; z |= 0x100; z ^= 3; z /= 2
+            l = [1]
+            l += [2]
+            l *= 2
+            print(z, l, l[1], "%s-%d" % ("a", 1))
+            """
+        )
+
+    def test_operator_dispatch(self):
+        # Unary, in-place and slice instructions each get their own
+        # entry in the dispatch table; check each family on builtin and
+        # user-defined operands.
+        self.assert_ok(
+            """\
+            class V:
+                def __init__(self, x):
+                    self.x = x
+                def __neg__(self):
+                    return V(-self.x)
+                def __invert__(self):
+                    return "inverted"
+                def __iadd__(self, other):
+                    self.x += other
+                    return self
+                def __getitem__(self, key):
+                    return key
+            v = V(3)
+            w = v
+            v += 4
+            print(w is v, v.x, (-v).x, ~v, +2, -2.5, not v, ~7)
+            print(v[1:2], v[::2], v[:])
+            l = list(range(10))
+            print(l[2:5], l[:3], l[7:], l[::-3], l[1:8:2])
+            l[2:4] = "ab"
+            del l[::3]
+            l[:2] = []
+            l *= 2
+            l += (9,)
+            print(l)
+            s = "abcdef"
+            s += s[1:3]
+            s *= 2
+            n = 6
+            n //= 4; n **= 3; n ^= 5; n <<= 2; n %= 7
+            print(s, s[-4:-1], n)
+            """
+        )
+
+    def test_superinstructions(self):
+        # Common instruction pairs get run as one; make sure jumps
+        # and exceptions in the middle of a pair still work.
+        self.assert_ok(
+            """\
+            def f(n):
+                total = 0
+                i = 0
+                while i < n:
+                    if i == 3:
+                        i = i + 2
+                        continue
+                    total = total + i
+                    i = i + 1
+                return total
+            print(f(10), f(0))
+            x = 5
+            for y in [1, 2, 3]:
+                print(x == y, x, y)
+            try:
+                z = 1 < "a"
+            except TypeError:
+                print("caught")
+            """
+        )
+
+    def test_quickening(self):
+        # Instructions get specialized after running a few times; make
+        # sure they notice when what they were specialized for changes.
+        self.assert_ok(
+            """\
+            import math
+            def f(x, y, seq):
+                total = x
+                for item in seq:
+                    total = total + item
+                return len(seq), total * 2, total == y, math.pi > 3
+            for i in range(20):
+                print(f(i, 2, [1, 2, 3]))
+            print(f(1.5, 2.0, (0.5,)))
+            print(f("a", "abc", "bc"))
+            print(f([], 2, [[1], [2]]))
+            len = lambda seq: -1
+            print(f(1, 2, range(5)))
+            def g():
+                try:
+                    return math.pi
+                except AttributeError:
+                    return "caught"
+            for i in range(10):
+                g()
+            math = {"pi": 3}
+            print(g())
+            """
+        )
+
+    def test_global_names_cache(self):
+        # Quickened LOAD_GLOBAL and LOAD_NAME remember where a name was
+        # found; make sure adding and deleting names, in whatever way,
+        # is noticed.
+        self.assert_ok(
+            """\
+            import builtins
+            def f():
+                return len("ab"), x
+            def g():
+                try:
+                    return extra
+                except NameError:
+                    return "missing"
+            x = 1
+            for i in range(40):
+                print(f(), g(), x)
+                if i == 10:
+                    len = lambda s: -1
+                elif i == 15:
+                    del len
+                elif i == 20:
+                    builtins.extra = 2
+                elif i == 25:
+                    x = 3
+                elif i == 30:
+                    del builtins.extra
+            """
+        )
+        # Code which can get at the globals dictionary itself.
+        self.assert_ok(
+            """\
+            def f():
+                return len("ab")
+            names = globals()
+            for i in range(30):
+                print(f())
+                if i == 10:
+                    names["len"] = lambda s: -1
+                elif i == 20:
+                    del names["len"]
+            """
+        )
+
+    def test_attribute_cache(self):
+        # Quickened LOAD_ATTR, LOAD_METHOD and STORE_ATTR remember what
+        # they found in a class; make sure changing the class, or the
+        # instance, is noticed.
+        self.assert_ok(
+            """\
+            class Base:
+                kind = "base"
+                def __init__(self, x):
+                    self.x = x
+                def get(self):
+                    return self.x
+                @property
+                def double(self):
+                    return self.x * 2
+                @property
+                def bad(self):
+                    raise ValueError("bad")
+            class Sub(Base):
+                pass
+            class Slotted:
+                __slots__ = ("a",)
+            b, s, sl = Base(1), Sub(2), Slotted()
+            for i in range(40):
+                b.x = i
+                sl.a = i
+                bound = b.get
+                print(b.get(), s.get(), bound(), b.double, s.double, b.kind, sl.a)
+                try:
+                    b.bad
+                except ValueError:
+                    print("caught")
+                if i == 10:
+                    Base.get = lambda self: ("new", self.x)
+                elif i == 15:
+                    Sub.get = lambda self: "sub"
+                elif i == 20:
+                    b.get = lambda: "instance"
+                elif i == 25:
+                    del b.get
+                    del Sub.get
+                elif i == 28:
+                    Base.double = property(lambda self: "new double")
+                elif i == 30:
+                    Base.kind = "changed"
+                    s.__class__ = Base
+                elif i == 33:
+                    Base.x = property(lambda self: "class x", lambda self, v: None)
+            """
+        )
+        # Code which can change classes without STORE_ATTR.
+        self.assert_ok(
+            """\
+            class P:
+                def get(self):
+                    return 1
+            p = P()
+            for i in range(30):
+                print(p.get())
+                if i == 10:
+                    setattr(P, "get", lambda self: 2)
+            """
+        )
+        # Code which changes classes in ways the VM can't see.
+        self.assert_ok(
+            """\
+            import builtins
+            set_attribute = getattr(builtins, "set" + "attr")
+            class A:
+                def m(self):
+                    return "old"
+                @property
+                def p(self):
+                    return "old p"
+            class B:
+                def m(self):
+                    return "B"
+            class C(A):
+                pass
+            class D(A):
+                pass
+            a, c, d = A(), C(), D()
+            for i in range(30):
+                a.x = i
+                bound = a.m
+                print(a.m(), c.m(), d.m(), bound(), a.p, a.x)
+                if i == 10:
+                    set_attribute(C, "__bases__", (B,))
+                elif i == 12:
+                    set_attribute(D, "m", lambda self: "D")
+                elif i == 15:
+                    set_attribute(A, "m", lambda self: "new")
+                elif i == 20:
+                    set_attribute(A, "p", property(lambda self: "new p"))
+                elif i == 25:
+                    set_attribute(A, "x", property(lambda self: "x", lambda self, v: None))
+            """
+        )
+
+    def test_iteration(self):
+        # FOR_ITER and UNPACK_SEQUENCE get specialized to builtin
+        # containers, and FOR_ITER stores straight into the loop
+        # variables; make sure anything else still works.
+        self.assert_ok(
+            """\
+            def f(n):
+                t = 0
+                for i in range(n):
+                    t += i
+                for k, v in {i: i * i for i in range(n)}.items():
+                    t += k * v
+                for j, x in enumerate([5, 6, 7] * n):
+                    t += j * x
+                for a, b in [(1, 2), [3, 4], (5, 6)] * n:
+                    t += a - b
+                for p, q, r in [(1, 2, 3)] * n:
+                    t += p + q + r
+                for y, z in zip(range(n), range(n)):
+                    t += y * z
+                for c in "abc" * n:
+                    t += len(c)
+                try:
+                    for a, b in [(1, 2), (1, 2, 3)] * n:
+                        t += a
+                except ValueError as e:
+                    print("caught", e)
+                return t
+            for n in (0, 1, 5, 20):
+                print(f(n))
+            for i in range(20):
+                a, b = i, -i
+                x, y, z = [i, i + 1, i + 2]
+            print(a, b, x, y, z)
+            try:
+                x, y, z = [1, 2]
+            except ValueError as e:
+                print("caught", e)
+            """
+        )
+
+    def test_operator_specializations(self):
+        # Arithmetic and comparisons get specialized to operands of one
+        # exact type; make sure other operands still work once they
+        # have been.
+        self.assert_ok(
+            """\
+            def f(pairs):
+                for a, b in pairs:
+                    r = [a + b, a - b, a * b, a / b, a // b, a % b, a ** b]
+                    r += [a < b, a <= b, a == b, a != b, a > b, a >= b]
+                    r += [a is b, a is not b, a in [b], a not in (b,)]
+                    print(r)
+            def g(pairs):
+                for a, b in pairs:
+                    print([a & b, a | b, a ^ b, a << b, a >> b])
+            pairs = [(i, 3) for i in range(1, 12)] + [(i + 0.5, 2.5) for i in range(12)]
+            f(pairs + [(2, 3.5), (True, 2), (3, True), (2.5, 2), (7, 7)])
+            g([(i, i % 5) for i in range(12)] + [(True, 3), (5, False)])
+            s = ""
+            for c in "abcdefghijkl":
+                s += c
+                t = s
+                s = s + ""
+            print(s, t, s == t, s < "b", s in {"abc": 1}, "x" in s)
+            n = 1000
+            for i in range(12):
+                try:
+                    n = n % (9 - i) + n
+                except ZeroDivisionError as e:
+                    print("caught", e)
+            print(n, [1] + [2], (1,) * 3, {1} | {2}, "%d" % 5)
+            """
+        )
+
+    def test_compiled_functions(self):
+        # Hot functions get compiled to host Python functions, except
+        # for those which look at their locals.
+        self.assert_ok(
+            """\
+            def fib(n, *, start=1):
+                return start if n < 2 else fib(n - 1) + fib(n - 2)
+            def show(x, y=2):
+                return locals()["x"] + y
+            def fail(x):
+                return 1 // x
+            for i in range(5):
+                print(fib(i), fib(i, start=2), show(i), fail(1))
+            try:
+                fail(0)
+            except ZeroDivisionError:
+                print("caught")
+            """,
+            compile_threshold=3,
+        )
+        # Changing the defaults of a compiled function is noticed.
+        self.assert_ok(
+            """\
+            def f(x=1, *, y=1):
+                return x, y
+            for i in range(5):
+                print(f())
+            f.__defaults__ = (100,)
+            f.__kwdefaults__ = {"y": 99}
+            for i in range(5):
+                print(f(), f(2))
+            """,
+            compile_threshold=3,
+        )
+
+    def test_loop_traces(self):
+        # Loops that go around often get traced; make sure leaving the
+        # trace through branches, breaks, exceptions and returns works.
+        self.assert_ok(
+            """\
+            total = 0
+            for i in range(100):
+                if i % 7 == 0:
+                    continue
+                total += i if i % 2 else -i
+                for j in range(i % 3):
+                    total += j
+                if total > 2000:
+                    break
+            print(i, total)
+            def find(n):
+                i = 0
+                while True:
+                    if i * i > n:
+                        return i
+                    i += 1
+            print(find(900), find(0))
+            d = {}
+            for i in range(60):
+                try:
+                    d[i // 5] += 1
+                except KeyError:
+                    d[i // 5] = 0
+            print(d)
+            """
+        )
+
+    def test_fast_eval_loop(self):
+        self.assert_ok(
+            """\
+            def f(n):
+                return n * 2 if n % 3 else -n
+            total = 0
+            for i in range(40):
+                try:
+                    total += f(i) // (i % 7)
+                except ZeroDivisionError:
+                    total += 1
+            print(total, f(3))
+            """,
+            eval_loop="fast",
+        )
+
+    def test_traceback_line_numbers(self):
+        # An exception raised in nested calls gets the line number of
+        # the instruction running in the outermost frame, looked up in
+        # the LineTable of its code. The VM swallows the exception, so
+        # check its traceback against the one we get running natively.
+        code = compile(
+            textwrap.dedent(
+                """\
+                def inner(x):
+                    y = x - 15
+                    return 10 // y
+                def outer(x):
+                    return [x,
+                            inner(x)]
+                total = 0
+                for i in range(20):
+                    total += len(
+                        outer(
+                            i))
+                """
+            ),
+            "<%s>" % self.id(),
+            "exec",
+        )
+        try:
+            exec(code, {})
+        except ZeroDivisionError as exc:
+            line_number = exc.__traceback__.tb_next.tb_lineno
+        for eval_loop in ("reference", "fast"):
+            vm = PyVM(vmtest_testing=True, eval_loop=eval_loop)
+            vm.run_code(code)
+            tb = vm.last_traceback
+            self.assertEqual(tb.tb_lineno, line_number)
+            self.assertEqual(tb.line_number(), line_number)
+            self.assertEqual(tb.tb_frame.f_lineno, line_number)
+
+    def test_stack_depth(self):
+        # Deep expressions push and pop many values at once, and look
+        # well below the top of the stack. With XPYTHON_STACKCHECK set,
+        # the depth worked out for each code object is checked against
+        # co_stacksize, and any warning would show in the output.
+        stack_check = xpython.vm.XPYTHON_STACKCHECK
+        xpython.vm.XPYTHON_STACKCHECK = True
+        try:
+            self.assert_ok(
+                """\
+                def f(a, b, c, d, e, f, g, h):
+                    return a + (b * (c - (d + (e * (f - (g + h))))))
+                def g(n):
+                    d = {"k": [0, [1, 2]]}
+                    for i in range(n):
+                        d["k"][1][i % 2] = f(i, 2, 3, 4, 5, 6, 7, i)
+                        d[i] = [*d["k"], {i: (i, [i, {i, i + 1}])}, *range(i % 3)]
+                    return d, {k: [v for v in range(k)] for k in range(n) if k}
+                x = [1, [2, [3, {4: (5, {6: (7, [8, f(1, 2, 3, 4, 5, 6, 7, 8)])})}]]]
+                print(x, g(12), (1, (2, (3, (4, (5, (6,)))))))
+                """
+            )
+        finally:
+            xpython.vm.XPYTHON_STACKCHECK = stack_check
+
+    def test_nested_handlers(self):
+        # Each raise finds the innermost handler covering it.
+        self.assert_ok(
+            """\
+            caught = []
+            for i in range(6):
+                try:
+                    try:
+                        [][i]
+                    except IndexError:
+                        caught.append("inner")
+                    if i % 2:
+                        raise KeyError(i)
+                    caught.append(i)
+                except KeyError:
+                    caught.append("outer")
+            print(caught)
+            """
+        )
+
+    def test_raise_in_deep_frames(self):
+        self.assert_ok(
+            """            def f(n):
+                if n:
+                    return f(n - 1)
+                caught = 0
+                for i in range(50):
+                    try:
+                        {}[i]
+                    except KeyError:
+                        caught += 1
+                return caught
+            print(f(30))
+            """
+        )
+
+    def test_fast_locals(self):
+        self.assert_ok(
+            """\
+            def f(a, b=2, *args, **kwargs):
+                c = a + b
+                del a
+                try:
+                    print(a)
+                except UnboundLocalError:
+                    print("unbound")
+                names = [k for k in sorted(locals()) if not k.startswith("__")]
+                return c, args, kwargs, names
+            print(f(1), f(1, 3, 4, d=5))
+            def g(x):
+                def h():
+                    return x * 2
+                return h()
+            print(g(21))
+            """
+        )
+
+    def test_closure_cells(self):
+        # A function with cell variables, some of them arguments, as
+        # well as free variables.
+        self.assert_ok(
+            """\
+            def outer():
+                y = 1
+                def mid(a):
+                    z = 2
+                    def inner():
+                        nonlocal z
+                        z += 1
+                        return y, z, a
+                    return inner
+                return mid
+            f = outer()(3)
+            print(f(), f())
+            """
+        )
+
+    def test_reused_frames(self):
+        # Frames of returned calls are reused; nothing from an earlier
+        # call may leak into a later one.
+        self.assert_ok(
+            """\
+            def fact(n):
+                if n <= 1:
+                    return 1
+                return n * fact(n - 1)
+            def adder(n):
+                def add(x):
+                    return x + n
+                return add
+            def maybe(x):
+                if x:
+                    y = x
+                try:
+                    return y
+                except UnboundLocalError:
+                    return None
+            adders = [adder(i) for i in range(3)]
+            print([fact(i) for i in range(8)], [a(10) for a in adders])
+            print([maybe(x) for x in (1, 0, 2, 0)])
+            """
+        )
+
+    def test_argument_binding(self):
+        self.assert_ok(
+            """\
+            def f(a, b=2, *args, c=3, **kw):
+                return a, b, args, c, kw
+            print(f(1), f(1, 5, 6, 7), f(1, c=4), f(1, e=5))
+            f.__defaults__ = (9,)
+            print(f(1))
+            try:
+                f()
+            except TypeError as e:
+                print(e)
+            def g(a, b):
+                return a, b
+            try:
+                g(1, 2, 3)
+            except TypeError as e:
+                print(e)
+            try:
+                g(1, a=2)
+            except TypeError as e:
+                print(e)
+            """
+        )
+
+    def test_call_site_kinds(self):
+        # A call site that sees one kind of callable many times, then
+        # others.
+        self.assert_ok(
+            """\
+            class C:
+                def m(self, n, k=1):
+                    return n * k
+            def f(n, k=1):
+                return n + k
+            c = C()
+            out = []
+            calls = [f] * 20 + [c.m, out.append, len, str, f] * 4
+            for g in calls * 2:
+                out.append(g(3) if g is not len else g(out))
+            print(out, [c.m(i, k=2) for i in range(20)])
+            """
+        )
+
+    def test_method_calls(self):
+        # Method calls on instances of interpreted classes, including
+        # ones where the attribute found isn't the class's method.
+        self.assert_ok(
+            """\
+            class A:
+                def m(self, n, k=1):
+                    return n * k
+                @staticmethod
+                def s(n):
+                    return -n
+            class B(A):
+                __slots__ = ()
+                def __getattr__(self, name):
+                    return len
+            a, b = A(), B()
+            out = []
+            for i in range(20):
+                out.append((a.m(i), b.m(i, k=3), a.s(i), b.missing([i])))
+            a.m = lambda n: "shadowed"
+            print(out, a.m(1), b.m(2))
+            """
+        )
+
+    def test_deep_recursion(self):
+        # Interpreted calls don't use up the host stack, even when they
+        # are made from native code calling back into the interpreter.
+        self.assert_ok(
+            """\
+            def depth(n):
+                return 0 if n == 0 else 1 + depth(n - 1)
+            class K:
+                def __init__(self, v):
+                    self.v = v
+                def __lt__(self, other):
+                    return depth(self.v) < depth(other.v)
+            def key(x):
+                return -depth(x * 100)
+            print(depth(800), sorted([3, 1, 2], key=key), min(K(50), K(20)).v)
+            """,
+            switch_frames=True,
+        )
+        # Likewise for functions which may get compiled, until they are.
+        self.assert_ok(
+            """\
+            def depth(n):
+                return 0 if n == 0 else 1 + depth(n - 1)
+            print(depth(900))
+            """,
+            switch_frames=True,
+            compile_threshold=10000,
+        )
+
+    def test_special_builtins(self):
+        self.assert_ok(
+            """\
+            x = 10
+            def f(a):
+                b = a + 1
+                for fn in [abs] * 20 + [eval, abs]:
+                    r = fn("a + b") if fn is eval else fn(-a)
+                names = [k for k in sorted(locals()) if not k.startswith("__")]
+                return r, names, eval("a * b"), "x" in globals()
+            print([f(i) for i in range(3)])
+            exec("y = x + 1")
+            print(y)
+            """
+        )
+
+    def test_register_special_builtin(self):
+        calls = []
+
+        @register_special_builtin(abs)
+        def call_abs(byteop, pos_args, named_args):
+            calls.append(pos_args)
+            return abs(*pos_args, **named_args)
+
+        try:
+            self.assert_ok("print([abs(-i) for i in range(3)])")
+        finally:
+            del SPECIAL_BUILTINS[id(abs)]
+        # Once for each eval loop.
+        self.assertEqual(calls, [[0], [-1], [-2]] * 2)
+
     if PYTHON_VERSION_TRIPLE[:2] in ((3, 9), (3, 10)):
         print("Test not gone over yet for %s" % version_tuple_to_str())
     else:
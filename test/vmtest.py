@@ -84,8 +84,20 @@ class VmTestCase(unittest.TestCase):
         )
         self.assert_runs_ok(path, arg_type="bytecode-file")
 
-    def assert_ok(self, path_or_code, raises=None, arg_type="string"):
-        """Run `code` in our VM and in real Python: they behave the same."""
+    def assert_ok(self, path_or_code, raises=None, arg_type="string", **vm_options):
+        """Run `code` in our VM and in real Python: they behave the same.
+
+        `vm_options` are passed on to PyVM(). Unless they pick an eval
+        loop, the code is run with both the "reference" and the "fast"
+        loop, so that the optimizations the fast one has are checked
+        against the reference one.
+        """
+        if "eval_loop" not in vm_options:
+            for eval_loop in ("reference", "fast"):
+                self.assert_ok(
+                    path_or_code, raises, arg_type, eval_loop=eval_loop, **vm_options
+                )
+            return
 
         if arg_type == "bytecode-file":
             (
@@ -118,7 +130,7 @@ class VmTestCase(unittest.TestCase):
         vm_stdout = StringIO()
         if CAPTURE_STDOUT:  # pragma: no branch
             sys.stdout = vm_stdout
-        vm = PyVM(vmtest_testing=True)
+        vm = PyVM(vmtest_testing=True, **vm_options)
 
         vm_exc = None
         vm_value = 0
@@ -8,7 +8,7 @@ from xdis.version_info import IS_PYPY, version_tuple_to_str
 
 from xpython import execfile
 from xpython.version import __version__
-from xpython.vm import PyVMRuntimeError
+from xpython.vm import EVAL_LOOPS, PyVMRuntimeError
 
 
 def version_message() -> str:
@@ -35,9 +35,17 @@ def version_message() -> str:
 @click.option(
     "-c", "--command-to-run", help="program passed in as a string", required=False
 )
+@click.option(
+    "--eval-loop",
+    type=click.Choice(sorted(EVAL_LOOPS)),
+    default="reference",
+    help='eval loop to run with. "reference" runs instructions as they are; '
+    '"fast" specializes and combines them, and skips the logging that -v '
+    'turns on; "traced" runs under PyVMTraced.',
+)
 @click.argument("path", nargs=1, type=click.Path(readable=True), required=False)
 @click.argument("args", nargs=-1)
-def main(module, verbose, command_to_run, path, args) -> None:
+def main(module, verbose, command_to_run, eval_loop, path, args) -> None:
     """
     Runs Python programs or bytecode using a bytecode interpreter written in Python.
     """
@@ -65,7 +73,7 @@ def main(module, verbose, command_to_run, path, args) -> None:
         sys.exit(4)
 
     try:
-        run_fn(path, args)
+        run_fn(path, args, eval_loop=eval_loop)
     except PyVMRuntimeError:
         # Tracebacks and error messages should been previously printed
         sys.exit(10)
@@ -117,12 +117,7 @@ def builtin_super(self: Any, typ=None, obj=None):
     """
     super() but first argument is filled in via interpreter
     """
-    cells = self.cells
-    if hasattr(cells, "__class__"):
-        cell = cells["__class__"]
-    elif hasattr(cells, "__classcell__"):
-        cell = cells["__classcell__"]
-
+    cell = self.get_cell("__class__")
     start_class = cell.get()
     return WrappedSuperClass(start_class, typ, obj)
 
@@ -192,3 +187,37 @@ def calculate_metaclass(metaclass, bases):
         elif not issubclass(winner, t):
             raise TypeError("metaclass conflict", winner, t)
     return winner
+
+
+# Builtins which the interpreter can't just call, such as globals(),
+# which must see the interpreted frame rather than ours. This maps
+# id(builtin) to (builtin, handler); keeping `builtin` here keeps its
+# id from being reused. Calls look the callee up here with one dict
+# lookup, so ordinary builtins cost a single miss.
+SPECIAL_BUILTINS = {}
+
+
+def register_special_builtin(builtin, handler=None):
+    """Have calls to `builtin` run `handler(byteop, pos_args, named_args)`
+    instead, where `byteop` is the ByteOp object of the calling
+    interpreter. The handler's return value is the call's value.
+
+    Without `handler` this returns a decorator, so that embedders can
+    write:
+
+        @register_special_builtin(open)
+        def sandboxed_open(byteop, pos_args, named_args):
+            ...
+
+    A later registration for the same builtin replaces an earlier one.
+    """
+    if handler is None:
+        return lambda handler: register_special_builtin(builtin, handler)
+    SPECIAL_BUILTINS[id(builtin)] = (builtin, handler)
+    return handler
+
+
+def special_builtin_handler(func):
+    """Return the handler registered for `func`, or None."""
+    special = SPECIAL_BUILTINS.get(id(func))
+    return None if special is None else special[1]
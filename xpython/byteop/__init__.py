@@ -6,6 +6,32 @@
 from xdis.version_info import PythonImplementation
 
 
+def make_dispatch_table(vm, byteop) -> list:
+    """Return a list indexed by opcode number giving the bound method
+    that implements the opcode, or None if there is none.
+
+    Each unary, binary, in-place and slice operator opcode gets its own
+    handler; see the ByteOpBase *_handler() methods.
+    """
+    table = [None] * max(256, len(vm.opc.opname))
+    for opcode, opname in enumerate(vm.opc.opname):
+        if opname.startswith("UNARY_"):
+            handler = byteop.unary_handler(opname[len("UNARY_") :])
+        elif (
+            opname.startswith("BINARY_")
+            and opname not in ("BINARY_OP", "BINARY_SLICE")
+        ):
+            handler = byteop.binary_handler(opname[len("BINARY_") :])
+        elif opname.startswith("INPLACE_"):
+            handler = byteop.inplace_handler(opname[len("INPLACE_") :])
+        elif "SLICE+" in opname:
+            handler = byteop.slice_handler(opname)
+        else:
+            handler = getattr(byteop, opname, None)
+        table[opcode] = handler
+    return table
+
+
 def get_byteop(vm, python_version, python_implementation):
     """Get Python byteop for given integer Python version, e.g. 2.7,
     3.2, 3.5..., and the python_implementation. vm.VMError will be raised
@@ -138,4 +164,5 @@ def get_byteop(vm, python_version, python_implementation):
                 raise vm.PyVMError(f"Version {python_version} not supported")
             pass
         pass
+    byteop.dispatch_table = make_dispatch_table(vm, byteop)
     return byteop
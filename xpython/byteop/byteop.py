@@ -9,11 +9,17 @@ import logging
 import operator
 import sys
 import types
+from functools import partial
 from typing import Any, Callable
 
 from xdis.version_info import PYTHON_VERSION_TRIPLE, version_tuple_to_str
 
-from xpython.builtins import build_class, builtin_super
+from xpython.builtins import (
+    SPECIAL_BUILTINS,
+    build_class,
+    builtin_super,
+    register_special_builtin,
+)
 from xpython.pyobj import Function, copy_module
 from xpython.vm import PyVM
 
@@ -68,6 +74,35 @@ INPLACE_OPERATORS = frozenset(
 BINARY_OPERATORS["MATRIX_MULTIPLY"] = operator.matmul
 
 
+def inplace_divide(x, y):
+    # Overwritten __div__ is not picked up by x //= y
+    # which seems to puck up FLOOR_DIVIDE
+    # See Python 2.7 test_augassign.py
+    if hasattr(x, "__idiv__"):
+        return x.__idiv__(y)
+    x //= y
+    return x
+
+
+INPLACE_OPERATOR_FNS = {
+    "POWER": operator.ipow,
+    "MULTIPLY": operator.imul,
+    "DIVIDE": inplace_divide,
+    "FLOOR_DIVIDE": operator.ifloordiv,
+    "TRUE_DIVIDE": operator.itruediv,
+    "MODULO": operator.imod,
+    "ADD": operator.iadd,
+    "SUBTRACT": operator.isub,
+    "LSHIFT": operator.ilshift,
+    "RSHIFT": operator.irshift,
+    "AND": operator.iand,
+    "XOR": operator.ixor,
+    "OR": operator.ior,
+    # 3.5 on
+    "MATRIX_MULTIPLY": operator.imatmul,
+}
+
+
 def fmt_binary_op(vm: PyVM, arg=None, repr=repr):
     """returns a string of the repr() for each of the first two
     elements of evaluation stack
@@ -80,9 +115,6 @@ def fmt_binary_op(vm: PyVM, arg=None, repr=repr):
     return f" ({repr(vm.peek(2))}, {repr(vm.top)})"
 
 
-
-
-
 def fmt_ternary_op(vm: PyVM, arg=None, repr=repr):
     """returns string of the repr() for each of the first three
     elements of evaluation stack
@@ -104,6 +136,153 @@ def fmt_unary_op(vm: PyVM, arg=None, repr=repr):
         raise vm.PyVMError("Empty stack in unary op")
 
 
+def cross_version_warning(byteop, name: str) -> None:
+    """Warn, once per interpreter, that the native `name`() is run on
+    source text because we are interpreting another version's bytecode."""
+    attr = "cross_bytecode_%s_warning_shown" % name
+    if not getattr(byteop, attr):
+        log.warning(
+            "Running built-in `%s()`, because bytecode compile() is not available "
+            "and we are cross-version. "
+            "Interpreting version %s from version %s."
+            % (
+                name,
+                version_tuple_to_str(byteop.version_info, end=2),
+                version_tuple_to_str(PYTHON_VERSION_TRIPLE, end=2),
+            )
+        )
+        setattr(byteop, attr, True)
+
+
+# Handlers for the builtins in SPECIAL_BUILTINS. Each is called with the
+# ByteOp object and the call's arguments, and returns the call's value.
+
+
+@register_special_builtin(globals)
+def call_globals(byteop, pos_args, named_args):
+    # Use the frame's globals(), not the interpreter's
+    return byteop.vm.frame.f_globals
+
+
+@register_special_builtin(locals)
+def call_locals(byteop, pos_args, named_args):
+    # Use the frame's locals(), not the interpreter's
+    return byteop.vm.frame.f_locals
+
+
+@register_special_builtin(compile)
+def call_compile(byteop, pos_args, named_args):
+    # Set dont_inherit parameter.  FIXME: we should set
+    # other flags too based on the interpreted
+    # environment?
+    if len(pos_args) < 5 and "dont_inherit" not in named_args:
+        named_args["dont_inherit"] = True
+    return compile(*pos_args, **named_args)
+
+
+@register_special_builtin(exec)
+def call_exec(byteop, pos_args, named_args):
+    # In Python 3.0 or greater, "exec()" is a builtin.  In
+    # Python 2.7 it was an opcode EXEC_STMT and is not a
+    # built-in function.
+    vm = byteop.vm
+    if not 1 <= len(pos_args) <= 3:
+        raise vm.PyVMError(
+            "exec() builtin should have 1..3 positional arguments; got %d"
+            % (len(pos_args))
+        )
+
+    # Note that in contrast to `eval()` handled below, if
+    # the `locals` parameter is not provided, the
+    # `globals` parameter value (whether provided or
+    # default value) is used for the `locals`
+    # parameter. So we shouldn't use the frame's `locals`.
+    if len(pos_args) == 1:
+        pos_args.append(vm.frame.f_globals)
+
+    if byteop.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]:
+        # Use the compile() and interprete the bytecode using our own
+        # interpreter not CPython's.
+        source = pos_args[0]
+        if isinstance(source, (str, bytes)):
+            pos_args[0] = compile(source, "<string>", mode="exec", dont_inherit=True)
+        return vm.run_code(*pos_args, toplevel=False)
+
+    cross_version_warning(byteop, "exec")
+    # Host Python code can change globals without our seeing.
+    vm.names_version = None
+    return exec(*pos_args, **named_args)
+
+
+@register_special_builtin(eval)
+def call_eval(byteop, pos_args, named_args):
+    vm = byteop.vm
+    n = len(pos_args)
+    if not 1 <= n <= 3:
+        raise vm.PyVMError(
+            "eval() builtin should have 1..3 positional arguments; got %d" % n
+        )
+    # Use the frame's globals(), not the interpreter's
+    if n < 2:
+        pos_args.append(vm.frame.f_globals)
+    # Likewise for locals()
+    if n < 3:
+        pos_args.append(vm.frame.f_locals)
+
+    if byteop.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]:
+        # Use the compile() and interprete the bytecode using our own
+        # interpreter not CPython's.
+        source = pos_args[0]
+        if isinstance(source, str):
+            pos_args[0] = compile(source, "<string>", mode="eval", dont_inherit=True)
+        return vm.run_code(*pos_args, toplevel=False)
+
+    cross_version_warning(byteop, "eval")
+    # Host Python code can change globals without our seeing.
+    vm.names_version = None
+    return eval(*pos_args, **named_args)
+
+
+@register_special_builtin(__build_class__)
+def call_build_class(byteop, pos_args, named_args):
+    assert len(pos_args) > 0, (
+        "__build_class__() should have at least one argument, an "
+        "__init__() function."
+    )
+    init_fn = pos_args[0]
+    if (
+        isinstance(init_fn, Function)
+        or byteop.is_pypy
+        or byteop.version_info[:2] != PYTHON_VERSION_TRIPLE[:2]
+    ):
+        # 3.3+ __build_class__() works only on bytecode
+        # that matches the CPython interpreter, so use
+        # Darius' version instead.  Down the line we will
+        # try to do this universally, but it is tricky:
+        return build_class(byteop.vm.opc, *pos_args, **named_args)
+
+    # Use builtin __build_class__(). This is wrong though
+    # in that we won't trace into __init__().
+    return __build_class__(*pos_args, **named_args)
+
+
+@register_special_builtin(type)
+def call_type(byteop, pos_args, named_args):
+    if len(pos_args) == 3:
+        # Set __module__
+        assert not named_args
+        namespace = pos_args[2]
+        namespace["__module__"] = namespace.get(
+            "__name__", byteop.vm.frame.f_globals["__name__"]
+        )
+    return type(*pos_args, **named_args)
+
+
+@register_special_builtin(super)
+def call_super(byteop, pos_args, named_args):
+    return builtin_super(byteop.vm.frame, *pos_args, **named_args)
+
+
 class ByteOpBase(object):
     def __init__(self, vm):
         self.vm = vm
@@ -123,6 +302,11 @@ class ByteOpBase(object):
         for op in INPLACE_OPERATORS:
             self.stack_fmt["INPLACE_" + op] = fmt_binary_op
 
+        # For opcodes whose operand selects among several handlers, this maps
+        # the opcode to a list of those handlers indexed by the operand.
+        # The instruction decoder uses this to pick the handler up front.
+        self.operand_dispatch = {}
+
         # Set this lazily in "convert_method_native_func
         self.method_func_access = None
         self.cross_bytecode_eval_warning_shown = False
@@ -138,15 +322,91 @@ class ByteOpBase(object):
         if self.version_info[:2] >= (3, 11) and op not in BINARY_OPERATORS:
             if op.startswith("INPLACE_"):
                 return self.inplace_operator(op[len("INPLACE_") :])
-        x, y = self.vm.popn(2)
-        self.vm.push(BINARY_OPERATORS[op](x, y))
+        x, y = self.vm.pop2()
+        self.vm.push1(BINARY_OPERATORS[op](x, y))
+
+    # The *_handler() methods below return the functions that the
+    # dispatch table uses for operator opcodes. Each operator gets its own
+    # function, so no operator-name lookups are needed when it runs.
+
+    def binary_handler(self, op: str) -> Callable:
+        """Return a handler for BINARY_`op` which applies the
+        operator to TOS1 and TOS."""
+        if op not in BINARY_OPERATORS:
+            return partial(self.binary_operator, op)
+        return self.operator_handler(BINARY_OPERATORS[op])
+
+    def inplace_handler(self, op: str) -> Callable:
+        """Return a handler for INPLACE_`op` which applies the
+        in-place operator to TOS1 and TOS."""
+        if op not in INPLACE_OPERATOR_FNS:
+            return partial(self.inplace_operator, op)
+        return self.operator_handler(INPLACE_OPERATOR_FNS[op])
+
+    def operator_handler(self, fn: Callable) -> Callable:
+        """Return a handler which replaces TOS1 and TOS with fn(TOS1, TOS).
+
+        3.11+ BINARY_OP handlers are passed the instruction's operand, which
+        has already been used to pick the handler.
+        """
+        vm = self.vm
+
+        def handler(_=None):
+            stack = vm.frame.stack
+            y = stack.pop()
+            x = stack.pop()
+            stack.append(fn(x, y))
+
+        return handler
+
+    def slice_handler(self, opname: str) -> Callable:
+        """Return a handler for a Python 2 SLICE+n, STORE_SLICE+n or
+        DELETE_SLICE+n instruction."""
+        vm = self.vm
+        count = int(opname[-1])
+        kind = opname[: -len("+n")]
+
+        def handler():
+            stack = vm.frame.stack
+            start = 0
+            end = None  # we will take this to mean end
+            if count == 1:
+                start = stack.pop()
+            elif count == 2:
+                end = stack.pop()
+            elif count == 3:
+                end = stack.pop()
+                start = stack.pop()
+            obj = stack.pop()
+            if end is None:
+                end = len(obj)
+            if kind == "STORE_SLICE":
+                obj[start:end] = stack.pop()
+            elif kind == "DELETE_SLICE":
+                del obj[start:end]
+            else:
+                stack.append(obj[start:end])
+
+        return handler
+
+    def unary_handler(self, op: str) -> Callable:
+        """Return a handler for UNARY_`op` which applies the operator to TOS."""
+        if op not in UNARY_OPERATORS:
+            return partial(self.unaryOperator, op)
+        vm = self.vm
+        fn = UNARY_OPERATORS[op]
+
+        def handler():
+            stack = vm.frame.stack
+            stack.append(fn(stack.pop()))
+
+        return handler
 
     def build_container(self, count, container_fn):
         elts = self.vm.popn(count)
-        self.vm.push(container_fn(elts))
+        self.vm.push1(container_fn(elts))
 
     def call_function_with_args_resolved(self, func, pos_args, named_args):
-        frame = self.vm.frame
         if hasattr(func, "im_func"):
             # Methods get self as an implicit first parameter.
             if func.im_self is not None:
@@ -164,152 +424,21 @@ class ByteOpBase(object):
                 )
             func = func.im_func
 
-        # FIXME: put this in a separate routine.
-        if inspect.isbuiltin(func):
-            log.debug(f"handling built-in function {func.__name__}")
-            if func == globals:
-                # Use the frame's globals(), not the interpreter's
-                self.vm.push(frame.f_globals)
-                return
-            elif func == locals:
-                # Use the frame's locals(), not the interpreter's
-                self.vm.push(frame.f_locals)
-                return
-
-            if func == compile:
-                # Set dont_inherit parameter.  FIXME: we should set
-                # other flags too based on the interpreted
-                # environment?
-                if len(pos_args) < 5 and "dont_inherit" not in named_args:
-                    named_args["dont_inherit"] = True
-                    pass
-            # In Python 3.0 or greater, "exec()" is a builtin.  In
-            # Python 2.7 it was an opcode EXEC_STMT and is not a
-            # built-in function.
-            #
-            # FIXME: a better test would be nice. There can be
-            # other builtin "exec"s. Tk has a built-in "eval". See 3.6.10
-            # test_tcl.py.
-            # If we drop the requirement of supporting 2.7 we can do the simpler
-            # and more reliable:
-            #   func == exec
-            elif func.__name__ == "exec":
-                if not 1 <= len(pos_args) <= 3:
-                    raise self.vm.PyVMError(
-                        "exec() builtin should have 1..3 positional arguments; got %d"
-                        % (len(pos_args))
-                    )
-                n = len(pos_args)
-                assert 1 <= n <= 3
-
-                # Note that in contrast to `eval()` handled below, if
-                # the `locals` parameter is not provided, the
-                # `globals` parameter value (whether provided or
-                # default value) is used for the `locals`
-                # parameter. So we shouldn't use the frame's `locals`.
-                if len(pos_args) == 1:
-                    pos_args.append(self.vm.frame.f_globals)
-
-                if self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]:
-                    # Use the compile() and interprete the bytecode using our own
-                    # interpreter not CPython's.
-                    source = pos_args[0]
-                    if isinstance(source, str) or isinstance(source, bytes):
-                        try:
-                            pos_args[0] = compile(
-                                source, "<string>", mode="exec", dont_inherit=True
-                            )
-                        except (TypeError, SyntaxError, ValueError):
-                            raise
-                    self.vm.push(self.vm.run_code(*pos_args, toplevel=False))
-                    return
-                else:
-                    if not self.cross_bytecode_exec_warning_shown:
-                        log.warning(
-                            "Running built-in `exec()`, because bytecode compile() is not available "
-                            "and we are cross-version. "
-                            "Interpreting version %s from version %s."
-                            % (
-                                version_tuple_to_str(self.version_info, end=2),
-                                version_tuple_to_str(PYTHON_VERSION_TRIPLE, end=2),
-                            )
-                        )
-                        self.cross_bytecode_exec_warning_shown = True
-
-            elif func == eval:
-                if not 1 <= len(pos_args) <= 3:
-                    raise self.vm.PyVMError(
-                        "eval() builtin should have 1..3 positional arguments; got %d"
-                        % (len(pos_args))
-                    )
-                assert 1 <= len(pos_args) <= 3
-                # Use the frame's globals(), not the interpreter's
-                n = len(pos_args)
-                if n < 2:
-                    pos_args.append(self.vm.frame.f_globals)
-                # Likewise for locals()
-                if n < 3:
-                    pos_args.append(self.vm.frame.f_locals)
-                assert len(pos_args) == 3
-
-                if self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]:
-                    # Use the compile() and interprete the bytecode using our own
-                    # interpreter not CPython's.
-                    source = pos_args[0]
-                    if isinstance(source, str) or isinstance(source, unicode):
-                        try:
-                            pos_args[0] = compile(
-                                source, "<string>", mode="eval", dont_inherit=True
-                            )
-                        except (TypeError, SyntaxError, ValueError):
-                            raise
-                    self.vm.push(self.vm.run_code(*pos_args, toplevel=False))
-                    return
-                else:
-                    if not self.cross_bytecode_eval_warning_shown:
-                        log.warning(
-                            "Running built-in `eval()`, because bytecode compile() is not available "
-                            "and we are cross-version. "
-                            "Interpreting version %s from version %s."
-                            % (
-                                version_tuple_to_str(self.version_info, end=2),
-                                version_tuple_to_str(PYTHON_VERSION_TRIPLE, end=2),
-                            )
-                        )
-                        self.cross_bytecode_eval_warning_shown = True
-
-            elif func == __build_class__:
-                assert len(pos_args) > 0, (
-                    "__build_class__() should have at least one argument, an "
-                    "__init__() function."
-                )
-                init_fn = pos_args[0]
-                if (
-                    isinstance(init_fn, Function)
-                    or self.is_pypy
-                    or self.version_info[:2] != PYTHON_VERSION_TRIPLE[:2]
-                ):
-                    # 3.3+ __build_class__() works only on bytecode
-                    # that matches the CPython interpreter, so use
-                    # Darius' version instead.  Down the line we will
-                    # try to do this universally, but it is tricky:
-                    retval = build_class(self.vm.opc, *pos_args, **named_args)
-                    self.vm.push(retval)
-                    return
-                else:
-                    # Use builtin __build_class__(). However for that,
-                    # we need a native function.  This is wrong though
-                    # in that we won't trace into __init__().
-                    init_fn = pos_args[0]
-                    if isinstance(init_fn, Function) and init_fn in self.vm.fn2native:
-                        pos_args[0] = self.vm.fn2native[init_fn]
-        elif func is type and len(pos_args) == 3:
-            # Set __module__
-            assert not named_args
-            namespace = pos_args[2]
-            namespace["__module__"] = namespace.get(
-                "__name__", self.vm.frame.f_globals["__name__"]
-            )
+        if type(func) is Function:
+            return self.vm.call_interpreted(func, pos_args, named_args)
+        self.vm.push1(self.call_resolved(func, pos_args, named_args))
+
+    def call_resolved(self, func, pos_args, named_args):
+        """Return the result of calling `func`, which is not a method,
+        with `pos_args` and `named_args`.
+
+        Builtins registered in SPECIAL_BUILTINS, such as globals(), are
+        run by their handler. Native functions we have interpreted
+        versions of are swapped for those.
+        """
+        special = SPECIAL_BUILTINS.get(id(func))
+        if special is not None:
+            return special[1](self, pos_args, named_args)
 
         if (
             inspect.isfunction(func)
@@ -318,31 +447,22 @@ class ByteOpBase(object):
             # Try to convert to an interpreter function, so we can interpret it.
             if func in self.vm.fn2native:
                 func = self.vm.fn2native[func]
+            else:
+                log.debug(f"calling native function {func.__name__}")
 
-        if (
-            inspect.isfunction(func)
-            and self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]
-        ):
-            log.debug(f"calling native function {func.__name__}")
-        elif inspect.isclass(func):
-            if func.__name__ == "super":
-                pos_args = [self.vm.frame] + pos_args
-                func = builtin_super
-
-        retval = func(*pos_args, **named_args)
-        self.vm.push(retval)
+        return func(*pos_args, **named_args)
 
     def call_function(self, argc: int, var_args, keyword_args: dict) -> Any:
         named_args = {}
         len_kw, len_pos = divmod(argc, 256)
         for i in range(len_kw):
-            key, val = self.vm.popn(2)
+            key, val = self.vm.pop2()
             named_args[key] = val
         named_args.update(keyword_args)
         pos_args = self.vm.popn(len_pos)
         pos_args.extend(var_args)
 
-        func = self.vm.pop()
+        func = self.vm.pop1()
         return self.call_function_with_args_resolved(func, pos_args, named_args)
 
     def convert_native_to_Function(self, frame, func: Callable) -> Callable:
@@ -430,45 +550,10 @@ class ByteOpBase(object):
         return "exception"
 
     def inplace_operator(self, op):
-        x, y = self.vm.popn(2)
-        if op == "POWER":
-            x **= y
-        elif op == "MULTIPLY":
-            x *= y
-        elif op == "DIVIDE":
-            # Overwritten __div__ is not picked up by x //= y
-            # which seems to puck up FLOOR_DIVIDE
-            # See Python 2.7 test_augassign.py
-            if hasattr(x, "__idiv__"):
-                x = x.__idiv__(y)
-            else:
-                x //= y
-        elif op == "FLOOR_DIVIDE":
-            x //= y
-        elif op == "TRUE_DIVIDE":
-            x /= y
-        elif op == "MODULO":
-            x %= y
-        elif op == "ADD":
-            x += y
-        elif op == "SUBTRACT":
-            x -= y
-        elif op == "LSHIFT":
-            x <<= y
-        elif op == "RSHIFT":
-            x >>= y
-        elif op == "AND":
-            x &= y
-        elif op == "XOR":
-            x ^= y
-        elif op == "OR":
-            x |= y
-        # 3.5 on
-        elif op == "MATRIX_MULTIPLY":
-            operator.imatmul(x, y)
-        else:  # pragma: no cover
+        x, y = self.vm.pop2()
+        if op not in INPLACE_OPERATOR_FNS:  # pragma: no cover
             raise self.PyVMError(f"Unknown in-place operator: {op!r}")
-        self.vm.push(x)
+        self.vm.push1(INPLACE_OPERATOR_FNS[op](x, y))
 
     def lookup_name(self, name):
         """Returns the value in the current frame associated for name"""
@@ -539,5 +624,5 @@ class ByteOpBase(object):
         return sys_module
 
     def unaryOperator(self, op):
-        x = self.vm.pop()
-        self.vm.push(UNARY_OPERATORS[op](x))
+        x = self.vm.pop1()
+        self.vm.push1(UNARY_OPERATORS[op](x))
@@ -8,7 +8,8 @@ import logging
 import operator
 import sys
 from collections import namedtuple
-from copy import copy
+from itertools import islice
+from types import ModuleType
 from typing import Any, Optional
 
 from xpython.byteop.byteop import (
@@ -17,7 +18,8 @@ from xpython.byteop.byteop import (
     fmt_ternary_op,
     fmt_unary_op,
 )
-from xpython.pyobj import Cell, Function, Traceback
+from xpython.decode import cell_index
+from xpython.pyobj import UNBOUND, Cell, Function, Traceback
 from xpython.vm import PyVM
 from xpython.vmtrace import PyVMEVENT_RETURN, PyVMEVENT_YIELD
 
@@ -32,24 +34,14 @@ log = logging.getLogger(__name__)
 COMPREHENSION_FN_NAMES = frozenset(("<setcomp>", "<dictcomp>", "<genexpr>"))
 
 
-def get_cell_name(vm, i: int):
-    # From LOAD_CLOSURE:
-    # The name of the variable is co_cellvars[i] if i is less
-    # than the length of co_cellvars. Otherwise it is co_freevars[i -len(co_cellvars)]
-    f_code = vm.frame.f_code
-    if i < len(f_code.co_cellvars):
-        return f_code.co_cellvars[i]
-    else:
-        var_idx = i - len(f_code.co_cellvars)
-        return f_code.co_freevars[var_idx]
-
-
 def fmt_store_deref(vm, _, repr=repr):
     return f" ({vm.top})"
 
 
 def fmt_load_deref(vm, int_arg, repr=repr):
-    return f" ({vm.frame.cells[get_cell_name(vm, int_arg)].get()})"
+    frame = vm.frame
+    i = cell_index(vm.version, frame.f_code, frame.localsplusnames, int_arg)
+    return f" ({frame.cells[i].get()})"
 
 
 def fmt_call_function(vm, argc: int, repr=repr):
@@ -82,7 +74,8 @@ class Traceback24(Traceback):
     """
     Python 2.4ish traceback opject
     """
-    pass
+
+    __slots__ = ()
 
 
 
@@ -150,13 +143,11 @@ class ByteOp24(ByteOpBase):
 
     def traceback_from_frame(self):
         frame = self.vm.frame
-        tb = None
-
-        while frame:
-            next_tb = Traceback24(copy(frame))
-            tb = next_tb
+        if frame is None:
+            return None
+        while frame.f_back:
             frame = frame.f_back
-        return tb
+        return Traceback24(frame)
 
     def BRKPT(self) -> Optional[Any]:
         """Pseudo opcode: breakpoint. We added this. TODO: call callback, then run
@@ -218,17 +209,17 @@ class ByteOp24(ByteOpBase):
 
     def POP_TOP(self):
         """Removes the top-of-stack (TOS) item."""
-        self.vm.pop()
+        self.vm.pop1()
 
     def ROT_TWO(self):
         """Swaps the two top-most stack items."""
-        a, b = self.vm.popn(2)
+        a, b = self.vm.pop2()
         self.vm.push(b, a)
 
     def ROT_THREE(self):
         """Lifts second and third stack item one position up, moves
         top down to position three."""
-        a, b, c = self.vm.popn(3)
+        a, b, c = self.vm.pop3()
         self.vm.push(c, a, b)
 
     def ROT_FOUR(self):
@@ -239,13 +230,13 @@ class ByteOp24(ByteOpBase):
 
     def DUP_TOP(self):
         """Duplicates the reference on top of the stack."""
-        self.vm.push(self.vm.top)
+        self.vm.push1(self.vm.top)
 
     # Unary operators are handled elsewhere
 
     def GET_ITER(self):
         """Implements TOS = iter(TOS)."""
-        self.vm.push(iter(self.vm.pop()))
+        self.vm.push1(iter(self.vm.pop1()))
 
     # Binary operators are handled elsewhere
     # Inplace operators are handled elsewhere
@@ -253,34 +244,34 @@ class ByteOp24(ByteOpBase):
 
     def STORE_SUBSCR(self):
         """Implements TOS1[TOS] = TOS2."""
-        val, obj, subscr = self.vm.popn(3)
+        val, obj, subscr = self.vm.pop3()
         obj[subscr] = val
 
     def DELETE_SUBSCR(self):
         """Implements del TOS1[TOS]."""
-        obj, subscr = self.vm.popn(2)
+        obj, subscr = self.vm.pop2()
         del obj[subscr]
 
     # Printing
 
     # Only used in the interactive interpreter, not in modules.
     def PRINT_EXPR(self):
-        print(self.vm.pop())
+        print(self.vm.pop1())
 
     def PRINT_ITEM(self):
-        item = self.vm.pop()
+        item = self.vm.pop1()
         self.print_item(item)
 
     def PRINT_ITEM_TO(self):
-        to = self.vm.pop()
-        item = self.vm.pop()
+        to = self.vm.pop1()
+        item = self.vm.pop1()
         self.print_item(item, to)
 
     def PRINT_NEWLINE(self):
         self.print_newline()
 
     def PRINT_NEWLINE_TO(self):
-        to = self.vm.pop()
+        to = self.vm.pop1()
         self.print_newline(to)
 
     # End printing
@@ -309,8 +300,8 @@ class ByteOp24(ByteOpBase):
 
         Changed in 2.7.
         """
-        val = self.vm.pop()
-        the_list = self.vm.pop()
+        val = self.vm.pop1()
+        the_list = self.vm.pop1()
         the_list.append(val)
 
     def LOAD_LOCALS(self):
@@ -319,11 +310,11 @@ class ByteOp24(ByteOpBase):
         stack. This is used in the code for a class definition: After the
         class body is evaluated, the locals are passed to the class
         definition."""
-        self.vm.push(self.vm.frame.f_locals)
+        self.vm.push1(self.vm.frame.f_locals)
 
     def RETURN_VALUE(self):
         """Returns with TOS to the caller of the function."""
-        self.vm.return_value = self.vm.pop()
+        self.vm.return_value = self.vm.pop1()
         if self.vm.frame.generator:
             self.vm.frame.generator.finished = True
         return "return"
@@ -332,7 +323,7 @@ class ByteOp24(ByteOpBase):
         """
         Pops TOS and yields it from a generator.
         """
-        self.vm.return_value = self.vm.pop()
+        self.vm.return_value = self.vm.pop1()
         return "yield"
 
     def IMPORT_STAR(self):
@@ -341,23 +332,26 @@ class ByteOp24(ByteOpBase):
         names. This opcode implements from module import *.
         """
         # TODO: this doesn't use __all__ properly.
-        mod = self.vm.pop()
+        mod = self.vm.pop1()
         for attr in dir(mod):
             if attr[0] != "_":
                 self.vm.frame.f_locals[attr] = getattr(mod, attr)
+        self.vm.names_changed()
 
     def EXEC_STMT(self):
         """
         Implements exec TOS2,TOS1,TOS. The compiler fills missing
         optional parameters with None.
         """
-        stmt, globs, locs = self.vm.popn(3)
+        stmt, globs, locs = self.vm.pop3()
 
         # if `locals` or `globals` is None, use the frame equivalent.
         if globs is None:
             globs = self.vm.frame.f_globals
         if locs is None:
             locs = self.vm.frame.f_locals
+        # Host Python code can change globals without our seeing.
+        self.vm.names_version = None
         exec(stmt, globs, locs)
 
     def POP_BLOCK(self):
@@ -373,11 +367,11 @@ class ByteOp24(ByteOpBase):
         exception has to be re-raised, or whether the function
         returns, and continues with the outer-next block.
         """
-        v = self.vm.pop()
+        v = self.vm.pop1()
         if isinstance(v, str):
             why = v
             if why in ("return", "continue"):
-                self.vm.return_value = self.vm.pop()
+                self.vm.return_value = self.vm.pop1()
             if why == "silenced":  # self.version_info[:2] >= (3, 0)
                 block = self.vm.pop_block()
                 assert block.type == "except-handler"
@@ -387,13 +381,13 @@ class ByteOp24(ByteOpBase):
             why = None
         elif issubclass(v, BaseException):
             exctype = v
-            val = self.vm.pop()
-            tb = self.vm.pop()
+            val = self.vm.pop1()
+            tb = self.vm.pop1()
             self.vm.last_exception = (exctype, val, tb)
             if self.version_info[:2] >= (3, 5):
                 block = self.vm.top_block()
                 while len(self.vm.frame.stack) > block.level:
-                    self.vm.pop()
+                    self.vm.pop1()
                 self.vm.push(tb, val, exctype)
 
             why = "reraise"
@@ -406,7 +400,7 @@ class ByteOp24(ByteOpBase):
         Creates a new class object. TOS is the methods dictionary, TOS1 the
         tuple of the names of the base classes, and TOS2 the class name.
         """
-        name, bases, methods = self.vm.popn(3)
+        name, bases, methods = self.vm.pop3()
         # Note: type() wants to only create new-style classes, while
         # bases might include only old-style classes. This will
         # trigger this error: TypeError: a new-style class can't have
@@ -416,30 +410,44 @@ class ByteOp24(ByteOpBase):
             klass = type(name, bases, methods)
         except TypeError:
             klass = type(name, tuple([object] + list(bases)), methods)
-        self.vm.push(klass)
+        self.vm.push1(klass)
 
     def STORE_NAME(self, name):
         """Implements name = TOS. namei is the index of name in the attribute
         co_names of the code object. The compiler tries to use STORE_LOCAL or
         STORE_GLOBAL if possible."""
-        self.vm.frame.f_locals[name] = self.vm.pop()
+        f_locals = self.vm.frame.f_locals
+        if name not in f_locals:
+            self.vm.names_changed()
+        f_locals[name] = self.vm.pop1()
 
     def DELETE_GLOBAL(self, name):
         """Implements del name, where name in global."""
         del self.vm.frame.f_globals[name]
+        self.vm.names_changed()
 
     def DELETE_NAME(self, name):
         """Implements del name, where name is the index into co_names
         attribute of the code object."""
         del self.vm.frame.f_locals[name]
+        self.vm.names_changed()
 
     def UNPACK_SEQUENCE(self, count):
         """Unpacks TOS into count individual values, which are put onto the
         stack right-to-left.
         """
-        seq = self.vm.pop()
-        for x in reversed(seq):
-            self.vm.push(x)
+        seq = self.vm.pop1()
+        # Take no more than we need to tell there are too many, as
+        # `seq` may be endless.
+        items = list(islice(seq, count + 1))
+        if len(items) > count:
+            raise ValueError(f"too many values to unpack (expected {count})")
+        if len(items) < count:
+            raise ValueError(
+                f"not enough values to unpack (expected {count}, got {len(items)})"
+            )
+        items.reverse()
+        self.vm.push(*items)
 
     def DUP_TOPX(self, count: int):
         """
@@ -452,22 +460,28 @@ class ByteOp24(ByteOpBase):
 
     def STORE_ATTR(self, name):
         """Implements TOS.name = TOS1, where namei is the index of name in co_names."""
-        val, obj = self.vm.popn(2)
+        val, obj = self.vm.pop2()
+        if type(obj) is ModuleType and name not in obj.__dict__:
+            self.vm.names_changed()
         setattr(obj, name, val)
 
     def DELETE_ATTR(self, name):
         """Implements del TOS.name, using namei as index into co_names."""
-        obj = self.vm.pop()
+        obj = self.vm.pop1()
         delattr(obj, name)
+        if type(obj) is ModuleType:
+            self.vm.names_changed()
 
     def STORE_GLOBAL(self, name):
         """Works as STORE_NAME, but stores the name as a global."""
-        f = self.vm.frame
-        f.f_globals[name] = self.vm.pop()
+        f_globals = self.vm.frame.f_globals
+        if name not in f_globals:
+            self.vm.names_changed()
+        f_globals[name] = self.vm.pop1()
 
     def LOAD_CONST(self, const):
         """Pushes co_consts[consti] onto the stack."""
-        self.vm.push(const)
+        self.vm.push1(const)
 
     def LOAD_NAME(self, name):
         """Pushes the value associated with co_names[namei] onto the stack.
@@ -475,13 +489,13 @@ class ByteOp24(ByteOpBase):
         """
         #
         try:
-            self.lookup_name(name)
+            value = self.lookup_name(name)
         except NameError:
             self.vm.last_traceback = self.traceback_from_frame()
             self.create_exception(NameError, f"name '{name}' is not defined")
             return "exception"
         else:
-            self.vm.push(self.lookup_name(name))
+            self.vm.push1(value)
 
     # Building
 
@@ -494,12 +508,12 @@ class ByteOp24(ByteOpBase):
     def BUILD_LIST(self, count: int):
         """Works as BUILD_TUPLE, but creates a list."""
         elts = self.vm.popn(count)
-        self.vm.push(elts)
+        self.vm.push1(elts)
 
     def BUILD_SET(self, count):
         """Works as BUILD_TUPLE, but creates a set. New in version 2.7"""
         elts = self.vm.popn(count)
-        self.vm.push(set(elts))
+        self.vm.push1(set(elts))
 
     def BUILD_MAP(self, size):
         """
@@ -508,7 +522,7 @@ class ByteOp24(ByteOpBase):
         """
         # "size" is ignored; In contrast to C, in Python, the default
         # dictionary type has no notion of allocation size.
-        self.vm.push({})
+        self.vm.push1({})
 
     # end BUILD_ operators
 
@@ -517,9 +531,9 @@ class ByteOp24(ByteOpBase):
 
         Note: name = co_names[namei] set in parse_byte_and_args()
         """
-        obj = self.vm.pop()
+        obj = self.vm.pop1()
         val = getattr(obj, name)
-        self.vm.push(val)
+        self.vm.push1(val)
 
     # Comparisons
 
@@ -532,8 +546,8 @@ class ByteOp24(ByteOpBase):
         operator.ge,  # >=
         lambda x, y: x in y,
         lambda x, y: x not in y,
-        lambda x, y: x is y,
-        lambda x, y: x is not y,
+        operator.is_,
+        operator.is_not,
         lambda x, y: issubclass(x, BaseException)
         and issubclass(x, y),  # exception-match
     ]
@@ -544,8 +558,8 @@ class ByteOp24(ByteOpBase):
 
         Changed in 3.12
         """
-        x, y = self.vm.popn(2)
-        self.vm.push(self.COMPARE_OPERATORS[opname](x, y))
+        x, y = self.vm.pop2()
+        self.vm.push1(self.COMPARE_OPERATORS[opname](x, y))
 
     # Imports
 
@@ -569,7 +583,7 @@ class ByteOp24(ByteOpBase):
         if module is sys:
             module = self.setup_sys_module()
 
-        self.vm.push(module)
+        self.vm.push1(module)
 
     def IMPORT_FROM(self, name):
         """
@@ -592,7 +606,7 @@ class ByteOp24(ByteOpBase):
             self.vm.last_exception = (ImportError, value, None)
             return "exception"
 
-        self.vm.push(getattr(mod, name))
+        self.vm.push1(getattr(mod, name))
 
     # Jumps
 
@@ -646,9 +660,9 @@ class ByteOp24(ByteOpBase):
         iterobj = self.vm.top
         try:
             v = next(iterobj)
-            self.vm.push(v)
+            self.vm.push1(v)
         except StopIteration:
-            self.vm.pop()
+            self.vm.pop1()
             self.vm.jump(jump_offset)
 
     def LOAD_GLOBAL(self, name):
@@ -664,7 +678,7 @@ class ByteOp24(ByteOpBase):
             val = vm_frame.f_builtins[name]
         else:
             raise NameError(f"global name '{name}' is not defined")
-        self.vm.push(val)
+        self.vm.push1(val)
 
     def SETUP_LOOP(self, jump_offset):
         """
@@ -698,53 +712,60 @@ class ByteOp24(ByteOpBase):
         """Store a key and value pair in a dictionary. Pops the key
         and value while leaving the dictionary on the stack.
         """
-        the_map, val, key = self.vm.popn(3)
+        the_map, val, key = self.vm.pop3()
         the_map[key] = val
-        self.vm.push(the_map)
+        self.vm.push1(the_map)
 
     # some (but not all) Names
 
-    def LOAD_FAST(self, name):
+    def LOAD_FAST(self, var_num: int):
         """
         Pushes a reference to the local co_varnames[var_num] onto the stack.
         """
-        if name in self.vm.frame.f_locals:
-            val = self.vm.frame.f_locals[name]
-        else:
+        frame = self.vm.frame
+        val = frame.fast_locals[var_num]
+        if val is UNBOUND:
+            name = frame.f_code.co_varnames[var_num]
             raise UnboundLocalError(
                 f"local variable '{name}' referenced before assignment"
             )
-        self.vm.push(val)
+        self.vm.push1(val)
 
-    def STORE_FAST(self, var_num):
+    def STORE_FAST(self, var_num: int):
         """Stores TOS into the local co_varnames[var_num]."""
-        self.vm.frame.f_locals[var_num] = self.vm.pop()
+        self.vm.frame.fast_locals[var_num] = self.vm.pop1()
 
-    def DELETE_FAST(self, var_num):
+    def DELETE_FAST(self, var_num: int):
         """Deletes local co_varnames[var_num]."""
-        del self.vm.frame.f_locals[var_num]
+        frame = self.vm.frame
+        if frame.fast_locals[var_num] is UNBOUND:
+            name = frame.f_code.co_varnames[var_num]
+            raise UnboundLocalError(
+                f"local variable '{name}' referenced before assignment"
+            )
+        frame.fast_locals[var_num] = UNBOUND
 
-    def LOAD_CLOSURE(self, i):
+    def LOAD_CLOSURE(self, i: int):
         """Pushes a reference to the cell contained in slot i of the
         cell and free variable storage. The name of the variable is
         co_cellvars[i] if i is less than the length of
         co_cellvars. Otherwise it is co_freevars[i -len(co_cellvars)].
         """
-        self.vm.push(self.vm.frame.cells[i])
+        self.vm.push1(self.vm.frame.cells[i])
 
-    def LOAD_DEREF(self, name):
+    def LOAD_DEREF(self, i: int):
         """
         Loads the cell contained in slot i of the cell and free variable
         storage. Pushes a reference to the object the cell contains on the
         stack.
         """
-        self.vm.push(self.vm.frame.cells[name].get())
+        self.vm.push1(self.vm.frame.cells[i].get())
 
-    def STORE_DEREF(self, name):
+    def STORE_DEREF(self, i: int):
         """Stores TOS into the cell contained in slot i of the cell
         and free variable storage.
         """
-        self.vm.frame.cells[name].set(self.vm.pop())
+        self.vm.frame.cells[i].set(self.vm.pop1())
 
     # End names
 
@@ -764,7 +785,7 @@ class ByteOp24(ByteOpBase):
         associated with the function. The function object is defined to have
         argc default parameters, which are found below TOS.
         """
-        code = self.vm.pop()
+        code = self.vm.pop1()
         defaults = self.vm.popn(argc)
         globs = self.vm.frame.f_globals
         fn = Function(
@@ -779,7 +800,7 @@ class ByteOp24(ByteOpBase):
         if argc == 0 and code.co_name in COMPREHENSION_FN_NAMES:
             fn.has_dot_zero = True
 
-        self.vm.push(fn)
+        self.vm.push1(fn)
 
     def MAKE_CLOSURE(self, argc: int):
         """
@@ -792,7 +813,7 @@ class ByteOp24(ByteOpBase):
 
         Changed in 2.6
         """
-        code = self.vm.pop()
+        code = self.vm.pop1()
         defaults = self.vm.popn(argc)
         globs = self.vm.frame.f_globals
 
@@ -805,7 +826,7 @@ class ByteOp24(ByteOpBase):
             closure=closure,
             vm=self.vm,
         )
-        self.vm.push(fn)
+        self.vm.push1(fn)
 
     def BUILD_SLICE(self, count):
         """
@@ -817,11 +838,11 @@ class ByteOp24(ByteOpBase):
         Changed to BINARY_SLICE in 3.12
         """
         if count == 2:
-            start, stop = self.vm.popn(2)
-            self.vm.push(slice(start, stop))
+            start, stop = self.vm.pop2()
+            self.vm.push1(slice(start, stop))
         elif count == 3:
-            start, stop, step = self.vm.popn(3)
-            self.vm.push(slice(start, stop, step))
+            start, stop, step = self.vm.pop3()
+            self.vm.push1(slice(start, stop, step))
         else:  # pragma: no cover
             raise self.vm.PyVMError(f"Strange BUILD_SLICE count: {count!r}")
 
@@ -841,22 +862,22 @@ class ByteOp24(ByteOpBase):
         if argc == 0:
             exctype, val, tb = self.vm.last_exception
         elif argc == 1:
-            exctype = self.vm.pop()
+            exctype = self.vm.pop1()
             val = AssertionError()
         elif argc == 2:
-            val = self.vm.pop()
+            val = self.vm.pop1()
             # Investigate: right now we see this *only* in 2.6.
             # Can it happen in other bytecode versions?
             if self.version_info[:2] == (2, 6):
                 val = AssertionError(val)
-            exctype = self.vm.pop()
+            exctype = self.vm.pop1()
         elif argc == 3:
-            tb = self.vm.pop()
-            val = self.vm.pop()
+            tb = self.vm.pop1()
+            val = self.vm.pop1()
             # See comment above
             if self.version_info[:2] == (2, 6):
                 val = AssertionError(val)
-            exctype = self.vm.pop()
+            exctype = self.vm.pop1()
 
         # There are a number of forms of "raise", normalize them somewhat.
         if isinstance(exctype, BaseException):
@@ -905,7 +926,7 @@ class ByteOp24(ByteOpBase):
         The order of var_args and keyword_args changes in 3.5.
 
         """
-        var_args = self.vm.pop()
+        var_args = self.vm.pop1()
         return self.call_function(argc, var_args=var_args, keyword_args={})
 
     def CALL_FUNCTION_KW(self, argc: int):
@@ -916,7 +937,7 @@ class ByteOp24(ByteOpBase):
         positional arguments.
 
         """
-        keyword_args = self.vm.pop()
+        keyword_args = self.vm.pop1()
         return self.call_function(argc, var_args=[], keyword_args=keyword_args)
 
     def CALL_FUNCTION_VAR_KW(self, argc: int):
@@ -928,5 +949,5 @@ class ByteOp24(ByteOpBase):
         arguments.
 
         """
-        var_args, keyword_args = self.vm.popn(2)
+        var_args, keyword_args = self.vm.pop2()
         return self.call_function(argc, var_args=var_args, keyword_args=keyword_args)
@@ -54,8 +54,8 @@ class ByteOp25(ByteOp24):
                 exit_func = self.vm.pop(1)
             u = None
         elif issubclass(u, BaseException):
-            w, v, u = self.vm.popn(3)
-            exit_func = self.vm.pop()
+            w, v, u = self.vm.pop3()
+            exit_func = self.vm.pop1()
             self.vm.push(w, v, u)
         else:  # pragma: no cover
             raise self.vm.PyVMError("Confused WITH_CLEANUP")
@@ -63,5 +63,5 @@ class ByteOp25(ByteOp24):
         err = (u is not None) and bool(exit_ret)
         if err:
             # An error occurred, and was suppressed
-            self.vm.popn(3)
-            self.vm.push(None)
+            self.vm.pop3()
+            self.vm.push1(None)
@@ -42,7 +42,7 @@ class ByteOp26(ByteOp25):
 
         Note: name = co_names[namei] set in parse_byte_and_args()
         """
-        level, fromlist = self.vm.popn(2)
+        level, fromlist = self.vm.pop2()
         frame = self.vm.frame
 
         # Should we replace import "name" with a compatibility version?
@@ -83,7 +83,7 @@ class ByteOp26(ByteOp25):
         if module is sys:
             module = self.setup_sys_module()
 
-        self.vm.push(module)
+        self.vm.push1(module)
 
     def MAKE_CLOSURE(self, argc: int):
         """
@@ -94,8 +94,8 @@ class ByteOp26(ByteOp25):
         which are found below the cells.
         """
         name = None
-        closure, code = self.vm.popn(2)
+        closure, code = self.vm.pop2()
         defaults = self.vm.popn(argc)
         globs = self.vm.frame.f_globals
         fn = Function(name, code, globs, defaults, closure, self.vm)
-        self.vm.push(fn)
+        self.vm.push1(fn)
@@ -71,8 +71,8 @@ class ByteOp27(ByteOp26):
         While the appended value is popped off, the list object remains on the stack
         so that it is available for further iterations of the loop.
         """
-        val = self.vm.pop()
-        the_list = self.vm.peek(count)
+        val = self.vm.pop1()
+        the_list = self.vm.peek_n(count)
         the_list.append(val)
 
     # New in 2.7
@@ -90,8 +90,8 @@ class ByteOp27(ByteOp26):
         """Calls set.add(TOS1[-count], TOS). Used to implement set
         comprehensions.
         """
-        val = self.vm.pop()
-        the_set = self.vm.peek(count)
+        val = self.vm.pop1()
+        the_set = self.vm.peek_n(count)
         the_set.add(val)
 
     def MAP_ADD(self, count):
@@ -100,8 +100,8 @@ class ByteOp27(ByteOp26):
         comprehensions.
         """
         # FIXME: the below seems fishy.
-        val, key = self.vm.popn(2)
-        the_map = self.vm.peek(count)
+        val, key = self.vm.pop2()
+        the_map = self.vm.peek_n(count)
         the_map[key] = val
 
     # Note gone in 3.0 and 3.1, but appears again in 3.2
@@ -116,7 +116,7 @@ class ByteOp27(ByteOp26):
         will either ignore it (POP_TOP), or store it in (a)
         variable(s) (STORE_FAST, STORE_NAME, or UNPACK_SEQUENCE).
         """
-        context_manager = self.vm.pop()
+        context_manager = self.vm.pop1()
 
         # Make sure __enter__ and __exit__ functions in context_manager are
         # converted to our Function type, so we can interpret them.
@@ -132,7 +132,7 @@ class ByteOp27(ByteOp26):
                 exit_method = context_manager.__exit__
         else:
             exit_method = context_manager.__exit__
-        self.vm.push(exit_method)
+        self.vm.push1(exit_method)
         if self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2] and not inspect.isbuiltin(
             context_manager.__enter__
         ):
@@ -142,12 +142,12 @@ class ByteOp27(ByteOp26):
             self.vm.push_block("with", delta)
         else:
             self.vm.push_block("finally", delta)
-        self.vm.push(finally_block)
+        self.vm.push1(finally_block)
 
     def BUILD_SET(self, count):
         """Works as BUILD_TUPLE, but creates a set. New in version 2.7"""
         elts = self.vm.popn(count)
-        self.vm.push(set(elts))
+        self.vm.push1(set(elts))
 
     def JUMP_FORWARD(self, delta):
         """Increments bytecode counter by delta."""
@@ -155,13 +155,13 @@ class ByteOp27(ByteOp26):
 
     def POP_JUMP_IF_TRUE(self, target):
         """If TOS is true, sets the bytecode counter to target. TOS is popped."""
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val:
             self.vm.jump(target)
 
     def POP_JUMP_IF_FALSE(self, target):
         """If TOS is false, sets the bytecode counter to target. TOS is popped."""
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if not val:
             self.vm.jump(target)
 
@@ -173,7 +173,7 @@ class ByteOp27(ByteOp26):
         if self.vm.top:
             self.vm.jump(delta)
         else:
-            self.vm.pop()
+            self.vm.pop1()
 
     def JUMP_IF_FALSE_OR_POP(self, target):
         """
@@ -184,4 +184,4 @@ class ByteOp27(ByteOp26):
         if not val:
             self.vm.jump(target)
         else:
-            self.vm.pop()
+            self.vm.pop1()
@@ -46,9 +46,9 @@ class ByteOp310(ByteOp39):
         Changed from version 3.6: Flag value 0x04 is a tuple of strings instead of
         dictionary
         """
-        qualname = self.vm.pop()
+        qualname = self.vm.pop1()
         name = qualname.split(".")[-1]
-        code = self.vm.pop()
+        code = self.vm.pop1()
 
         slot = {
             "defaults": tuple(),
@@ -62,7 +62,7 @@ class ByteOp310(ByteOp39):
         )
         for i in range(MAKE_FUNCTION_SLOTS):
             if have_param[i]:
-                slot[MAKE_FUNCTION_SLOT_NAMES[i]] = self.vm.pop()
+                slot[MAKE_FUNCTION_SLOT_NAMES[i]] = self.vm.pop1()
 
         # FIXME: DRY with code in byteop3{2,4,6}.py
 
@@ -99,7 +99,7 @@ class ByteOp310(ByteOp39):
         if fn_vm._func:
             self.vm.fn2native[fn_vm] = fn_vm._func
 
-        self.vm.push(fn_vm)
+        self.vm.push1(fn_vm)
 
     # New in 3.10
 
@@ -124,7 +124,7 @@ class ByteOp310(ByteOp39):
 
     def GET_LEN(self):
         """Push len(TOS) onto the stack."""
-        self.vm.push(len(self.vm.pop()))
+        self.vm.push1(len(self.vm.pop1()))
 
     def MATCH_MAPPING(self):
         """If TOS is an instance of collections.abc.Mapping (or, more
@@ -158,7 +158,7 @@ class ByteOp310(ByteOp39):
         determines the error message. The legal kinds are 0 for
         generator, 1 for coroutine, and 2 for async generator.
         """
-        self.vm.pop()
+        self.vm.pop1()
         # if generator is None:
         #     raise self.vm.PyVMError("GEN_START TOS is None")
         # FIXME
@@ -11,7 +11,8 @@ import inspect
 import logging
 from typing import Tuple
 
-from xdis.version_info import PYTHON_VERSION_TRIPLE, version_tuple_to_str
+from xdis.opcodes.opcode_3x.opcode_311 import _nb_ops
+from xdis.version_info import PYTHON_VERSION_TRIPLE
 
 from xpython.byteop.byteop24 import Version_info
 from xpython.byteop.byteop36 import (
@@ -19,10 +20,9 @@ from xpython.byteop.byteop36 import (
     MAKE_FUNCTION_SLOT_NAMES,
     MAKE_FUNCTION_SLOTS,
 )
-from xpython.builtins import build_class, builtin_super
 from xpython.byteop.byteop37 import NULL
 from xpython.byteop.byteop310 import ByteOp310
-from xpython.pyobj import Function
+from xpython.pyobj import UNBOUND, Function
 
 log = logging.getLogger(__name__)
 
@@ -56,186 +56,30 @@ class ByteOp311(ByteOp310):
         self.version = "3.11.0 (default, Oct 27 1955, 00:00:00)\n[x-python]"
         self.version_info = Version_info(3, 11, 0, "final", 0)
 
-    def call311_function_with_args_resolved(self, func, pos_args, named_args):
-        frame = self.vm.frame
+        # BINARY_OP's operand selects the operator. Index this
+        # by the operand, e.g. 13 is NB_INPLACE_ADD.
+        self.binary_op_table = [
+            self.inplace_handler(name[len("NB_INPLACE_") :])
+            if name.startswith("NB_INPLACE_")
+            else self.binary_handler(name[len("NB_") :])
+            for name, _ in _nb_ops
+        ]
+        self.operand_dispatch[vm.opc.opmap["BINARY_OP"]] = self.binary_op_table
 
+    def call311_function_with_args_resolved(self, func, pos_args, named_args):
         assert not self.vm.is_empty_stack
         if self.vm.top is NULL:
-            self.vm.pop()  # Remove NULL
+            self.vm.pop1()  # Remove NULL
         else:
             # Pickup self.
-            self_obj = self.vm.pop()
+            self_obj = self.vm.pop1()
             retval = self_obj(func, *pos_args, **named_args)
-            self.vm.push(retval)
+            self.vm.push1(retval)
             return
 
-        # FIXME: put this in a separate routine.
-        if inspect.isbuiltin(func):
-            log.debug(f"handling built-in function {func.__name__}")
-            if func == globals:
-                # Use the frame's globals(), not the interpreter's
-                self.vm.push(frame.f_globals)
-                return
-            elif func == locals:
-                # Use the frame's locals(), not the interpreter's
-                self.vm.push(frame.f_locals)
-                return
-
-            if func == compile:
-                # Set dont_inherit parameter.  FIXME: we should set
-                # other flags too based on the interpreted
-                # environment?
-                if len(pos_args) < 5 and "dont_inherit" not in named_args:
-                    named_args["dont_inherit"] = True
-                    pass
-            elif func.__name__ == "exec":
-                if not 1 <= len(pos_args) <= 3:
-                    raise self.vm.PyVMError(
-                        "exec() builtin should have 1..3 positional arguments; got %d"
-                        % (len(pos_args))
-                    )
-                n = len(pos_args)
-                assert 1 <= n <= 3
-
-                # Note that in contrast to `eval()` handled below, if
-                # the `locals` parameter is not provided, the
-                # `globals` parameter value (whether provided or
-                # default value) is used for the `locals`
-                # parameter. So we shouldn't use the frame's `locals`.
-                if len(pos_args) == 1:
-                    pos_args.append(self.vm.frame.f_globals)
-
-                if self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]:
-                    # Use the compile() and interprete the bytecode using our own
-                    # interpreter not CPython's.
-                    source = pos_args[0]
-                    if isinstance(source, str) or isinstance(source, bytes):
-                        try:
-                            pos_args[0] = compile(
-                                source, "<string>", mode="exec", dont_inherit=True
-                            )
-                        except (TypeError, SyntaxError, ValueError):
-                            raise
-                    self.vm.push(self.vm.run_code(*pos_args, toplevel=False))
-                    return
-                else:
-                    if not self.cross_bytecode_exec_warning_shown:
-                        log.warning(
-                            "Running built-in `exec()`, because bytecode compile() is not available "
-                            "and we are cross-version. "
-                            "Interpreting version %s from version %s."
-                            % (
-                                version_tuple_to_str(self.version_info, end=2),
-                                version_tuple_to_str(PYTHON_VERSION_TRIPLE, end=2),
-                            )
-                        )
-                        self.cross_bytecode_exec_warning_shown = True
-
-            elif func == eval:
-                if not 1 <= len(pos_args) <= 3:
-                    raise self.vm.PyVMError(
-                        "eval() builtin should have 1..3 positional arguments; got %d"
-                        % (len(pos_args))
-                    )
-                assert 1 <= len(pos_args) <= 3
-                # Use the frame's globals(), not the interpreter's
-                n = len(pos_args)
-                if n < 2:
-                    pos_args.append(self.vm.frame.f_globals)
-                # Likewise for locals()
-                if n < 3:
-                    pos_args.append(self.vm.frame.f_locals)
-                assert len(pos_args) == 3
-
-                if self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]:
-                    # Use the compile() and interprete the bytecode using our own
-                    # interpreter not CPython's.
-                    source = pos_args[0]
-                    if isinstance(source, str):
-                        try:
-                            pos_args[0] = compile(
-                                source, "<string>", mode="eval", dont_inherit=True
-                            )
-                        except (TypeError, SyntaxError, ValueError):
-                            raise
-                    self.vm.push(self.vm.run_code(*pos_args, toplevel=False))
-                    return
-                else:
-                    if not self.cross_bytecode_eval_warning_shown:
-                        log.warning(
-                            "Running built-in `eval()`, because bytecode compile() is not available "
-                            "and we are cross-version. "
-                            "Interpreting version %s from version %s."
-                            % (
-                                version_tuple_to_str(self.version_info, end=2),
-                                version_tuple_to_str(PYTHON_VERSION_TRIPLE, end=2),
-                            )
-                        )
-                        self.cross_bytecode_eval_warning_shown = True
-
-            elif PYTHON_VERSION_TRIPLE >= (3, 0) and func == __build_class__:
-                assert len(pos_args) > 0, (
-                    "__build_class__() should have at least one argument, an "
-                    "__init__() function."
-                )
-                init_fn = pos_args[0]
-                if (
-                    isinstance(init_fn, Function)
-                    or self.is_pypy
-                    or self.version_info[:2] != PYTHON_VERSION_TRIPLE[:2]
-                ):
-                    # 3.3+ __build_class__() works only on bytecode
-                    # that matches the CPython interpreter, so use
-                    # Darius' version instead.  Down the line we will
-                    # try to do this universally, but it is tricky:
-                    retval = build_class(self.vm.opc, *pos_args, **named_args)
-                    self.vm.push(retval)
-                    return
-                else:
-                    # Use builtin __build_class__(). However for that,
-                    # we need a native function.  This is wrong though
-                    # in that we won't trace into __init__().
-                    init_fn = pos_args[0]
-                    if isinstance(init_fn, Function) and init_fn in self.vm.fn2native:
-                        pos_args[0] = self.vm.fn2native[init_fn]
-        elif func is type and len(pos_args) == 3:
-            # Set __module__
-            assert not named_args
-            namespace = pos_args[2]
-            namespace["__module__"] = namespace.get(
-                "__name__", self.vm.frame.f_globals["__name__"]
-            )
-
-        if (
-            inspect.isfunction(func)
-            and self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]
-        ):
-            # Try to convert to an interpreter function, so we can interpret it.
-            if func in self.vm.fn2native:
-                func = self.vm.fn2native[func]
-            elif False:  # self.vm.version < (3, 0):
-                # Not quite ready. See 3.7 test_asyncgen.py for an
-                # example of code that comes here. In that test, the
-                # LOAD_GLOBAL '_ignore_deprecated_imports' fails to
-                # find the global. '_ignore_deprecated_imports' is a method name
-                # in test.support module of test/support/__init__.py.
-                # In Python 2.X we work around a similar problem by
-                # not tying to handle functions with closures.
-                assert len(pos_args) > 0
-                pos_args[0] = self.convert_native_to_Function(frame, pos_args[0])
-
-        if (
-            inspect.isfunction(func)
-            and self.version_info[:2] == PYTHON_VERSION_TRIPLE[:2]
-        ):
-            log.debug(f"calling native function {func.__name__}")
-        elif inspect.isclass(func):
-            if func.__name__ == "super":
-                pos_args = [self.vm.frame] + pos_args
-                func = builtin_super
-
-        retval = func(*pos_args, **named_args)
-        self.vm.push(retval)
+        if type(func) is Function:
+            return self.vm.call_interpreted(func, pos_args, named_args)
+        self.vm.push1(self.call_resolved(func, pos_args, named_args))
 
     def is_method(self, argc: int) -> bool:
         """
@@ -262,24 +106,17 @@ class ByteOp311(ByteOp310):
         """
         return
 
-    # This is handled by the caller.
-    # def BINARY_OP(self, op: int):
-    #     """
-    #       Implements the binary and in-place operators (depending on the value of op):
-
-    #       rhs = STACK.pop()
-    #       lhs = STACK.pop()
-    #       STACK.append(lhs op rhs)
-
-    #       New in version 3.11.
-    #       TOS is a tuple of mapping keys, and TOS1 is the match
-    #       subject. Replace TOS with a dict formed from the items of TOS1, but
-    #       without any of the keys in TOS.
-    #     """
-    #     rhs = self.vm.pop()
-    #     lhs = self.vm.pop()
-    #     self.vm.push(len(self.vm.pop()))
-    #     raise self.vm.PyVMError("MATCH_COPY_DICT_WITHOUT_KEYS not implemented")
+    def BINARY_OP(self, op: int):
+        """
+        Implements the binary and in-place operators (depending on the value of op):
+
+        rhs = STACK.pop()
+        lhs = STACK.pop()
+        STACK.append(lhs op rhs)
+
+        New in version 3.11.
+        """
+        self.binary_op_table[op]()
 
     def CALL(self, argc: int):
         """Calls a callable object with the number of arguments
@@ -309,26 +146,41 @@ class ByteOp311(ByteOp310):
         Replaces CALL_FUNCTION
 
         """
-        total_args = argc + 1 if self.is_method(argc) else argc
         # FIXME: figure out how to set this
-        kw_names_len = len(self.vm.frame.call_shape_kwnames)
-        named_args = self.vm.frame.call_shape_kwnames
-        positional_args = total_args - kw_names_len
+        frame = self.vm.frame
+        named_args = frame.call_shape_kwnames
+        if named_args is None:
+            named_args = {}
+        else:
+            # Clear names set by KW_NAMES
+            frame.call_shape_kwnames = None
+
+        # KW_NAMES has already taken the named arguments off the stack.
+        n_pos = argc - len(named_args)
+        method = self.vm.peek(n_pos + 2)
+        if type(method) is Function:
+            # LOAD_METHOD pushed an interpreted Function and self; self
+            # and the positional arguments are the Function's.
+            pos_args = self.vm.popn(n_pos + 1)
+            self.vm.pop1()
+            return self.vm.call_interpreted(method, pos_args, named_args)
+
+        total_args = argc + 1 if self.is_method(argc) else argc
+        positional_args = total_args - len(named_args)
         pos_args = self.vm.popn(positional_args)
-        function = self.vm.pop()
+        function = self.vm.pop1()
         # C interpreter checks for inlining here.
         # We will skip this.
 
-        ret_val = self.call311_function_with_args_resolved(function, pos_args, named_args)
-
-        # Clear names set by KW_NAMES
-        self.vm.frame.call_shape_kwnames = {}
-        return ret_val
+        return self.call311_function_with_args_resolved(function, pos_args, named_args)
 
     def COPY_FREE_VARS(self, argc: int):
         """Copies the n free variables from the closure into the
           frame. Removes the need for special code on the caller’s
           side when calling closures.
+
+        In this interpreter, the frame's cells are set up from the
+        closure when the frame is created. So there's nothing to do.
         """
         # Copy closure variables to free variables
         # PyCodeObject *co = frame->f_code;
@@ -340,12 +192,6 @@ class ByteOp311(ByteOp310):
         #     Py_INCREF(o);
         #     frame->localsplus[offset + i] = o;
         # }
-        frame = self.vm.frame
-        co = frame.f_code
-        localsplus = co.co_freevars + co.co_cellvars
-        for i in range(argc):
-            name = localsplus[i]
-            frame.f_locals[name] = frame.cells[name].get()
         return
 
     def KW_NAMES(self, names: Tuple[str]):
@@ -357,17 +203,20 @@ class ByteOp311(ByteOp310):
         Replaces CALL_FUNCTION_KW
         """
 
+        kwnames = {}
         for name in names:
-            self.vm.frame.call_shape_kwnames[name] = self.vm.pop()
+            kwnames[name] = self.vm.pop1()
+        self.vm.frame.call_shape_kwnames = kwnames
         return
 
     # Changed in 3.11...
-    def MAKE_CELL(self, name: str):
+    def MAKE_CELL(self, i: int, var_num):
         """
-        Creates a new cell in slot i having name "name". If that slot is nonempty then that value is stored into the new cell.
-
+        Creates a new cell in slot i. If the local variable var_num the cell
+        is for is set, its value is stored into the new cell.
 
-        In this interpreter, we create all cells when the frame is created. So there's nothing to do
+        In this interpreter, we create all cells when the frame is created. So
+        all we do is set the value.
         """
         # PyObject *initial = GETLOCAL(oparg);
         # PyObject *cell = PyCell_New(initial);
@@ -375,7 +224,10 @@ class ByteOp311(ByteOp310):
         #     goto resume_with_error;
         # }
         # SETLOCAL(oparg, cell);
-        self.vm.frame.cells[name].set(self.vm.frame.f_locals.get(name, None))
+        if var_num is not None:
+            frame = self.vm.frame
+            value = frame.fast_locals[var_num]
+            frame.cells[i].set(None if value is UNBOUND else value)
         return
 
     # Changed in 3.11...
@@ -396,9 +248,9 @@ class ByteOp311(ByteOp310):
             raise NameError(f"global name '{name}' is not defined")
 
         if push_null:
-            self.vm.push(NULL)
+            self.vm.push1(NULL)
 
-        self.vm.push(val)
+        self.vm.push1(val)
 
     def MAKE_FUNCTION(self, argc: int):
         """
@@ -416,7 +268,7 @@ class ByteOp311(ByteOp310):
 
         Changed from version 3.10: Qualified name at STACK[-1] was removed.
         """
-        code = self.vm.pop()
+        code = self.vm.pop1()
 
         slot = {
             "defaults": tuple(),
@@ -430,7 +282,7 @@ class ByteOp311(ByteOp310):
         )
         for i in range(MAKE_FUNCTION_SLOTS):
             if have_param[i]:
-                slot[MAKE_FUNCTION_SLOT_NAMES[i]] = self.vm.pop()
+                slot[MAKE_FUNCTION_SLOT_NAMES[i]] = self.vm.pop1()
 
         # FIXME: DRY with code in byteop3{2,4,6}.py
 
@@ -467,7 +319,7 @@ class ByteOp311(ByteOp310):
         if fn_vm._func:
             self.vm.fn2native[fn_vm] = fn_vm._func
 
-        self.vm.push(fn_vm)
+        self.vm.push1(fn_vm)
 
     def PRECALL(self, argc: int):
         """
@@ -508,7 +360,7 @@ class ByteOp311(ByteOp310):
         match the NULL pushed by LOAD_METHOD for non-method calls.
 
         """
-        self.vm.push(NULL)
+        self.vm.push1(NULL)
 
     def COPY(self, i: int):
         """
@@ -516,7 +368,7 @@ class ByteOp311(ByteOp310):
         original location.
         """
         stack_i = self.vm.peek(i)
-        self.vm.push(stack_i)
+        self.vm.push1(stack_i)
 
     def SWAP(self, i: int):
         """
@@ -539,8 +391,8 @@ class ByteOp311(ByteOp310):
 
         For "exception matching" use isinstance(TOS1 TOS.__class__) so superclasses
         """
-        _, tos = self.vm.popn(2)
-        self.vm.push(isinstance(tos, tos.__class__))
+        _, tos = self.vm.pop2()
+        self.vm.push1(isinstance(tos, tos.__class__))
 
     def JUMP_BACKWARD(self, offset: int):
         """
@@ -558,7 +410,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is true, increments the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val == True:  # noqa
             self.vm.jump(offset)
 
@@ -566,7 +418,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is true, decrements the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val == True:  # noqa
             self.vm.jump(offset)
 
@@ -574,7 +426,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is false, increments the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val == False:  # noqa
             self.vm.jump(offset)
 
@@ -582,7 +434,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is false, decrements the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val == False:  # noqa
             self.vm.jump(offset)
 
@@ -590,7 +442,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is not None, increments the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val is not None:
             self.vm.jump(offset)
 
@@ -598,7 +450,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is not None, decrements the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val is not None:
             self.vm.jump(offset)
 
@@ -606,7 +458,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is not None, increments the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val is None:
             self.vm.jump(offset)
 
@@ -614,7 +466,7 @@ class ByteOp311(ByteOp310):
         """
         If TOS is not None, decrements the bytecode counter by delta. TOS is popped.
         """
-        val = self.vm.pop()
+        val = self.vm.pop1()
         if val is None:
             self.vm.jump(offset)
 
@@ -623,9 +475,9 @@ class ByteOp311(ByteOp310):
         to the top of the stack. Pushes the value originally popped
         back to the stack. Used in exception handlers.
         """
-        val = self.vm.pop()
-        self.vm.push(self.vm.last_exception[1])
-        self.vm.push(val)
+        val = self.vm.pop1()
+        self.vm.push1(self.vm.last_exception[1])
+        self.vm.push1(val)
 
 
     def RESUME(self, where: int):
@@ -10,6 +10,7 @@
 from xpython.byteop.byteop24 import Version_info
 from xpython.byteop.byteop311 import ByteOp311
 from xpython.byteop.byteop37 import NULL
+from xpython.pyobj import UNBOUND
 
 
 # pylint: disable=too-many-public-methods
@@ -34,8 +35,8 @@ class ByteOp312(ByteOp311):
 
         Pushes a slice object on the stack. slice(TOS1, TOS) is pushed.
         """
-        container, start, stop = self.vm.popn(3)
-        self.vm.push(container[slice(start, stop)])
+        container, start, stop = self.vm.pop3()
+        self.vm.push1(container[slice(start, stop)])
 
     def INTERPRETER_EXIT(self):
         """
@@ -48,7 +49,7 @@ class ByteOp312(ByteOp311):
         """Removes the top-of-stack item. Equivalent to POP_TOP. Used
           to clean up at the end of loops, hence the name.
         """
-        self.vm.pop()
+        self.vm.pop1()
 
     def END_SEND(self):
         """
@@ -75,7 +76,7 @@ class ByteOp312(ByteOp311):
         """
         values, container, start, end = self.vm.popn(4)
         container[start:end]= values
-        self.vm.push(container)
+        self.vm.push1(container)
 
     def CLEANUP_THROW(self):
         """
@@ -140,16 +141,23 @@ class ByteOp312(ByteOp311):
         # FIXME
         raise self.vm.PyVMError("LOAD_SUPER_ATTR not implemented")
 
-    def LOAD_FAST_AND_CLEAR(self, name):
+    def LOAD_FAST_AND_CLEAR(self, var_num: int):
         """Pushes a reference to the local co_varnames[var_num] onto
         the stack (or pushes NULL onto the stack if the local variable
         has not been initialized) and sets co_varnames[var_num] to
         NULL.
         """
-        value = self.vm.frame.f_locals.get(name, NULL)
-        if value is NULL:
-            self.vm.frame.f_locals[name] = NULL
-        self.vm.push(value)
+        fast_locals = self.vm.frame.fast_locals
+        value = fast_locals[var_num]
+        fast_locals[var_num] = UNBOUND
+        self.vm.push1(NULL if value is UNBOUND else value)
+
+    def STORE_FAST(self, var_num: int):
+        """Stores TOS into the local co_varnames[var_num]. TOS may be the
+        NULL left by LOAD_FAST_AND_CLEAR, which leaves the local unset.
+        """
+        value = self.vm.pop1()
+        self.vm.frame.fast_locals[var_num] = UNBOUND if value is NULL else value
 
 
     # And many more...
@@ -163,9 +171,9 @@ class ByteOp312(ByteOp311):
         The cmp_op index is now stored in the four-highest bits of
         oparg instead of the four-lowest bits of oparg.
         """
-        x, y = self.vm.popn(2)
+        x, y = self.vm.pop2()
         opname >>= 4
-        self.vm.push(self.COMPARE_OPERATORS[opname](x, y))
+        self.vm.push1(self.COMPARE_OPERATORS[opname](x, y))
 
     def FOR_ITER(self, jump_offset):
         """TOS is an iterator. Call its __next__() method. If this
@@ -181,7 +189,7 @@ class ByteOp312(ByteOp311):
 
         try:
             v = next(self.vm.top)
-            self.vm.push(v)
+            self.vm.push1(v)
         except StopIteration:
             self.vm.jump(jump_offset)
 
@@ -206,10 +214,10 @@ class ByteOp312(ByteOp311):
         Note: name = co_names[namei] and push_null are set in
         parse_byte_and_args()
         """
-        obj = self.vm.pop()
+        obj = self.vm.pop1()
         val = getattr(obj, name)
 
         if push_null:
-            self.vm.push(NULL)
+            self.vm.push1(NULL)
 
-        self.vm.push(val)
+        self.vm.push1(val)
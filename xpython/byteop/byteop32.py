@@ -53,7 +53,7 @@ class ByteOp32(ByteOp27):
 
     def DUP_TOP_TWO(self):
         """Duplicates the reference on top of the stack."""
-        a, b = self.vm.popn(2)
+        a, b = self.vm.pop2()
         self.vm.push(a, b, a, b)
 
     def POP_EXCEPT(self):
@@ -73,7 +73,7 @@ class ByteOp32(ByteOp27):
     def LOAD_BUILD_CLASS(self):
         """Pushes builtins.__build_class__() onto the stack. It is
         later called by CALL_FUNCTION to construct a class."""
-        self.vm.push(__build_class__)
+        self.vm.push1(__build_class__)
 
     def MAKE_CLOSURE(self, argc: int):
         """
@@ -85,7 +85,7 @@ class ByteOp32(ByteOp27):
         which are found below the cells.
         """
         default_count, kw_default_count, annotate_count = parse_fn_counts_30_35(argc)
-        closure, code = self.vm.popn(2)
+        closure, code = self.vm.pop2()
 
         if kw_default_count:
             kw_default_pairs = self.vm.popn(2 * kw_default_count)
@@ -101,7 +101,7 @@ class ByteOp32(ByteOp27):
             defaults = tuple()
 
         if annotate_count:
-            annotate_names = self.vm.pop()
+            annotate_names = self.vm.pop1()
             annotate_types = self.vm.popn(annotate_count)
             n = len(annotate_names)
             assert n == len(annotate_types)
@@ -124,7 +124,7 @@ class ByteOp32(ByteOp27):
             annotations=annotations,
         )
 
-        self.vm.push(fn)
+        self.vm.push1(fn)
 
     # Changed from 3.1
     # 3.2 has kwdefaults that aren't allowed in 2.4
@@ -147,7 +147,7 @@ class ByteOp32(ByteOp27):
         """
         default_count, kw_default_count, annotate_count = parse_fn_counts_30_35(argc)
 
-        code = self.vm.pop()
+        code = self.vm.pop1()
         name = code.co_name
 
         if kw_default_count:
@@ -164,7 +164,7 @@ class ByteOp32(ByteOp27):
             defaults = tuple()
 
         if annotate_count:
-            annotate_names = self.vm.pop()
+            annotate_names = self.vm.pop1()
             # annotate count includes +1 for the above names
             annotate_objects = self.vm.popn(annotate_count - 1)
             n = len(annotate_names)
@@ -188,7 +188,7 @@ class ByteOp32(ByteOp27):
             annotations=annotations,
         )
 
-        self.vm.push(fn)
+        self.vm.push1(fn)
 
     def WITH_CLEANUP(self):
         """Cleans up the stack when a `with` statement block exits. TOS is the
@@ -226,11 +226,11 @@ class ByteOp32(ByteOp27):
                 exit_func = self.vm.pop(1)
             u = None
         elif issubclass(u, BaseException):
-            w, v, u = self.vm.popn(3)
-            tp, exc, tb = self.vm.popn(3)
-            exit_func = self.vm.pop()
+            w, v, u = self.vm.pop3()
+            tp, exc, tb = self.vm.pop3()
+            exit_func = self.vm.pop1()
             self.vm.push(tp, exc, tb)
-            self.vm.push(None)
+            self.vm.push1(None)
             self.vm.push(w, v, u)
             block = self.vm.pop_block()
             assert block.type == "except-handler"
@@ -241,7 +241,7 @@ class ByteOp32(ByteOp27):
         err = (u is not None) and bool(exit_ret)
         if err:
             # An error occurred, and was suppressed
-            self.vm.push("silenced")
+            self.vm.push1("silenced")
 
     def STORE_LOCALS(self):
         """Pops TOS from the stack and stores it as the current frames
@@ -249,7 +249,7 @@ class ByteOp32(ByteOp27):
 
         Removed in 3.4.
         """
-        self.vm.frame.f_locals = self.vm.pop()
+        self.vm.frame.f_locals = self.vm.pop1()
 
     def RAISE_VARARGS(self, argc: int):
         """
@@ -260,10 +260,10 @@ class ByteOp32(ByteOp27):
         """
         cause = exc = None
         if argc == 2:
-            cause = self.vm.pop()
-            exc = self.vm.pop()
+            cause = self.vm.pop1()
+            exc = self.vm.pop1()
         elif argc == 1:
-            exc = self.vm.pop()
+            exc = self.vm.pop1()
         return self.do_raise(exc, cause)
 
 
@@ -24,8 +24,8 @@ class ByteOp33(ByteOp32):
         which are found below the cells.
         """
         default_count, kw_default_count, annotate_count = parse_fn_counts_30_35(argc)
-        code, name = self.vm.popn(2)
-        closure = self.vm.pop()
+        code, name = self.vm.pop2()
+        closure = self.vm.pop1()
 
         if kw_default_count:
             kw_default_pairs = self.vm.popn(2 * kw_default_count)
@@ -41,7 +41,7 @@ class ByteOp33(ByteOp32):
             defaults = tuple()
 
         if annotate_count:
-            annotate_names = self.vm.pop()
+            annotate_names = self.vm.pop1()
             annotate_types = self.vm.popn(annotate_count)
             n = len(annotate_names)
             assert n == len(annotate_types)
@@ -64,7 +64,7 @@ class ByteOp33(ByteOp32):
             annotations=annotations,
         )
 
-        self.vm.push(fn)
+        self.vm.push1(fn)
 
     # Changed from 3.2; 3.3 adds annotations.
     def MAKE_FUNCTION(self, argc):
@@ -86,8 +86,8 @@ class ByteOp33(ByteOp32):
 
         # The string function name does not seem to be used.
         # In the 3.4, it is dropped.
-        self.vm.pop()
-        code = self.vm.pop()
+        self.vm.pop1()
+        code = self.vm.pop1()
         name = code.co_name
 
         if kw_default_count:
@@ -99,7 +99,7 @@ class ByteOp33(ByteOp32):
             kwdefaults = {}
 
         if annotate_count:
-            annotate_names = self.vm.pop()
+            annotate_names = self.vm.pop1()
             annotate_objects = self.vm.popn(annotate_count)
             n = len(annotate_objects)
             assert n == len(annotate_names)
@@ -127,13 +127,13 @@ class ByteOp33(ByteOp32):
             annotations=annotations,
         )
 
-        self.vm.push(fn)
+        self.vm.push1(fn)
 
     def YIELD_FROM(self):
         """
         Pops TOS and delegates to it as a subiterator from a generator.
         """
-        u = self.vm.pop()
+        u = self.vm.pop1()
         x = self.vm.top
 
         try:
@@ -144,8 +144,8 @@ class ByteOp33(ByteOp32):
                 retval = x.send(u)
             self.vm.return_value = retval
         except StopIteration as e:
-            self.vm.pop()
-            self.vm.push(e.value)
+            self.vm.pop1()
+            self.vm.push1(e.value)
         else:
             # FIXME: The code has the effect of rerunning the last instruction.
             # I'm not sure if or why it is correct.
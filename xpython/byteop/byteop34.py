@@ -31,7 +31,7 @@ class ByteOp34(ByteOp33):
         consulting the cell. This is used for loading free variables in class
         bodies.
         """
-        self.vm.push(self.vm.frame.cells[count].get())
+        self.vm.push1(self.vm.frame.cells[count].get())
 
     ##############################################################################
     # Order of function here is the same as in:
@@ -65,10 +65,10 @@ class ByteOp34(ByteOp33):
 
         default_count, kw_default_count, annotate_count = parse_fn_counts_30_35(argc)
 
-        name = self.vm.pop()
-        code = self.vm.pop()
+        name = self.vm.pop1()
+        code = self.vm.pop1()
         if annotate_count:
-            annotate_names = self.vm.pop()
+            annotate_names = self.vm.pop1()
             # annotate count includes +1 for the above names
             annotate_objects = self.vm.popn(annotate_count - 1)
             n = len(annotate_objects)
@@ -126,4 +126,4 @@ class ByteOp34(ByteOp33):
             native_fn.__annotations__ = annotations
             self.vm.fn2native[fn] = native_fn
 
-        self.vm.push(fn)
+        self.vm.push1(fn)
@@ -33,7 +33,7 @@ class ByteOp35(ByteOp34):
 
     def build_container_flat(self, count, container_fn):
         elts = self.vm.popn(count)
-        self.vm.push(container_fn(e for elt in elts for e in elt))
+        self.vm.push1(container_fn(e for elt in elts for e in elt))
 
     def get_awaitable_iter(self, o):
         # This helper function returns an awaitable for `o`:
@@ -76,7 +76,7 @@ class ByteOp35(ByteOp34):
         hold count items.
         """
         kvs = self.vm.popn(count * 2)
-        self.vm.push(dict(kvs[i : i + 2] for i in range(0, len(kvs), 2)))
+        self.vm.push1(dict(kvs[i : i + 2] for i in range(0, len(kvs), 2)))
 
     # New in 3.5
 
@@ -88,8 +88,8 @@ class ByteOp35(ByteOp34):
         TOS = self.vm.top
         if isgeneratorfunction(TOS) or iscoroutinefunction(TOS):
             return
-        TOS = self.vm.pop()
-        self.vm.push(iter(TOS))
+        TOS = self.vm.pop1()
+        self.vm.push1(iter(TOS))
 
     # Coroutine opcodes
 
@@ -101,7 +101,7 @@ class ByteOp35(ByteOp34):
         o.__await__.
         """
         raise self.vm.PyVMError("GET_AWAITABLE not implemented yet")
-        iterable = self.vm.pop()
+        iterable = self.vm.pop1()
         iter = self.get_awaitable_iter(iterable)
         if iscoroutinefunction(iter):
             # if iter.get_delegate() is not None:
@@ -109,7 +109,7 @@ class ByteOp35(ByteOp34):
             #     # '.w_yielded_from' is the current awaitable being awaited on.
             #     raise RuntimeError("coroutine is being awaited already")
             pass
-        self.vm.push(iter)
+        self.vm.push1(iter)
 
     def GET_AITER(self):
         """
@@ -117,7 +117,7 @@ class ByteOp35(ByteOp34):
         for details about get_awaitable
         """
         # raise self.vm.PyVMError("GET_AITER not implemented yet")
-        anext_fn = getattr(self.vm.pop(), "__aiter__")
+        anext_fn = getattr(self.vm.pop1(), "__aiter__")
         return self.call_function(anext_fn, [])
 
     def GET_ANEXT(self):
@@ -126,7 +126,7 @@ class ByteOp35(ByteOp34):
         for details about get_awaitable
         """
         # raise self.vm.PyVMError("GET_ANEXT not implemented yet")
-        anext_fn = getattr(self.vm.pop(), "__anext__")
+        anext_fn = getattr(self.vm.pop1(), "__anext__")
         return self.call_function(anext_fn, [])
 
     def BEFORE_ASYNC_WITH(self):
@@ -166,17 +166,17 @@ class ByteOp35(ByteOp34):
             else:
                 exit_method = self.vm.pop(1)
         elif issubclass(TOS, BaseException):
-            fourth, third, second = self.vm.popn(3)
-            tp, exc, tb = self.vm.popn(3)
-            exit_method = self.vm.pop()
-            self.vm.push(None)
+            fourth, third, second = self.vm.pop3()
+            tp, exc, tb = self.vm.pop3()
+            exit_method = self.vm.pop1()
+            self.vm.push1(None)
             self.vm.push(fourth, third, second)
             block = self.vm.pop_block()
             assert block.type == "except-handler"
             self.vm.push_block(block.type, block.handler, block.level - 1)
         exit_ret = exit_method(second, third, fourth)
-        self.vm.push(second)
-        self.vm.push(exit_ret)
+        self.vm.push1(second)
+        self.vm.push1(exit_ret)
 
     def WITH_CLEANUP_FINISH(self):
         """Pops exception type and result of "exit" function call from the stack.
@@ -187,8 +187,8 @@ class ByteOp35(ByteOp34):
         from re-raising the exception. (But non-local gotos will still
         be resumed.)
         """
-        exit_result = self.vm.pop()
-        exception = self.vm.pop()
+        exit_result = self.vm.pop1()
+        exception = self.vm.pop1()
         if (
             exit_result
             and type(exception) is type
@@ -196,7 +196,7 @@ class ByteOp35(ByteOp34):
         ):
             # Pop the exception and replace with "silenced".
             self.vm.popn(1)
-            self.vm.push("silenced")
+            self.vm.push1("silenced")
             return "silenced"
 
     # All of the following opcodes expect arguments. An argument is
@@ -236,7 +236,7 @@ class ByteOp35(ByteOp34):
         result = {}
         for d in elts:
             result.update(d)
-        self.vm.push(result)
+        self.vm.push1(result)
 
     def BUILD_MAP_UNPACK_WITH_CALL(self, oparg):
         """
@@ -259,9 +259,9 @@ class ByteOp35(ByteOp34):
         func = self.vm.pop(fn_pos)
 
         # Put everything in the right order for CALL_FUNCTION_KW
-        self.vm.push(func)
+        self.vm.push1(func)
         if kwargs:
-            self.vm.push(kwargs)
+            self.vm.push1(kwargs)
 
     def CALL_FUNCTION_VAR(self, argc: int):
         """Calls a callable object, similarly to `CALL_FUNCTION_VAR` and
@@ -288,12 +288,12 @@ class ByteOp35(ByteOp34):
         keyword_args = {}
         len_kw, len_pos = divmod(argc, 256)
         for i in range(len_kw):
-            key, val = self.vm.popn(2)
+            key, val = self.vm.pop2()
             keyword_args[key] = val
-        var_args = self.vm.pop()
+        var_args = self.vm.pop1()
         pos_args = self.vm.popn(len_pos)
         pos_args.extend(var_args)
-        func = self.vm.pop()
-        self.call_function_with_args_resolved(
+        func = self.vm.pop1()
+        return self.call_function_with_args_resolved(
             func, pos_args=pos_args, named_args=keyword_args
         )
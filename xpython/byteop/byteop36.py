@@ -80,14 +80,14 @@ class ByteOp36(ByteOp35):
 
     def call_function_kw(self, argc: int):
         namedargs = {}
-        namedargs_tup = self.vm.pop()
+        namedargs_tup = self.vm.pop1()
         for name in reversed(namedargs_tup):
-            namedargs[name] = self.vm.pop()
+            namedargs[name] = self.vm.pop1()
 
         lenPos = argc - len(namedargs_tup)
         posargs = self.vm.popn(lenPos)
-        func = self.vm.pop()
-        self.call_function_with_args_resolved(func, posargs, namedargs)
+        func = self.vm.pop1()
+        return self.call_function_with_args_resolved(func, posargs, namedargs)
 
     ##############################################################################
     # Order of function here is the same as in:
@@ -119,14 +119,14 @@ class ByteOp36(ByteOp35):
         else:
             kwargs = None
 
-        posargs = self.vm.pop()
+        posargs = self.vm.pop1()
         func = self.vm.pop(fn_pos)
 
         # Put everything in the right order for CALL_FUNCTION_EX
-        self.vm.push(func)
-        self.vm.push(posargs)
+        self.vm.push1(func)
+        self.vm.push1(posargs)
         if kwargs:
-            self.vm.push(kwargs)
+            self.vm.push1(kwargs)
 
     def CALL_FUNCTION_KW(self, argc: int):
         """
@@ -164,9 +164,9 @@ class ByteOp36(ByteOp35):
           the code associated with the function (at TOS1)
         * the qualified name of the function (at TOS)
         """
-        qualname = self.vm.pop()
+        qualname = self.vm.pop1()
         name = qualname.split(".")[-1]
-        code = self.vm.pop()
+        code = self.vm.pop1()
 
         slot = {
             "defaults": tuple(),
@@ -180,7 +180,7 @@ class ByteOp36(ByteOp35):
         )
         for i in range(MAKE_FUNCTION_SLOTS):
             if have_param[i]:
-                slot[MAKE_FUNCTION_SLOT_NAMES[i]] = self.vm.pop()
+                slot[MAKE_FUNCTION_SLOT_NAMES[i]] = self.vm.pop1()
 
         # FIXME: DRY with code in byteop3{2,4}.py
 
@@ -211,7 +211,7 @@ class ByteOp36(ByteOp35):
         if fn_vm._func:
             self.vm.fn2native[fn_vm] = fn_vm._func
 
-        self.vm.push(fn_vm)
+        self.vm.push1(fn_vm)
 
     # New in 3.6...
 
@@ -220,7 +220,7 @@ class ByteOp36(ByteOp35):
         """
         Stores TOS as locals()['__annotations__'][co_names[namei]] = TOS.
         """
-        self.vm.frame.f_locals["__annotations__"][name] = self.vm.pop()
+        self.vm.frame.f_locals["__annotations__"][name] = self.vm.pop1()
 
     def SETUP_ASYNC_WITH(self):
         """Creates a new frame object."""
@@ -243,17 +243,17 @@ class ByteOp36(ByteOp35):
         """
         assert isinstance(flags, int)
         if flags & 0x04 == 0x04:
-            format_spec = self.vm.pop()
+            format_spec = self.vm.pop1()
         else:
             format_spec = ""
 
-        value = self.vm.pop()
+        value = self.vm.pop1()
         attr_flags = flags & 0x03
         if attr_flags:
             value = FSTRING_CONVERSION_MAP.get(attr_flags, identity)(value)
 
         result = format(value, format_spec)
-        self.vm.push(result)
+        self.vm.push1(result)
 
     def BUILD_CONST_KEY_MAP(self, count):
         """
@@ -261,10 +261,10 @@ class ByteOp36(ByteOp35):
         values are consumed from the stack. The top element on the
         stack contains a tuple of keys.
         """
-        keys = self.vm.pop()
+        keys = self.vm.pop1()
         values = self.vm.popn(count)
         kvs = dict(zip(keys, values))
-        self.vm.push(kvs)
+        self.vm.push1(kvs)
 
     def CALL_FUNCTION_EX(self, flags):
         """
@@ -284,10 +284,10 @@ class ByteOp36(ByteOp35):
         value returned by the callable object.
         """
         assert isinstance(flags, int)
-        namedargs = self.vm.pop() if flags & 1 else {}
-        posargs = self.vm.pop()
-        func = self.vm.pop()
-        self.call_function_with_args_resolved(func, posargs, namedargs)
+        namedargs = self.vm.pop1() if flags & 1 else {}
+        posargs = self.vm.pop1()
+        func = self.vm.pop1()
+        return self.call_function_with_args_resolved(func, posargs, namedargs)
 
     def SETUP_ANNOTATIONS(self):
         """
@@ -307,7 +307,7 @@ class ByteOp36(ByteOp35):
         """
         assert isinstance(count, int) and count >= 0
         values = self.vm.popn(count)
-        self.vm.push("".join(values))
+        self.vm.push1("".join(values))
 
     def BUILD_TUPLE_UNPACK_WITH_CALL(self, count):
         """
@@ -320,4 +320,4 @@ class ByteOp36(ByteOp35):
         parameters = [
             parameter for sublist in parameter_tuples for parameter in sublist
         ]
-        self.vm.push(parameters)
+        self.vm.push1(parameters)
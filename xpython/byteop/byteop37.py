@@ -2,6 +2,7 @@
 """
 from xpython.byteop.byteop24 import ByteOp24, Version_info
 from xpython.byteop.byteop36 import ByteOp36
+from xpython.pyobj import Function
 
 # Gone in 3.7
 del ByteOp36.STORE_ANNOTATION
@@ -34,6 +35,33 @@ class NullClass:
 NULL = NullClass()
 
 
+def find_unbound_method(obj, name: str):
+    """Return the interpreted Function that getattr(obj, name) would
+    bind to `obj`, or None if that lookup would do something else.
+
+    LOAD_METHOD pushes this Function and `obj`, so that calling it
+    doesn't need a bound Method to be made.
+    """
+    obj_type = type(obj)
+    if obj_type.__getattribute__ is not object.__getattribute__:
+        return None
+    for klass in obj_type.__mro__:
+        method = klass.__dict__.get(name, NULL)
+        if method is not NULL:
+            break
+    else:
+        return None
+    if type(method) is not Function:
+        return None
+    # An instance attribute hides the method. Don't use getattr() here;
+    # it would call any __getattr__() for objects without a __dict__.
+    try:
+        instance_dict = object.__getattribute__(obj, "__dict__")
+    except AttributeError:
+        return method
+    return None if name in instance_dict else method
+
+
 # pylint: disable=too-many-public-methods
 class ByteOp37(ByteOp36):
     """
@@ -78,16 +106,20 @@ class ByteOp37(ByteOp36):
         by CALL_METHOD when calling the unbound method. Otherwise,
         NULL and the object return by the attribute lookup are pushed.
         """
-        TOS = self.vm.pop()
-
-        if hasattr(TOS, name):
-            # FIXME: Figure out how to get an unbound method and self from a callable function.
-            # Until then, we need to push NULL and the callable (the default slow path).
+        TOS = self.vm.pop1()
+
+        method = find_unbound_method(TOS, name)
+        if method is not None:
+            self.vm.push1(method)
+            self.vm.push1(TOS)
+        elif hasattr(TOS, name):
+            # Not an interpreted method, so push NULL and the callable
+            # (the default slow path).
             function = getattr(TOS, name)
             if not callable(function):
                 raise self.vm.PyVMError(f"LOAD_METHOD {name} off of {TOS} of type {type(TOS)} is not callable.")
-            self.vm.push(NULL)
-            self.vm.push(function)
+            self.vm.push1(NULL)
+            self.vm.push1(function)
         else:
             raise self.vm.PyVMError(f"LOAD_METHOD can't find {name} off of {TOS} of type {type(TOS)}")
 
@@ -106,11 +138,18 @@ class ByteOp37(ByteOp36):
         in Python to represent a value outside what Python offers.
         In effect, this is what NULL in C is.
         """
-        posargs = self.vm.popn(count)
-        null_or_meth, self_or_fn = self.vm.popn(2)
+        null_or_meth = self.vm.peek_n(count + 2)
         if null_or_meth is NULL:
-            function = self_or_fn
-            self.call_function_with_args_resolved(function, posargs, {})
+            posargs = self.vm.popn(count)
+            _, function = self.vm.pop2()
+            return self.call_function_with_args_resolved(function, posargs, {})
+        elif type(null_or_meth) is Function and not self.is_pypy:
+            # Self and the arguments are the Function's arguments.
+            # (PyPy's LOOKUP_METHOD pushes something else below them.)
+            posargs = self.vm.popn(count + 1)
+            self.vm.pop1()
+            return self.vm.call_interpreted(null_or_meth, posargs, {})
         else:
+            self.vm.popn(count + 2)
             # FIXME:
             raise self.vm.PyVMError("CALL_METHOD with self and unbound method not implemented yet")
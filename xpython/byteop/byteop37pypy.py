@@ -59,7 +59,7 @@ class ByteOp37PyPy(ByteOp37, ByteOpPyPy):
         # We are going to access parameter off of the stack which is
         # has the last parameter closest to the top.
         # Reverse keyword names in the tuple match our access pattern.
-        kw_names = self.vm.pop()
+        kw_names = self.vm.pop1()
         assert isinstance(kw_names, tuple)
         kw_names = list(reversed(kw_names))
         kwarg_count = len(kw_names)
@@ -69,15 +69,15 @@ class ByteOp37PyPy(ByteOp37, ByteOpPyPy):
         keyword_args = {}
 
         for i in range(kwarg_count):
-            param_value = self.vm.pop()
+            param_value = self.vm.pop1()
             keyword_args[kw_names[i]] = param_value
 
         pos_args = []
         for i in range(pos_argc):
-            pos_args.append(self.vm.pop())
+            pos_args.append(self.vm.pop1())
 
         pos_args = list(reversed(pos_args))
 
-        self.vm.pop()  # cached method slot is not used here.
-        func = self.vm.pop()
+        self.vm.pop1()  # cached method slot is not used here.
+        func = self.vm.pop1()
         return self.call_function_with_args_resolved(func, pos_args, keyword_args)
@@ -44,7 +44,7 @@ class ByteOp38(ByteOp37):
         """Pushes NULL onto the stack for using it in END_FINALLY,
         POP_FINALLY, WITH_CLEANUP_START and
         WITH_CLEANUP_FINISH. Starts the "finally" block."""
-        self.vm.push(None)
+        self.vm.push1(None)
 
     def END_ASYNC_FOR(self):
         """Terminates an `async for1 loop. Handles an exception raised when
@@ -73,7 +73,7 @@ class ByteOp38(ByteOp37):
           exception state. An exception handler block is removed from
           the block stack.
         """
-        v = self.vm.pop()
+        v = self.vm.pop1()
         if v is None:
             why = None
         elif isinstance(v, int):
@@ -82,8 +82,8 @@ class ByteOp38(ByteOp37):
         elif issubclass(v, BaseException):
             # from trepan.api import debug; debug()
             exctype = v
-            val = self.vm.pop()
-            tb = self.vm.pop()
+            val = self.vm.pop1()
+            tb = self.vm.pop1()
             self.vm.last_exception = (exctype, val, tb)
 
             raise self.vm.PyVMError("END_FINALLY not finished yet")
@@ -99,7 +99,7 @@ class ByteOp38(ByteOp37):
         "finally" block as a "subroutine".
         """
         # Is it f_lasti or the one after that
-        self.vm.push(self.vm.frame.f_lasti)
+        self.vm.push1(self.vm.frame.f_lasti)
         self.vm.jump(delta)
 
     def POP_FINALLY(self, preserve_tos: int):
@@ -119,14 +119,14 @@ class ByteOp38(ByteOp37):
         continue and return in the "finally" block.
 
         """
-        v = self.vm.pop()
+        v = self.vm.pop1()
         if v is None:
             why = None
         elif issubclass(v, BaseException):
             # from trepan.api import debug; debug()
             exctype = v
-            val = self.vm.pop()
-            tb = self.vm.pop()
+            val = self.vm.pop1()
+            tb = self.vm.pop1()
             self.vm.last_exception = (exctype, val, tb)
 
             # FIXME: pop 3 more values
@@ -148,6 +148,6 @@ class ByteOp38(ByteOp37):
         for further iterations of the loop.
         """
         # FIXME: the below seems fishy.
-        key, val = self.vm.popn(2)
-        the_map = self.vm.peek(count)
+        key, val = self.vm.pop2()
+        the_map = self.vm.peek_n(count)
         the_map[key] = val
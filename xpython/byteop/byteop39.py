@@ -71,21 +71,21 @@ class ByteOp39(ByteOp38):
         """
         Pushes AssertionError onto the stack. Used by the `assert` statement.
         """
-        self.vm.push(AssertionError)
+        self.vm.push1(AssertionError)
 
     def LIST_TO_TUPLE(self) -> None:
         """
         Pops a list from the stack and pushes a tuple containing the same values.
         """
-        self.vm.push(tuple(self.vm.pop()))
+        self.vm.push1(tuple(self.vm.pop1()))
 
     def IS_OP(self, invert: int) -> None:
         """Performs is comparison, or is not if invert is 1."""
-        TOS1, TOS = self.vm.popn(2)
+        TOS1, TOS = self.vm.pop2()
         if invert:
-            self.vm.push(TOS1 is not TOS)
+            self.vm.push1(TOS1 is not TOS)
         else:
-            self.vm.push(TOS1 is TOS)
+            self.vm.push1(TOS1 is TOS)
         pass
 
     def JUMP_IF_NOT_EXC_MATCH(self, target: int) -> None:
@@ -93,7 +93,7 @@ class ByteOp39(ByteOp38):
         matching TOS, and jumps if it is not.  Pops two values from
         the stack.
         """
-        TOS1, TOS = self.vm.popn(2)
+        TOS1, TOS = self.vm.pop2()
         # FIXME: not sure what operation should be used to test not "matches".
         if not issubclass(TOS1, TOS):
             self.vm.jump(target)
@@ -101,32 +101,32 @@ class ByteOp39(ByteOp38):
 
     def CONTAINS_OP(self, invert: int) -> None:
         """Performs in comparison, or not in if invert is 1."""
-        TOS1, TOS = self.vm.popn(2)
+        TOS1, TOS = self.vm.pop2()
         if invert:
-            self.vm.push(TOS1 not in TOS)
+            self.vm.push1(TOS1 not in TOS)
         else:
-            self.vm.push(TOS1 in TOS)
+            self.vm.push1(TOS1 in TOS)
         return
 
     def LIST_EXTEND(self, i) -> None:
         """Calls list.extend(TOS1[-i], TOS). Used to build lists."""
-        TOS = self.vm.pop()
-        destination = self.vm.peek(i)
+        TOS = self.vm.pop1()
+        destination = self.vm.peek_n(i)
         assert isinstance(destination, list)
         destination.extend(TOS)
 
     def SET_UPDATE(self, i) -> None:
         """Calls set.update(TOS1[-i], TOS). Used to build sets."""
-        TOS = self.vm.pop()
-        destination = self.vm.peek(i)
+        TOS = self.vm.pop1()
+        destination = self.vm.peek_n(i)
         assert isinstance(destination, set)
         destination.update(TOS)
 
     def DICT_MERGE(self, i) -> None:
         """Like DICT_UPDATE but raises an exception for duplicate keys."""
-        TOS = self.vm.pop()
+        TOS = self.vm.pop1()
         assert isinstance(TOS, dict)
-        destination = self.vm.peek(i)
+        destination = self.vm.peek_n(i)
         assert isinstance(destination, dict)
         dups = set(destination.keys()) & set(TOS.keys())
         if bool(dups):
@@ -135,8 +135,8 @@ class ByteOp39(ByteOp38):
 
     def DICT_UPDATE(self, i) -> None:
         """Calls dict.update(TOS1[-i], TOS). Used to build dicts."""
-        TOS = self.vm.pop()
+        TOS = self.vm.pop1()
         assert isinstance(TOS, dict)
-        destination = self.vm.peek(i)
+        destination = self.vm.peek_n(i)
         assert isinstance(destination, dict)
         destination.update(TOS)
@@ -40,14 +40,14 @@ class ByteOpPyPy(object):
         Replaces TOS with getattr(TOS, co_names[namei]).
         Note: name = co_names[namei] set in parse_byte_and_args()
         """
-        obj = self.vm.pop()
+        obj = self.vm.pop1()
         val = getattr(obj, name)
-        self.vm.push(val)
+        self.vm.push1(val)
         if self.version_info[:2] >= (3, 7):
             if inspect.isfunction(val) or inspect.isbuiltin(val):
-                self.vm.push("LOAD_METHOD lookup success")
+                self.vm.push1("LOAD_METHOD lookup success")
             else:
-                self.vm.push("fill in attribute method lookup")
+                self.vm.push1("fill in attribute method lookup")
 
     def CALL_METHOD(self, argc: int):
         """
@@ -0,0 +1,118 @@
+"""Compiling hot interpreted functions to host Python functions.
+
+When the bytecode we interpret is for the Python we are running
+under, the code object of an interpreted function is exactly what
+compile() would produce from its source. So after an interpreted
+function has been called often enough (see PyVM's `compile_threshold`),
+Function.__call__() builds a host function from that code object, and
+further calls run it directly rather than in the interpreter.
+
+This gives up the things only the interpreter can do, so we don't do it
+for code that might notice: code that looks at frames or local
+variables, generators and coroutines, and closures, whose cells are
+interpreter cells. PyVMTraced never compiles, so tracing and breakpoints
+always see every instruction.
+"""
+
+import dis
+import types
+
+from xdis.version_info import IS_PYPY, PYTHON_VERSION_TRIPLE
+
+# Names which suggest the code looks at frames, local variables or
+# tracing. Code using any of these is never compiled.
+INTROSPECTION_NAMES = frozenset(
+    [
+        "_getframe",
+        "breakpoint",
+        "currentframe",
+        "dir",
+        "eval",
+        "exc_info",
+        "exec",
+        "f_back",
+        "f_locals",
+        "gettrace",
+        "locals",
+        "setprofile",
+        "settrace",
+        "stack",
+        "vars",
+    ]
+)
+
+
+def native_code(func):
+    """Return the host Python code object of interpreted function
+    `func`, or None if there is none."""
+    code = func.__code__
+    if not isinstance(code, types.CodeType) and hasattr(code, "to_native"):
+        try:
+            code = code.to_native()
+        except Exception:
+            return None
+    return code if isinstance(code, types.CodeType) else None
+
+
+def can_compile(vm, func, code) -> bool:
+    """Return True if interpreted function `func`, whose host code
+    object is `code`, can be run as a host Python function without anyone
+    noticing."""
+    # Generators and coroutines need the interpreter's Generator objects.
+    from xpython.pyobj import CO_GENERATOR_FLAGS
+
+    if vm.version[:2] != PYTHON_VERSION_TRIPLE[:2] or vm.is_pypy != IS_PYPY:
+        return False
+    if code is None or func.has_dot_zero:
+        return False
+    if code.co_freevars or code.co_flags & CO_GENERATOR_FLAGS:
+        return False
+
+    todo = [code]
+    while todo:
+        code = todo.pop()
+        if INTROSPECTION_NAMES.intersection(code.co_names):
+            return False
+        todo.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    return True
+
+
+def changes_globals(code) -> bool:
+    """Return True if `code`, or code nested in it, can add or delete a
+    global name."""
+    from xpython.quicken import NAMES_ESCAPE_NAMES
+
+    todo = [code]
+    while todo:
+        code = todo.pop()
+        if not NAMES_ESCAPE_NAMES.isdisjoint(code.co_names):
+            return True
+        for inst in dis.get_instructions(code):
+            if inst.opname in ("STORE_GLOBAL", "DELETE_GLOBAL"):
+                return True
+        todo.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    return False
+
+
+def compile_function(vm, func):
+    """Return a host Python function that does what interpreted function
+    `func` does, or None if `func` should stay interpreted."""
+    code = native_code(func)
+    if not can_compile(vm, func, code):
+        return None
+    if vm.names_version is not None and changes_globals(code):
+        # The host Python function would do that without our seeing.
+        vm.names_version = None
+
+    native = types.FunctionType(
+        code,
+        func.func_globals,
+        func.__name__,
+        func.__defaults__ or None,
+        None,
+    )
+    native.__kwdefaults__ = getattr(func, "__kwdefaults__", None) or None
+    native.__annotations__ = getattr(func, "__annotations__", None) or {}
+    native.__qualname__ = getattr(func, "__qualname__", func.__name__)
+    native.__doc__ = func.__doc__
+    return native
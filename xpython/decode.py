@@ -0,0 +1,553 @@
+"""Pre-decoded instruction streams.
+
+Everything needed to run an instruction apart from the frame state --
+folding EXTENDED_ARG prefixes, resolving constants, names and jump
+targets, finding the line number, the offset of the next instruction,
+and the method which implements the opcode -- depends only on the
+code object. So we work this out once per code object rather than
+each time an instruction is executed. Frames, generators and
+recursive calls running the same code all share the decoded stream.
+"""
+
+import dis
+from bisect import bisect_right
+from functools import partial
+
+from xdis import PYTHON_VERSION_TRIPLE, code2num, next_offset, op_has_argument
+from xdis.bytecode import parse_exception_table
+from xdis.cross_dis import xstack_effect
+from xdis.cross_types import UnicodeForPython3
+
+from xpython.linetable import LineTable
+from xpython.quicken import quicken, watch_names
+
+
+# Opcode pairs which are run as a single superinstruction, saving a
+# trip around the interpreter loop. These were picked from the most
+# frequent adjacent opcode pairs, both in the code of the programs under
+# test/bytecode-* and in what is executed when running them. See
+# admin-tools/opcode-pairs.py. The first opcode of each pair never jumps.
+SUPERINSTRUCTIONS = frozenset(
+    [
+        ("BINARY_OP", "STORE_FAST"),
+        ("CALL", "POP_TOP"),
+        ("CALL_FUNCTION", "POP_TOP"),
+        ("CALL_METHOD", "POP_TOP"),
+        ("COMPARE_OP", "POP_JUMP_IF_FALSE"),
+        ("COMPARE_OP", "POP_JUMP_IF_TRUE"),
+        ("COMPARE_OP", "POP_JUMP_FORWARD_IF_FALSE"),
+        ("COMPARE_OP", "POP_JUMP_FORWARD_IF_TRUE"),
+        ("COMPARE_OP", "POP_JUMP_BACKWARD_IF_FALSE"),
+        ("COMPARE_OP", "POP_JUMP_BACKWARD_IF_TRUE"),
+        ("GET_ITER", "FOR_ITER"),
+        ("LOAD_CONST", "BINARY_OP"),
+        ("LOAD_CONST", "COMPARE_OP"),
+        ("LOAD_CONST", "LOAD_CONST"),
+        ("LOAD_CONST", "LOAD_FAST"),
+        ("LOAD_CONST", "RETURN_VALUE"),
+        ("LOAD_FAST", "BINARY_OP"),
+        ("LOAD_FAST", "LOAD_ATTR"),
+        ("LOAD_FAST", "LOAD_CONST"),
+        ("LOAD_FAST", "LOAD_FAST"),
+        ("LOAD_GLOBAL", "LOAD_CONST"),
+        ("LOAD_GLOBAL", "LOAD_FAST"),
+        ("LOAD_NAME", "LOAD_ATTR"),
+        ("LOAD_NAME", "LOAD_CONST"),
+        ("LOAD_NAME", "LOAD_NAME"),
+        ("STORE_FAST", "JUMP_BACKWARD"),
+        ("STORE_FAST", "LOAD_FAST"),
+        ("STORE_NAME", "LOAD_NAME"),
+    ]
+)
+
+
+class Instruction:
+    """A decoded instruction.
+
+    `offset` is the offset of the instruction proper. When the
+    instruction has EXTENDED_ARG prefixes, the same record is also found at
+    the offset of the first prefix.
+
+    `line_number` is the line number reported for the instruction, while
+    `lineno` is the value f_lineno should be set to before running it; it is
+    None when f_lineno doesn't change. The two differ only when a line starts
+    on an EXTENDED_ARG prefix.
+    """
+
+    __slots__ = (
+        "opname",
+        "opcode",
+        "int_arg",
+        "arguments",
+        "offset",
+        "line_number",
+        "lineno",
+        "next_offset",
+        "handler",
+    )
+
+    def __init__(
+        self,
+        opname,
+        opcode,
+        int_arg,
+        arguments,
+        offset,
+        line_number,
+        lineno,
+        next_offset,
+        handler,
+    ) -> None:
+        self.opname = opname
+        self.opcode = opcode
+        self.int_arg = int_arg
+        self.arguments = arguments
+        self.offset = offset
+        self.line_number = line_number
+        self.lineno = lineno
+        self.next_offset = next_offset
+        self.handler = handler
+
+    def step_to(self, next_offset: int):
+        """Return a copy of this instruction that goes on to `next_offset`."""
+        return Instruction(
+            self.opname,
+            self.opcode,
+            self.int_arg,
+            self.arguments,
+            self.offset,
+            self.line_number,
+            self.lineno,
+            next_offset,
+            self.handler,
+        )
+
+    def part(self, offset: int):
+        """Return the instruction run at `offset` when this instruction
+        runs. For most instructions, that is the instruction itself."""
+        return self
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return "<Instruction @%d: %s %r>" % (self.offset, self.opname, self.arguments)
+
+
+class Superinstruction(Instruction):
+    """Instruction `first` followed by instruction `second`, run as a
+    single instruction. It has the offset of `first`.
+    """
+
+    __slots__ = ("first", "second")
+
+    def __init__(self, vm, first: Instruction, second: Instruction) -> None:
+        # Handlers are looked up each time, since quickening may
+        # change them. See xpython.quicken.
+        second_offset, second_lineno = second.offset, second.lineno
+
+        def handler():
+            why = first.handler(*first.arguments)
+            if why is None:
+                frame = vm.frame
+                if frame.fallthrough:
+                    frame.f_lasti = second_offset
+                    if second_lineno is not None:
+                        frame.f_lineno = second_lineno
+                    return second.handler(*second.arguments)
+            return why
+
+        super().__init__(
+            f"{first.opname}+{second.opname}",
+            first.opcode,
+            first.int_arg,
+            [],
+            first.offset,
+            first.line_number,
+            first.lineno,
+            first.next_offset,
+            handler,
+        )
+        self.first = first
+        self.second = second
+
+    def part(self, offset: int) -> Instruction:
+        """Return whichever of `first` or `second` is at `offset`."""
+        return self.second if offset == self.second.offset else self.first
+
+
+def localsplus_names(code) -> tuple:
+    """Return the localsplusnames table for `code` with duplicates removed.
+    As in CPython, this is the local variables, then the cell variables
+    which aren't also local variables, then the free variables."""
+    varnames = code.co_varnames or tuple()
+    return (
+        varnames
+        + tuple(name for name in (code.co_cellvars or tuple()) if name not in varnames)
+        + tuple(name for name in (code.co_freevars or tuple()) if name not in varnames)
+    )
+
+
+def cell_names(code) -> tuple:
+    """Return the names of the cells of a frame running `code`, in
+    the order Frame keeps them: cell variables, then free variables."""
+    return tuple(code.co_cellvars or tuple()) + tuple(code.co_freevars or tuple())
+
+
+def cell_index(version, code, localsplusnames, int_arg: int) -> int:
+    """Return the index in the frame's cells of the cell that the
+    argument `int_arg` of a cell or free variable opcode refers to.
+    Before 3.11 that is `int_arg` itself; from 3.11 on, `int_arg` indexes
+    `localsplusnames` instead."""
+    if version >= (3, 11):
+        return cell_names(code).index(localsplusnames[int_arg])
+    return int_arg
+
+
+def cross_stack_effect(opc, opcode: int, oparg, jump: bool) -> int:
+    """Like dis.stack_effect(), for bytecode of the Python version of
+    opcode module `opc`. A ValueError is raised if the effect isn't known."""
+    opname = opc.opname[opcode]
+    if opname.endswith("_OR_POP"):
+        # Jumping leaves TOS; carrying on pops it.
+        return 0 if jump else -1
+    if opname in ("JUMP_IF_FALSE", "JUMP_IF_TRUE"):
+        # Before 2.7 and 3.1, conditional jumps don't pop TOS.
+        return 0
+    if opname.startswith("SETUP_") and opname != "SETUP_LOOP":
+        # What is pushed on entering the handler of an exception
+        # block, and popped again as it runs, varies too much between
+        # versions for the opcode tables to get right.
+        raise ValueError(f"stack effect of {opname} handler isn't known")
+    if opname == "FOR_ITER":
+        # Running out pops the iterator; the jump target is past any
+        # END_FOR. See decode_argument().
+        return -1 if jump else 1
+    if opname == "BUILD_SLICE":
+        return 1 - oparg
+    effect = xstack_effect(opcode, opc, oparg or 0)
+    if effect is None or effect == -100:
+        raise ValueError(f"unknown stack effect of {opname}")
+    return effect
+
+
+def decode_argument(
+    opc, version, code, localsplusnames, byte_code, bytecode_name, int_arg, arg_offset
+):
+    """Turn the integer argument `int_arg` of opcode `byte_code` into the
+    arguments passed to the method implementing the opcode.
+
+    A tuple of the (possibly adjusted) integer argument and the argument
+    list is returned.
+    """
+    if byte_code in opc.CONST_OPS:
+        arg = code.co_consts[int_arg]
+        if isinstance(arg, UnicodeForPython3):
+            arg = str(arg)
+    elif byte_code in opc.FREE_OPS:
+        arg = cell_index(version, code, localsplusnames, int_arg)
+        if bytecode_name == "MAKE_CELL":
+            # Also pass the index of the local variable the cell is
+            # made from, if there is one.
+            var_num = int_arg if int_arg < len(code.co_varnames) else None
+            return int_arg, [arg, var_num]
+    elif byte_code in opc.NAME_OPS:
+        if version >= (3, 11) and (
+            bytecode_name == "LOAD_GLOBAL"
+            or (version >= (3, 12) and bytecode_name == "LOAD_ATTR")
+        ):
+            namei = code.co_names[int_arg >> 1]
+            push_NULL = bool(int_arg & 1)
+            return int_arg, [namei, push_NULL]
+        arg = code.co_names[int_arg]
+        if isinstance(arg, UnicodeForPython3):
+            arg = str(arg)
+
+    elif byte_code in opc.JREL_OPS:
+        # Many relative jumps are conditional,
+        # so setting f.fallthrough is wrong.
+
+        if version >= (3, 10):
+            if bytecode_name.find("_BACKWARD") > 0 and version >= (3, 11):
+                int_arg = -int_arg
+            int_arg += int_arg
+        arg = arg_offset + int_arg
+        if bytecode_name == "FOR_ITER" and version >= (3, 12):
+            # 3.12 jumps one more instruction for reasons I can't find
+            # well documented.
+            arg += 2
+
+    elif byte_code in opc.JABS_OPS:
+        # We probably could set fallthough, since many (all?)
+        # of these are unconditional, but we'll make the jump do
+        # the work of setting.
+        if version >= (3, 10, 0):
+            int_arg += int_arg
+        arg = int_arg
+    elif byte_code in opc.LOCAL_OPS:
+        # The index in co_varnames, which is also the index in the
+        # frame's fast locals.
+        arg = int_arg
+    else:
+        arg = int_arg
+    return int_arg, [arg]
+
+
+class DecodedCode:
+    """The decoded instruction stream of a code object.
+
+    `instructions` is indexed by bytecode offset. Offsets which are not
+    the start of an instruction hold None.
+    """
+
+    def __init__(self, vm, code) -> None:
+        self.code = code
+        self.vm = vm
+        self.localsplusnames = localsplus_names(code)
+        self.line_table = LineTable(code)
+        self.linestarts = self.line_table.linestarts
+        co_code = code.co_code
+        self.instructions = [None] * len(co_code)
+
+        # The instruction stream with superinstructions, and the one
+        # eval_frame() runs. These are filled in by superinstructions()
+        # and runnable() when first needed.
+        self.fused_instructions = None
+        self.runnable_instructions = None
+
+        # Maps the offset of each loop head to the number of times
+        # the loop has gone around. See xpython.loops.
+        self.loop_counts = {}
+
+        # For 3.11+, the entries of the exception table sorted by start
+        # offset, and those start offsets. These are filled in by
+        # exception_handler() when first needed.
+        self.exception_entries = None
+        self.exception_starts = None
+
+        offset = 0
+        while offset < len(co_code):
+            try:
+                inst = self.decode_at(offset)
+            except Exception:
+                # Not everything after the last instruction is necessarily
+                # decodable. If we ever get here, decode_at() raises
+                # the error again.
+                offset = next_offset(co_code[offset], vm.opc, offset)
+                continue
+            offset = inst.next_offset
+
+    def decode_at(self, offset: int) -> Instruction:
+        """Decode the instruction starting at `offset`, record it, and
+        return it. This mirrors what PyVM.parse_byte_and_args() does
+        when run at `offset`."""
+        vm = self.vm
+        opc = vm.opc
+        version = vm.version
+        code = self.code
+        co_code = code.co_code
+        linestarts = self.linestarts
+
+        start = offset
+        extended_arg = 0
+        int_arg = None
+        arguments = []
+        lineno = None
+        while True:
+            line_number = linestarts.get(offset, None)
+            if line_number is not None:
+                lineno = line_number
+            byte_code = co_code[offset]
+            bytecode_name = opc.opname[byte_code]
+
+            arg_offset = offset + 1
+            if op_has_argument(byte_code, opc):
+                if version >= (3, 6):
+                    int_arg = code2num(co_code, arg_offset) | extended_arg
+                    arg_offset += 1
+                    if byte_code == opc.EXTENDED_ARG:
+                        extended_arg = int_arg << 8
+                        offset = next_offset(byte_code, opc, offset)
+                        continue
+                else:
+                    int_arg = (
+                        code2num(co_code, arg_offset)
+                        + code2num(co_code, arg_offset + 1) * 256
+                        + extended_arg
+                    )
+                    arg_offset += 2
+                    if byte_code == opc.EXTENDED_ARG:
+                        extended_arg = int_arg * 65536
+                        offset = next_offset(byte_code, opc, offset)
+                        continue
+
+                int_arg, arguments = decode_argument(
+                    opc,
+                    version,
+                    code,
+                    self.localsplusnames,
+                    byte_code,
+                    bytecode_name,
+                    int_arg,
+                    arg_offset,
+                )
+            break
+
+        handlers = vm.byteop.operand_dispatch.get(byte_code)
+        if handlers is None:
+            handler = vm.byteop.dispatch_table[byte_code]
+        else:
+            handler = handlers[int_arg]
+
+        inst = Instruction(
+            bytecode_name,
+            byte_code,
+            int_arg,
+            arguments,
+            offset,
+            line_number,
+            lineno,
+            next_offset(byte_code, opc, offset),
+            handler,
+        )
+        self.instructions[start] = self.instructions[offset] = inst
+        return inst
+
+    def exception_handler(self, offset: int):
+        """Return the entry of the 3.11+ exception table which covers
+        the instruction at `offset`, or None if no entry does."""
+        if self.exception_starts is None:
+            entries = parse_exception_table(self.code.co_exceptiontable)
+            entries.sort(key=lambda entry: entry.start)
+            self.exception_entries = entries
+            self.exception_starts = [entry.start for entry in entries]
+
+        # Entries don't overlap, so only the last one starting at or
+        # before `offset` can cover it.
+        i = bisect_right(self.exception_starts, offset) - 1
+        if i >= 0:
+            entry = self.exception_entries[i]
+            if offset < entry.end:
+                return entry
+        return None
+
+    def max_stack_depth(self):
+        """Return the deepest the value stack can get running the code,
+        worked out from the stack effect of each instruction reachable
+        from the start or from a 3.11+ exception handler. None is
+        returned if the stack effect of some instruction isn't known.
+
+        Each instruction is looked at once, with the depth it is first
+        reached with. The stack effects of the opcodes of Python versions
+        other than the one we run under come from the xdis opcode
+        tables, so for those this is a close estimate.
+        """
+        vm = self.vm
+        opc = vm.opc
+        instructions = self.instructions
+        jump_ops = frozenset(opc.JREL_OPS) | frozenset(opc.JABS_OPS)
+        ends_block = frozenset(opc.JUMP_UNCONDITIONAL) | frozenset(
+            opc.opmap[name]
+            for name in ("RETURN_VALUE", "RETURN_CONST", "RAISE_VARARGS", "RERAISE")
+            if name in opc.opmap
+        )
+        if vm.version[:2] == PYTHON_VERSION_TRIPLE[:2] and not vm.is_pypy:
+            stack_effect = dis.stack_effect
+        else:
+            stack_effect = partial(cross_stack_effect, opc)
+
+        todo = [(0, 0)]
+        if vm.version >= (3, 11):
+            for entry in parse_exception_table(self.code.co_exceptiontable):
+                # The handler is entered with the exception pushed, and
+                # the offset of the raising instruction below it if lasti.
+                todo.append((entry.target, entry.depth + 1 + int(entry.lasti)))
+
+        seen = set()
+        deepest = 0
+        while todo:
+            offset, depth = todo.pop()
+            if offset in seen or not 0 <= offset < len(instructions):
+                continue
+            seen.add(offset)
+            inst = instructions[offset]
+            if inst is None:
+                continue
+            opcode = inst.opcode
+            oparg = inst.int_arg if op_has_argument(opcode, opc) else None
+            try:
+                if opcode in jump_ops:
+                    jump_depth = depth + stack_effect(opcode, oparg, jump=True)
+                    deepest = max(deepest, jump_depth)
+                    todo.append((inst.arguments[0], jump_depth))
+                depth += stack_effect(opcode, oparg, jump=False)
+            except (TypeError, ValueError):
+                return None
+            deepest = max(deepest, depth)
+            if opcode not in ends_block:
+                todo.append((inst.next_offset, depth))
+        return deepest
+
+    def runnable(self) -> list:
+        """Return the instruction stream that PyVM.eval_frame() runs. This
+        has superinstructions and quickened instructions if the VM
+        asks for them."""
+        if self.runnable_instructions is None:
+            vm = self.vm
+            if vm.superinstructions:
+                instructions = self.superinstructions()
+            else:
+                instructions = self.instructions
+            if vm.quicken:
+                quicken(vm, instructions)
+                watch_names(vm, self.code)
+            self.runnable_instructions = instructions
+        return self.runnable_instructions
+
+    def superinstructions(self) -> list:
+        """Return the instruction stream rewritten for running:
+
+        * CACHE entries, which do nothing, are stepped over, and
+        * adjacent pairs listed in SUPERINSTRUCTIONS are fused into
+          single instructions.
+
+        A fused instruction replaces the first instruction of the pair.
+        The second instruction is still found at its own offset, so
+        jumps to it run it by itself.
+        """
+        if self.fused_instructions is not None:
+            return self.fused_instructions
+
+        # The offsets each instruction is found at. There is more than
+        # one when there are EXTENDED_ARG prefixes.
+        offsets = {}
+        for offset, inst in enumerate(self.instructions):
+            if inst is not None:
+                offsets.setdefault(inst, []).append(offset)
+
+        originals = [inst for inst in offsets if inst.opname != "CACHE"]
+        sequence = list(originals)
+        for i, inst in enumerate(sequence[:-1]):
+            following = sequence[i + 1]
+            if inst.next_offset != following.offset and all(
+                other is None or other.opname == "CACHE"
+                for other in self.instructions[inst.next_offset : following.offset]
+            ):
+                sequence[i] = inst.step_to(following.offset)
+
+        instructions = self.fused_instructions = list(self.instructions)
+        first = None
+        for original, inst in zip(originals, sequence):
+            for offset in offsets[original]:
+                instructions[offset] = inst
+            if (
+                first is not None
+                and first.next_offset == inst.offset
+                and (first.opname, inst.opname) in SUPERINSTRUCTIONS
+                and first.handler is not None
+                and inst.handler is not None
+            ):
+                fused = Superinstruction(self.vm, first, inst)
+                for offset in offsets[first_original]:
+                    instructions[offset] = fused
+                first = None
+            else:
+                first, first_original = inst, original
+        return instructions
@@ -65,6 +65,15 @@ def source_is_older(source_path: str, bytecode_path: str) -> Optional[bool]:
         return None
 
 
+def ignore_event(
+    event, offset, bytecode_name, byte_code, line_number, int_arg, event_arg, vm
+):
+    """A PyVMTraced callback which lets the program run as it would
+    without one. This is used for the "traced" eval loop when no
+    callback is given."""
+    return True
+
+
 def exec_code_object(
     code,
     env,
@@ -72,8 +81,11 @@ def exec_code_object(
     python_implementation=PYTHON_IMPLEMENTATION,
     callback=None,
     format_instruction=format_instruction,
+    eval_loop="reference",
 ) -> int:
     rc = 0
+    if eval_loop == "traced" and not callback:
+        callback = ignore_event
     if callback:
         vm = PyVMTraced(
             callback,
@@ -93,7 +105,12 @@ def exec_code_object(
     else:
         if python_version != PYTHON_VERSION_TRIPLE[:2]:
             make_compatible_builtins(BUILTINS.__dict__, python_version)
-        vm = PyVM(python_version, python_implementation, format_instruction_func=format_instruction)
+        vm = PyVM(
+            python_version,
+            python_implementation,
+            format_instruction_func=format_instruction,
+            eval_loop=eval_loop,
+        )
         try:
             rc = vm.run_code(code, f_globals=env)
         except PyVMUncaughtException:
@@ -128,7 +145,7 @@ def rsplit1(s, sep):
     return sep.join(parts[:-1]), parts[-1]
 
 
-def run_python_module(modulename, args):
+def run_python_module(modulename, args, eval_loop="reference"):
     """Run a python module, as though with ``python -m name args...``.
 
     `modulename` is the name of the module, possibly a dot-separated name.
@@ -172,11 +189,16 @@ def run_python_module(modulename, args):
 
     # Finally, hand the file off to run_python_file for execution.
     args[0] = pathname
-    run_python_file(pathname, args, package=packagename)
+    run_python_file(pathname, args, package=packagename, eval_loop=eval_loop)
 
 
 def run_python_file(
-    filename, args, package=None, callback=None, format_instruction=format_instruction
+    filename,
+    args,
+    package=None,
+    callback=None,
+    format_instruction=format_instruction,
+    eval_loop="reference",
 ):
     """Run a python file as if it were the main program on the command line.
 
@@ -188,6 +210,9 @@ def run_python_file(
     If `callback` is not None, it is a function which is called back as the
     execution progresses. This can be used for example in a debugger, or
     for custom tracing or statistics gathering.
+
+    `eval_loop` names the eval loop to run the program with; see
+    xpython.vm.EVAL_LOOPS.
     """
     # Create a module to serve as __main__
     old_main_mod = sys.modules["__main__"]
@@ -282,6 +307,7 @@ def run_python_file(
             python_implementation,
             callback,
             format_instruction=format_instruction,
+            eval_loop=eval_loop,
         )
 
     finally:
@@ -296,7 +322,12 @@ def run_python_file(
 
 
 def run_python_string(
-    source, args, package=None, callback=None, format_instruction=format_instruction
+    source,
+    args,
+    package=None,
+    callback=None,
+    format_instruction=format_instruction,
+    eval_loop="reference",
 ):
     """Run a python string as if it were the main program on the command line."""
     # Create a module to serve as __main__
@@ -335,6 +366,7 @@ def run_python_string(
             IS_PYPY,
             callback,
             format_instruction=format_instruction,
+            eval_loop=eval_loop,
         )
 
     finally:
@@ -0,0 +1,65 @@
+"""Reusing frames.
+
+Making a Frame is a good part of the cost of a call. A FramePool keeps
+the frames of functions which have returned, a few per code object, so
+that the next call of the same code can reset one of them and run it,
+rather than building a new one.
+
+A frame is only kept if nothing can still refer to it once it has
+returned: it must be an optimized function frame (see
+Frame.optimized), not the frame of a generator or coroutine, and no
+Traceback may have been made for it. The frame's cells are made afresh
+on each reuse, so closures made by an earlier run keep theirs.
+"""
+
+from xpython.pyobj import Frame
+
+# Number of returned frames kept for each code object.
+FRAME_POOL_SIZE = 8
+
+# Number of code objects we keep frames for.
+FRAME_POOL_CODES = 256
+
+
+class FramePool:
+    """Returned frames kept for reuse, up to `size` for each of up to
+    `max_codes` code objects. `hits` and `misses` count the calls to
+    acquire() which did and didn't find a frame."""
+
+    __slots__ = ("size", "max_codes", "free", "hits", "misses")
+
+    def __init__(self, size: int = FRAME_POOL_SIZE, max_codes: int = FRAME_POOL_CODES):
+        self.size = size
+        self.max_codes = max_codes
+        # Keyed by id(code), as PyVM.decoded_codes is; a kept frame
+        # keeps its code alive, so the id isn't reused.
+        self.free = {}
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, code):
+        """Return a kept frame for `code`, to be reset by the caller, or
+        None if there is none."""
+        frames = self.free.get(id(code))
+        if frames:
+            self.hits += 1
+            return frames.pop()
+        self.misses += 1
+        return None
+
+    def release(self, frame: Frame) -> None:
+        """Keep `frame`, which has returned, for reuse if there is room."""
+        key = id(frame.f_code)
+        frames = self.free.get(key)
+        if frames is None:
+            if not self.size or len(self.free) >= self.max_codes:
+                return
+            frames = self.free[key] = []
+        elif len(frames) >= self.size:
+            return
+        frame.clear()
+        frames.append(frame)
+
+    def clear(self) -> None:
+        """Drop all kept frames."""
+        self.free.clear()
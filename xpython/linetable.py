@@ -0,0 +1,35 @@
+"""Line number tables of code objects.
+
+A LineTable holds everything we need to know about the line numbers of
+a code object. It is worked out once per code object (see
+DecodedCode), and shared, unchanged, by every frame running that code.
+"""
+
+from array import array
+from bisect import bisect_right
+
+from xdis.cross_dis import findlinestarts
+
+
+class LineTable:
+    """The line number table of code object `code`.
+
+    `linestarts` maps the offset of each instruction which starts a line
+    to its line number. `offsets` and `line_numbers` hold the same
+    information sorted by offset, for looking up the line number of any
+    offset.
+    """
+
+    __slots__ = ("linestarts", "offsets", "line_numbers")
+
+    def __init__(self, code) -> None:
+        self.linestarts = dict(findlinestarts(code, dup_lines=True))
+        starts = sorted(self.linestarts.items())
+        self.offsets = array("i", [offset for offset, _ in starts])
+        self.line_numbers = array("i", [line_number for _, line_number in starts])
+
+    def line_number(self, offset: int) -> int:
+        """Return the line number of the instruction at `offset`, or 0 if
+        it comes before the first line start."""
+        i = bisect_right(self.offsets, offset)
+        return self.line_numbers[i - 1] if i else 0
@@ -0,0 +1,201 @@
+"""Compiling hot loops into traces.
+
+PyVM.eval_frame() counts the backward jumps to each loop head. Once a
+loop has gone around `LOOP_THRESHOLD` times, the instruction at its head
+is replaced by a LoopRecorder. The next time around, this runs the
+instructions of the loop body itself, noting each instruction and where
+it went next. If that iteration comes back to the head without anything
+unusual happening, the instructions seen are compiled into a single
+Python function, a LoopTrace, which replaces the head instruction from
+then on.
+
+A LoopTrace runs the recorded instructions one after the other, for as
+many iterations as it can, with no trip around the interpreter loop.
+After each instruction it checks that it went where it did when
+recorded. When it didn't, say a branch went the other way, the loop is
+left, or an exception was raised, the trace returns and eval_frame()
+carries on from wherever the instruction went, just as if it had run
+the instruction itself.
+
+This is most useful for loops in module-level code and in functions
+which can't be compiled whole (see xpython.compiler).
+"""
+
+from xpython.decode import Instruction
+
+# Number of times a loop goes around before we record a trace of it.
+LOOP_THRESHOLD = 16
+
+# Number of further times a loop goes around before we try again, after
+# recording a trace of it failed.
+LOOP_BACKOFF = 1024
+
+# The longest trace we record. Longer loop bodies are left alone.
+MAX_TRACE_LENGTH = 200
+
+
+def count_loop(vm, decoded, instructions: list, head: int) -> None:
+    """Note that the loop of `decoded` whose first instruction is at
+    offset `head` has gone around once more, and arrange to record it
+    when it gets hot. `instructions` is the instruction stream being run."""
+    loop_counts = decoded.loop_counts
+    count = loop_counts.get(head, 0) + 1
+    loop_counts[head] = count
+    if count == LOOP_THRESHOLD:
+        inst = instructions[head]
+        if inst is not None and not isinstance(inst, LoopInstruction):
+            instructions[head] = LoopRecorder(vm, decoded, instructions, head)
+
+
+class LoopInstruction(Instruction):
+    """An instruction standing in for instruction `head` at the start
+    of a loop, which runs more than just `head`."""
+
+    __slots__ = ("head", "steps")
+
+    def __init__(self, head: Instruction, handler) -> None:
+        super().__init__(
+            head.opname,
+            head.opcode,
+            head.int_arg,
+            [],
+            head.offset,
+            head.line_number,
+            head.lineno,
+            head.next_offset,
+            handler,
+        )
+        self.head = head
+        # The instructions run so far, with the f_lasti and fallthrough
+        # each of them left.
+        self.steps = []
+
+    def part(self, offset: int) -> Instruction:
+        """Return the instruction run at `offset`."""
+        for inst, _, _ in self.steps:
+            inst = inst.part(offset)
+            if inst.offset == offset:
+                return inst
+        return self.head.part(offset)
+
+
+class LoopRecorder(LoopInstruction):
+    """Records one iteration of the loop starting at offset `key` of
+    `instructions`, and installs a LoopTrace of it."""
+
+    __slots__ = ("vm", "decoded", "instructions", "key")
+
+    def __init__(self, vm, decoded, instructions: list, key: int) -> None:
+        super().__init__(instructions[key], self.record)
+        self.vm = vm
+        self.decoded = decoded
+        self.instructions = instructions
+        self.key = key
+
+    def record(self):
+        vm = self.vm
+        frame = vm.frame
+        instructions = self.instructions
+        steps = self.steps
+        inst = self.head
+        seen = set()
+        while True:
+            try:
+                why = inst.handler(*inst.arguments)
+                if why == "call":
+                    why = vm.finish_call()
+            except Exception:
+                steps.append((inst, frame.f_lasti, frame.fallthrough))
+                self.give_up()
+                raise
+            steps.append((inst, frame.f_lasti, frame.fallthrough))
+            if why is not None:
+                break
+
+            # Find the next instruction, as eval_frame() does.
+            if frame.fallthrough:
+                current = instructions[frame.f_lasti]
+                if current is None:
+                    break
+                offset = current.next_offset
+            else:
+                offset = frame.f_lasti
+            if offset == self.key:
+                instructions[self.key] = LoopTrace(vm, self.head, steps)
+                return None
+
+            inst = instructions[offset]
+            if (
+                inst is None
+                or offset in seen
+                or len(steps) >= MAX_TRACE_LENGTH
+                or isinstance(inst, LoopInstruction)
+            ):
+                # Not something we trace. Leave the frame as the last
+                # instruction left it; eval_frame() takes it from there.
+                break
+            seen.add(offset)
+
+            frame.fallthrough = True
+            frame.f_lasti = inst.offset
+            if inst.lineno is not None:
+                frame.f_lineno = inst.lineno
+            vm.in_exception_processing = False
+
+        self.give_up()
+        return why
+
+    def give_up(self) -> None:
+        """Put back the instruction at the head of the loop, and wait a
+        while before trying to record the loop again."""
+        self.instructions[self.key] = self.head
+        self.decoded.loop_counts[self.key] = LOOP_THRESHOLD - LOOP_BACKOFF
+
+
+class LoopTrace(LoopInstruction):
+    """Runs the recorded iteration `steps` of the loop starting with
+    instruction `head` for as long as later iterations do the same."""
+
+    __slots__ = ()
+
+    def __init__(self, vm, head: Instruction, steps: list) -> None:
+        super().__init__(head, compile_trace(vm, steps))
+        self.steps = steps
+
+
+def compile_trace(vm, steps: list):
+    """Return a function which runs the instructions of `steps` over and
+    over, returning when any of them doesn't do what it did when
+    recorded."""
+    # Handlers are looked up each time, since quickening may change
+    # them. See xpython.quicken.
+    namespace = {"vm": vm}
+    lines = ["def trace():", "    frame = vm.frame", "    while True:"]
+    for i, (inst, f_lasti, fallthrough) in enumerate(steps):
+        namespace["I%d" % i] = inst
+        namespace["A%d" % i] = inst.arguments
+        lines.append("        frame.f_lasti = %d" % inst.offset)
+        if inst.lineno is not None:
+            lines.append("        frame.f_lineno = %d" % inst.lineno)
+        lines += [
+            "        vm.in_exception_processing = False",
+            "        why = I%d.handler(*A%d)" % (i, i),
+        ]
+        if "CALL" in inst.opname:
+            # Calls made by a trace are run to completion here.
+            lines.append(
+                '        if why == "call": why = vm.finish_call(%d)'
+                % inst.part(inst.offset).next_offset
+            )
+        elif "LOAD_ATTR" in inst.opname:
+            # Likewise property getters.
+            lines.append('        if why == "call": why = vm.finish_call()')
+        lines += [
+            "        if why is not None or frame.f_lasti != %d or %sframe.fallthrough:"
+            % (f_lasti, "not " if fallthrough else ""),
+            "            return why",
+        ]
+        if not fallthrough:
+            lines.append("        frame.fallthrough = True")
+    exec(compile("\n".join(lines), "<loop trace>", "exec"), namespace)
+    return namespace["trace"]
@@ -7,16 +7,33 @@ import types
 from copy import copy
 from sys import stderr
 
-from xdis import CO_GENERATOR, CO_ITERABLE_COROUTINE, iscode
-from xdis.cross_dis import findlinestarts
+from xdis import (
+    CO_ASYNC_GENERATOR,
+    CO_COROUTINE,
+    CO_GENERATOR,
+    CO_ITERABLE_COROUTINE,
+    CO_NEWLOCALS,
+    CO_OPTIMIZED,
+    CO_VARARGS,
+    CO_VARKEYWORDS,
+    iscode,
+)
 from xdis.version_info import PYTHON_VERSION_TRIPLE
 from xpython.stdlib.types34 import _AsyncGeneratorWrapper
 
+from xpython.compiler import compile_function
+from xpython.linetable import LineTable
 import xpython.stdlib.inspect2 as inspect2
 import xpython.stdlib.inspect3 as inspect3
 
 from xpython.stdlib.types34 import ModuleType
 
+# Code with any of these flags runs in a frame that outlives the call
+# making it.
+CO_GENERATOR_FLAGS = (
+    CO_GENERATOR | CO_COROUTINE | CO_ITERABLE_COROUTINE | CO_ASYNC_GENERATOR
+)
+
 
 def copy_module(old_module) -> ModuleType:
     """
@@ -94,6 +111,10 @@ class Function:
         # "__doc__" is filled in by the doc comment above.
         "_vm",
         "_func",
+        "_calls",
+        "_native",
+        "_compiled_for",
+        "_binder",
     ]
 
     def __init__(
@@ -113,6 +134,16 @@ class Function:
         self.version = vm.version
         self.__doc__ = doc
 
+        # Number of calls so far, and the host function we run instead
+        # once this is hot, with the code, defaults and keyword defaults
+        # it was made for. See xpython.compiler.
+        self._calls = 0
+        self._native = None
+        self._compiled_for = None
+
+        # Binds the arguments of calls. See ArgBinder.
+        self._binder = None
+
         if name is not None and not isinstance(name, str):
             raise TypeError(
                 f"Function() argument 1 (name) must None or string, not {type(name)}"
@@ -147,7 +178,9 @@ class Function:
         self.func_closure = self.__closure__ = closure
 
         self.func_globals = globs
-        self.func_locals = vm.frame.f_locals
+        # The frame's own locals dictionary, if it has one yet; asking
+        # for f_locals would build one for every function made.
+        self.func_locals = vm.frame.locals_dict
         self.__dict__ = {"version": vm.version, "_vm": vm}
 
         self.__doc__ = (
@@ -242,6 +275,33 @@ class Function:
             return self
 
     def __call__(self, *args, **kwargs):
+        native = self.native_function()
+        if native is not None:
+            return native(*args, **kwargs)
+
+        frame = self.make_call_frame(args, kwargs)
+        if self.__code__.co_flags & CO_GENERATOR:
+            qualname = self.__qualname__ if self._vm.version >= (3, 4) else None
+            gen = Generator(
+                g_frame=frame, name=self.__name__, qualname=qualname, vm=self._vm
+            )
+            if self.__code__.co_flags & CO_ITERABLE_COROUTINE:
+                gen = _AsyncGeneratorWrapper(gen)
+                frame.generator = gen
+                return gen
+
+            frame.generator = gen
+            retval = gen
+        else:
+            retval = self._vm.eval_frame(frame)
+        return retval
+
+    def make_call_frame(self, args: tuple, kwargs: dict):
+        """Return the frame for running a call of this function with
+        `args` and `kwargs`, raising the TypeError a call would raise
+        when they don't fit."""
+        code = self.func_code
+        fast_locals = None
         if self.has_dot_zero:
             # D'oh! http://bugs.python.org/issue19611 Py2 doesn't know how to
             # inspect set comprehensions, dict comprehensions, or generator
@@ -249,7 +309,81 @@ class Function:
             # so just do the right thing.
             assert len(args) == 1 and not kwargs, "Surprising comprehension!"
             callargs = {".0": args[0]}
-        elif self._func and self.version[:2] == PYTHON_VERSION_TRIPLE[:2]:
+        elif code.co_flags & CO_OPTIMIZED and code.co_flags & CO_NEWLOCALS:
+            if self.version >= (3, 0):
+                defaults, kwdefaults = self.__defaults__, self.__kwdefaults__
+            else:
+                defaults, kwdefaults = self.func_defaults, None
+            binder = self._binder
+            if binder is None or not binder.matches(code, defaults, kwdefaults):
+                binder = self._binder = ArgBinder(
+                    code, defaults or (), kwdefaults, self.getcallargs
+                )
+            fast_locals = binder.bind(args, kwargs)
+            callargs = {}
+        else:
+            callargs = self.getcallargs(args, kwargs)
+
+        return self._vm.make_frame(
+            code,
+            callargs,
+            self.func_globals,
+            {},
+            self.__closure__,
+            fast_locals=fast_locals,
+        )
+
+    def native_function(self):
+        """Count a call of this function, compiling it once it is hot,
+        and return the host function to run the call with instead, or
+        None. See xpython.compiler.
+
+        The host function was made with the code and defaults this
+        function had then; if any of them has been changed since, it is
+        dropped and counting starts again."""
+        native = self._native
+        if native is not None:
+            code, defaults, kwdefaults = self._compiled_for
+            if (
+                self.__code__ is code
+                and self.__defaults__ is defaults
+                and self.__kwdefaults__ is kwdefaults
+            ):
+                return native
+            self._native = self._compiled_for = None
+            self._calls = 0
+        compile_threshold = self._vm.compile_threshold
+        if compile_threshold is not None and self._calls is not None:
+            self._calls += 1
+            if self._calls >= compile_threshold:
+                # Once is enough, whether or not this works.
+                self._calls = None
+                self._native = compile_function(self._vm, self)
+                if self._native is not None:
+                    self._compiled_for = (
+                        self.__code__,
+                        self.__defaults__,
+                        self.__kwdefaults__,
+                    )
+        return self._native
+
+    def frame_to_enter(self, args: tuple, kwargs: dict):
+        """Return the frame for a call of this function with `args` and
+        `kwargs` that the eval loop can run in place, or None if the
+        call has to go through __call__(): this is a generator or
+        coroutine function, or one that has been compiled. The call is
+        counted, as __call__() counts it; see native_function()."""
+        if self.__code__.co_flags & CO_GENERATOR_FLAGS:
+            return None
+        if self.native_function() is not None:
+            return None
+        return self.make_call_frame(args, kwargs)
+
+    def getcallargs(self, args: tuple, kwargs: dict) -> dict:
+        """Return the mapping of parameter names to the values bound to
+        them for a call with `args` and `kwargs`, the way getcallargs()
+        does, raising the TypeError it raises when they don't fit."""
+        if self._func and self.version[:2] == PYTHON_VERSION_TRIPLE[:2]:
             # Perhaps this branch can go and we just use the others.
             # It will require a *lot* more code from inspect.py to be added:
             # classes Signature, Parameter, etc.
@@ -269,31 +403,23 @@ class Function:
                 callargs = inspect3.getcallargs(self, *args, **kwargs)
             else:
                 callargs = inspect2.getcallargs(self, *args, **kwargs)
-
-        frame = self._vm.make_frame(
-            self.func_code, callargs, self.func_globals, {}, self.__closure__
-        )
-        if self.__code__.co_flags & CO_GENERATOR:
-            qualname = self.__qualname__ if self._vm.version >= (3, 4) else None
-            gen = Generator(
-                g_frame=frame, name=self.__name__, qualname=qualname, vm=self._vm
-            )
-            if self.__code__.co_flags & CO_ITERABLE_COROUTINE:
-                gen = _AsyncGeneratorWrapper(gen)
-                frame.generator = gen
-                return gen
-
-            frame.generator = gen
-            retval = gen
-        else:
-            retval = self._vm.eval_frame(frame)
-        return retval
+        return callargs
 
 
 # FIXME: go over. Not sure how close This is supposed to be
 # like type.MethodType
+# Create a bound instance method object. This has no docstring, since
+# __doc__ is an instance attribute.
 class Method(object):
-    """Create a bound instance method object."""
+    __slots__ = (
+        "__doc__",
+        "im_self",
+        "im_class",
+        "im_func",
+        "func_code",
+        "__name__",
+        "__code__",
+    )
 
     def __init__(self, obj, _class, func) -> None:
         self.__doc__ = obj.__doc__
@@ -345,6 +471,8 @@ class Cell:
 
     """
 
+    __slots__ = ("contents",)
+
     def __init__(self, value) -> None:
         self.contents = value
 
@@ -372,6 +500,8 @@ class Block(object):
 
     """
 
+    __slots__ = ("type", "handler", "level")
+
     def __init__(self, type, handler, level) -> None:
         self.type = type
         self.handler = handler
@@ -389,7 +519,229 @@ class Block(object):
             )
 
 
+class _Unbound:
+    """The type of UNBOUND."""
+
+    def __repr__(self) -> str:
+        return "<unbound>"
+
+
+# The value of a fast local variable which has not been assigned to.
+UNBOUND = _Unbound()
+
+
+class ArgBinder:
+    """Binds arguments for a call of code object `code` with positional
+    defaults `defaults` and keyword-only defaults `kwdefaults`.
+
+    Everything that depends only on those is worked out once, so that
+    the arguments of each call go straight into a new fast locals list,
+    without the signature being worked out again by getcallargs() and
+    without a callargs dict. A Function keeps a binder for as long as
+    its code and defaults stay the same; see Function.__call__.
+
+    `fallback(args, kwargs)` is called to bind arguments that don't fit
+    the parameters, so that the TypeError raised is the same as
+    getcallargs() gives. Should it bind them after all, its callargs
+    dict is used.
+    """
+
+    __slots__ = (
+        "code",
+        "defaults",
+        "kwdefaults",
+        "fallback",
+        "argcount",
+        "min_args",
+        "kwonly",
+        "varargs_index",
+        "varkw_index",
+        "positions",
+        "nlocals",
+    )
+
+    def __init__(self, code, defaults: tuple, kwdefaults, fallback) -> None:
+        self.code = code
+        self.defaults = defaults
+        self.kwdefaults = kwdefaults
+        self.fallback = fallback
+
+        varnames = code.co_varnames
+        argcount = code.co_argcount
+        kwonlycount = getattr(code, "co_kwonlyargcount", 0)
+        posonlycount = getattr(code, "co_posonlyargcount", 0)
+        self.argcount = argcount
+        self.min_args = argcount - len(defaults)
+        self.nlocals = len(varnames)
+
+        # The index and name of each keyword-only parameter.
+        self.kwonly = tuple(
+            (i, varnames[i]) for i in range(argcount, argcount + kwonlycount)
+        )
+
+        index = argcount + kwonlycount
+        self.varargs_index = self.varkw_index = None
+        if code.co_flags & CO_VARARGS:
+            self.varargs_index = index
+            index += 1
+        if code.co_flags & CO_VARKEYWORDS:
+            self.varkw_index = index
+
+        # The parameters which can be passed by keyword.
+        self.positions = {
+            varnames[i]: i for i in range(posonlycount, argcount + kwonlycount)
+        }
+
+    def matches(self, code, defaults: tuple, kwdefaults) -> bool:
+        """Is this the binder for `code`, `defaults` and `kwdefaults`?"""
+        return (
+            self.code is code
+            and self.defaults is defaults
+            and self.kwdefaults is kwdefaults
+        )
+
+    def bind(self, args: tuple, kwargs: dict) -> list:
+        """Return the fast locals of a frame for a call with positional
+        arguments `args` and keyword arguments `kwargs`."""
+        argcount = self.argcount
+        given = len(args)
+        if given > argcount and self.varargs_index is None:
+            return self.bind_fallback(args, kwargs)
+
+        fast_locals = [UNBOUND] * self.nlocals
+        if given > argcount:
+            fast_locals[:argcount] = args[:argcount]
+            fast_locals[self.varargs_index] = tuple(args[argcount:])
+        else:
+            fast_locals[:given] = args
+            if self.varargs_index is not None:
+                fast_locals[self.varargs_index] = ()
+
+        if self.varkw_index is not None:
+            extra = fast_locals[self.varkw_index] = {}
+        else:
+            extra = None
+        if kwargs:
+            positions = self.positions
+            for name, value in kwargs.items():
+                i = positions.get(name)
+                if i is None:
+                    if extra is None:
+                        return self.bind_fallback(args, kwargs)
+                    extra[name] = value
+                elif fast_locals[i] is UNBOUND:
+                    fast_locals[i] = value
+                else:
+                    return self.bind_fallback(args, kwargs)
+
+        if given < argcount:
+            min_args = self.min_args
+            defaults = self.defaults
+            for i in range(given, argcount):
+                if fast_locals[i] is UNBOUND:
+                    if i < min_args:
+                        return self.bind_fallback(args, kwargs)
+                    fast_locals[i] = defaults[i - min_args]
+
+        if self.kwonly:
+            kwdefaults = self.kwdefaults or {}
+            for i, name in self.kwonly:
+                if fast_locals[i] is UNBOUND:
+                    if name not in kwdefaults:
+                        return self.bind_fallback(args, kwargs)
+                    fast_locals[i] = kwdefaults[name]
+        return fast_locals
+
+    def bind_fallback(self, args: tuple, kwargs: dict) -> list:
+        """Bind arguments that don't fit the parameters, which usually
+        raises a TypeError."""
+        callargs = self.fallback(args, kwargs)
+        return [callargs.get(name, UNBOUND) for name in self.code.co_varnames]
+
+
+class DictLocals:
+    """The fast local variables of a frame which keeps its locals in the
+    dict `f_locals`: code that isn't optimized, like module-level code
+    and class bodies.
+
+    This looks like the list of fast locals of an optimized frame, so
+    LOAD_FAST and friends work the same on either. Local `i` is the
+    entry for `names[i]` in `f_locals`.
+    """
+
+    __slots__ = ("names", "f_locals")
+
+    def __init__(self, names, f_locals) -> None:
+        self.names = names
+        self.f_locals = f_locals
+
+    def __getitem__(self, i: int):
+        return self.f_locals.get(self.names[i], UNBOUND)
+
+    def __setitem__(self, i: int, value) -> None:
+        if value is UNBOUND:
+            self.f_locals.pop(self.names[i], None)
+        else:
+            self.f_locals[self.names[i]] = value
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def find_builtins(f_globals: dict, f_back) -> dict:
+    """Return the builtins of a frame with globals `f_globals`, called from
+    frame `f_back`."""
+    if f_back and f_back.f_globals is f_globals:
+        # If we share the globals, we share the builtins.
+        return f_back.f_builtins
+    try:
+        f_builtins = f_globals["__builtins__"]
+        if hasattr(f_builtins, "__dict__"):
+            f_builtins = f_builtins.__dict__
+        return f_builtins
+    except KeyError:
+        # No builtins! Make up a minimal one with None.
+        return {"None": None}
+
+
 class Frame(object):
+    """A frame running code object `f_code`.
+
+    For optimized code, that is functions, local variables are kept in
+    the list `fast_locals`, indexed like co_varnames, with UNBOUND for
+    those not assigned to. The dict f_locals is only filled in from
+    this when someone asks for it, as locals() or a debugger do. Other
+    code keeps its local variables in the dict f_locals, which
+    `fast_locals` is then a view of.
+    """
+
+    __slots__ = (
+        "f_back",
+        "f_code",
+        "f_globals",
+        "f_builtins",
+        "f_lasti",
+        "f_lineno",
+        "f_trace",
+        "locals_dict",
+        "optimized",
+        "fast_locals",
+        "cells",
+        "localsplusnames",
+        "stack",
+        "block_stack",
+        "generator",
+        "version",
+        "event_flags",
+        "brkpt",
+        "inst_index",
+        "fallthrough",
+        "last_op",
+        "line_table",
+        "call_shape_kwnames",
+        "poolable",
+    )
+
     def __init__(
         self,
         f_code,
@@ -399,12 +751,20 @@ class Frame(object):
         version: tuple[int, ...]=PYTHON_VERSION_TRIPLE,
         closure=None,
         localsplusnames=tuple(),  # 3.11+ only
+        line_table=None,
+        fast_locals=None,
     ) -> None:
         self.f_back = f_back
         self.f_code = f_code
         self.f_globals = f_globals
-        self.f_locals = f_locals
-        self.f_locals = f_locals
+        self.locals_dict = f_locals
+        flags = f_code.co_flags
+        self.optimized = bool(flags & CO_OPTIMIZED and flags & CO_NEWLOCALS)
+        if not self.optimized:
+            fast_locals = DictLocals(f_code.co_varnames, f_locals)
+        elif fast_locals is None:
+            fast_locals = [UNBOUND] * len(f_code.co_varnames)
+        self.fast_locals = fast_locals
         self.f_trace = None
         self.localsplusnames = localsplusnames
         self.stack = []
@@ -415,19 +775,10 @@ class Frame(object):
         # brkpt is a mapping bytecode offset to the opcode value that was
         # smasshed by overwriting it with the pseudo opcode BRKPT.
         # After a breakpoint is serviced, this opcode needs to be run.
-        self.brkpt = {}
+        # It is None until a breakpoint is added.
+        self.brkpt = None
 
-        if f_back and f_back.f_globals is f_globals:
-            # If we share the globals, we share the builtins.
-            self.f_builtins = f_back.f_builtins
-        else:
-            try:
-                self.f_builtins = f_globals["__builtins__"]
-                if hasattr(self.f_builtins, "__dict__"):
-                    self.f_builtins = self.f_builtins.__dict__
-            except KeyError:
-                # No builtins! Make up a minimal one with None.
-                self.f_builtins = {"None": None}
+        self.f_builtins = find_builtins(f_globals, f_back)
 
         self.f_lineno = f_code.co_firstlineno
 
@@ -436,37 +787,7 @@ class Frame(object):
         # and other places which is why we don't set it to the more correct -1.
         self.f_lasti = -1
 
-        if f_code.co_cellvars:
-            self.cells = {}
-            if not f_back.cells:
-                f_back.cells = {}
-            for var in f_code.co_cellvars:
-                # Make a cell for the variable in our locals, or None.
-                cell = Cell(self.f_locals.get(var))
-                f_back.cells[var] = self.cells[var] = cell
-        else:
-            self.cells = None
-
-        if f_code.co_freevars:
-            if not self.cells:
-                self.cells = {}
-            for i, var in enumerate(f_code.co_freevars):
-                if closure:
-                    # print("XXX", f_code.co_freevars[i], closure[i].get())
-                    # if f_code.co_freevars[i] == "c" and  closure[i].get() == 5:
-                    #     from trepan.api import debug; debug()
-                    self.cells[var] = closure[i]
-                else:
-                    # FIXME: this branch is probably wrong.
-                    # Also check all calls of Frame and make_frame() in vm to ensure we
-                    # pass a function's closure attribute.
-                    assert isinstance(f_back.cells[i], Cell), "f_back.cells[%d]: %r" % (
-                        i,
-                        f_back.cells[i],
-                    )
-                    self.cells[var] = f_back.cells[var]
-                pass
-            pass
+        self.cells = self.make_cells(closure)
 
         self.block_stack = []
         self.generator = None
@@ -478,14 +799,70 @@ class Frame(object):
         self.fallthrough = False
         self.last_op = None
 
-        # Keep a cache of line starts for this frame
-        self.line_starts = list(findlinestarts(self.f_code))
+        # The line number table of the code, shared by all frames
+        # running it.
+        if line_table is None:
+            line_table = LineTable(f_code)
+        self.line_table = line_table
 
         # Python 3.11 adds call_shape structure which
-        # has only one item, kwnames.
-        self.call_shape_kwnames = {}
+        # has only one item, kwnames. It is None except between
+        # KW_NAMES and the CALL it is for.
+        self.call_shape_kwnames = None
+
+        # May the frame be reused once it has returned? This is only
+        # set for frames from a FramePool. See xpython.framepool.
+        self.poolable = False
         return
 
+    def make_cells(self, closure):
+        """Return the cells of the frame, or None if it has none.
+
+        Cells are laid out as in CPython: those of the cell variables,
+        followed by those of the free variables."""
+        f_code = self.f_code
+        if not (f_code.co_cellvars or f_code.co_freevars):
+            return None
+        # Make a cell for each cell variable from our locals, or None.
+        cells = [Cell(self.get_local(var)) for var in f_code.co_cellvars]
+        if closure:
+            cells.extend(closure)
+        else:
+            # FIXME: this branch is probably wrong.
+            # Also check all calls of Frame and make_frame() in vm to ensure we
+            # pass a function's closure attribute.
+            cells.extend(self.f_back.get_cell(var) for var in f_code.co_freevars)
+        return cells
+
+    def reset(self, f_globals, f_back, fast_locals: list, closure=None) -> None:
+        """Set up the frame, which has been cleared, to run its code
+        again, as if it were new. `fast_locals` holds the arguments."""
+        self.f_back = f_back
+        self.f_globals = f_globals
+        self.f_builtins = find_builtins(f_globals, f_back)
+        self.fast_locals = fast_locals
+        self.f_lineno = self.f_code.co_firstlineno
+        self.f_lasti = -1
+        self.fallthrough = False
+        self.cells = self.make_cells(closure)
+
+    def clear(self) -> None:
+        """Drop what the frame refers to from its last run, so it can be
+        kept for reuse without keeping those objects alive."""
+        self.f_back = None
+        self.f_globals = self.f_builtins = None
+        self.fast_locals = None
+        self.cells = None
+        self.locals_dict = None
+        self.f_trace = None
+        self.event_flags = None
+        self.brkpt = None
+        self.call_shape_kwnames = None
+        self.last_op = None
+        self.inst_index = -1
+        self.stack.clear()
+        self.block_stack.clear()
+
     def __repr__(self) -> str:  # pragma: no cover
         return "<Frame at 0x%08x: %r:%d @%d>" % (
             id(self),
@@ -494,34 +871,106 @@ class Frame(object):
             self.f_lasti,
         )
 
+    @property
+    def linestarts(self) -> dict:
+        """Maps the offset of each instruction starting a line to its
+        line number."""
+        return self.line_table.linestarts
+
+    @property
+    def f_locals(self) -> dict:
+        """The local variables of the frame, as a dict."""
+        if self.optimized:
+            f_code = self.f_code
+            locals_dict = self.locals_dict
+            if locals_dict is None:
+                locals_dict = self.locals_dict = {"__locals__": {}}
+            for name, value in zip(f_code.co_varnames, self.fast_locals):
+                if value is UNBOUND:
+                    locals_dict.pop(name, None)
+                else:
+                    locals_dict[name] = value
+            if f_code.co_freevars:
+                free_cells = self.cells[len(f_code.co_cellvars) :]
+                for name, cell in zip(f_code.co_freevars, free_cells):
+                    locals_dict[name] = cell.get()
+            return locals_dict
+        return self.locals_dict
+
+    @f_locals.setter
+    def f_locals(self, f_locals: dict) -> None:
+        self.locals_dict = f_locals
+        if not self.optimized:
+            self.fast_locals.f_locals = f_locals
+
+    def get_local(self, name: str, default=None):
+        """Return the value of local variable `name`, or `default` if
+        it has none."""
+        varnames = self.f_code.co_varnames
+        if name in varnames:
+            value = self.fast_locals[varnames.index(name)]
+            return default if value is UNBOUND else value
+        if self.locals_dict is None:
+            return default
+        return self.locals_dict.get(name, default)
+
+    def get_cell(self, name: str):
+        """Return the cell of cell or free variable `name`."""
+        f_code = self.f_code
+        return self.cells[(f_code.co_cellvars + f_code.co_freevars).index(name)]
+
     def line_number(self) -> int:
         """Get the current line number the frame is executing."""
         # We don't keep f_lineno up to date, so calculate it based on the
         # instruction address and the line number table.
-        last_line_number = 0
-        for offset, line_number in self.line_starts:
-            if offset > self.f_lasti:
-                break
-            last_line_number = line_number
-
-        return last_line_number
+        return self.line_table.line_number(self.f_lasti)
 
 
 class Traceback:
+    """A traceback entry for `frame`, made when an exception is raised
+    in it.
+
+    The frame keeps running after the exception is raised, so we note
+    where it was: its f_lasti, f_lineno and f_back. That is all it costs to
+    raise. The snapshot of the frame in tb_frame is only made if
+    someone asks for it.
+    """
+
+    __slots__ = ("tb_next", "tb_lasti", "tb_lineno", "frame", "frame_snapshot")
+
     def __init__(self, frame) -> None:
+        # We keep the frame, so it mustn't be reused.
+        frame.poolable = False
         self.tb_next = frame.f_back
         self.tb_lasti = frame.f_lasti
         self.tb_lineno = frame.f_lineno
-        self.tb_frame = frame
+        self.frame = frame
+        self.frame_snapshot = None
+
+    @property
+    def tb_frame(self):
+        """A copy of the frame as it was when the exception was raised."""
+        if self.frame_snapshot is None:
+            snapshot = copy(self.frame)
+            snapshot.f_lasti = self.tb_lasti
+            snapshot.f_lineno = self.tb_lineno
+            snapshot.f_back = self.tb_next
+            self.frame_snapshot = snapshot
+        return self.frame_snapshot
+
+    def line_number(self) -> int:
+        """The line number the frame was executing when the exception
+        was raised."""
+        return self.frame.line_table.line_number(self.tb_lasti)
 
     # Note: this can be removed when we have our own compatibility traceback.
     def print_tb(self, limit=None, file=stderr) -> None:
         """Like traceback.tb, but is a method."""
         tb = self
         while tb:
-            f = tb.tb_frame
+            f = tb.frame
             filename = f.f_code.co_filename
-            lineno = f.line_number()
+            lineno = tb.line_number()
             print(
                 '  File "%s", line %d, in %s' % (filename, lineno, f.f_code.co_name),
                 file=file,
@@ -535,17 +984,30 @@ class Traceback:
 
 # FIXME: Remove from here and specialize under specific bytecode classses
 def traceback_from_frame(frame):
-    tb = None
-
-    while frame:
-        copy_frame = copy(frame)
-        next_tb = Traceback(copy_frame)
-        tb = next_tb
+    """Return the traceback for an exception raised in `frame`. Like
+    the copying version this replaces, it is the entry of the outermost
+    frame."""
+    if frame is None:
+        return None
+    while frame.f_back:
         frame = frame.f_back
-    return tb
+    return Traceback(frame)
 
 
 class Generator(object):
+    __slots__ = (
+        "gi_frame",
+        "vm",
+        "name",
+        "started",
+        "finished",
+        "gi_running",
+        "running",
+        "gi_code",
+        "__name__",
+        "__qualname__",
+    )
+
     def __init__(self, g_frame, name, qualname, vm) -> None:
         self.gi_frame = g_frame
         self.vm = vm
@@ -0,0 +1,964 @@
+"""Quickening: specializing instructions to what they see when run.
+
+CPython 3.11 and later rewrite an instruction that has run a few
+times into a form specialized to the types of its operands, with
+inline caches kept in CACHE entries of co_code. We do the same for
+every bytecode version, keeping everything on the VM side in the
+decoded instructions of xpython.decode instead of in co_code.
+
+Each instruction that has a specializer below gets a Site. The
+Site counts down executions of the generic handler, and when the
+count runs out it asks the specializer for a handler that fits the
+current operands. The specialized handler checks that what it assumes
+still holds and, when it doesn't, hands the instruction back to the
+generic handler with deoptimize(). The Site then waits longer before
+trying again.
+"""
+
+import inspect
+import types
+from typing import Optional
+
+from xdis.opcodes.opcode_3x.opcode_311 import _nb_ops
+
+from xpython.builtins import SPECIAL_BUILTINS
+from xpython.pyobj import Function, Method
+
+# Number of times an instruction runs before we try to specialize it.
+QUICKEN_THRESHOLD = 8
+
+# Number of times an instruction runs before we try to specialize it
+# again, after specializing failed or had to be undone.
+QUICKEN_BACKOFF = 64
+
+# Used by FOR_ITER specializations to spot when an iterator runs out.
+_EXHAUSTED = object()
+
+# Marks a class attribute that isn't there. See class_attribute().
+_MISSING = object()
+
+# Iterators over builtin containers. Getting the next item of these never
+# runs interpreted code.
+BUILTIN_ITERATOR_TYPES = frozenset(
+    type(iter(container))
+    for container in (
+        [],
+        (),
+        "",
+        b"",
+        bytearray(),
+        range(0),
+        range(1 << 64),
+        set(),
+        {},
+        {}.values(),
+        {}.items(),
+    )
+)
+
+# Names through which code can get at a globals or builtins dictionary
+# and add or delete names in it other than by STORE_NAME, STORE_GLOBAL
+# and the other instructions which tell the VM. See watch_names().
+NAMES_ESCAPE_NAMES = frozenset(
+    [
+        "__dict__",
+        "__globals__",
+        "__main__",
+        "delattr",
+        "f_builtins",
+        "f_globals",
+        "func_globals",
+        "globals",
+        "locals",
+        "modules",
+        "setattr",
+        "vars",
+    ]
+)
+
+
+def watch_names(vm, code) -> None:
+    """Stop trusting PyVM.names_version if `code`, which is about to be
+    run, might add or delete global or builtin names behind the VM's
+    back."""
+    if vm.names_version is not None and not NAMES_ESCAPE_NAMES.isdisjoint(
+        code.co_names
+    ):
+        vm.names_version = None
+
+
+class Site:
+    """Quickening state of instruction `inst`, whose generic
+    handler is `generic`."""
+
+    __slots__ = ("vm", "inst", "generic", "specializer", "countdown")
+
+    def __init__(self, vm, inst, specializer) -> None:
+        self.vm = vm
+        self.inst = inst
+        self.generic = inst.handler
+        self.specializer = specializer
+        self.countdown = QUICKEN_THRESHOLD
+
+    def adaptive(self, *arguments):
+        """The handler for the instruction while it is not specialized."""
+        self.countdown -= 1
+        if self.countdown <= 0:
+            specialized = self.specializer(self, *arguments)
+            if specialized is None:
+                self.countdown = QUICKEN_BACKOFF
+            else:
+                self.inst.handler = specialized
+                return specialized(*arguments)
+        return self.generic(*arguments)
+
+    def deoptimize(self, *arguments):
+        """Go back to running the generic handler for the instruction, and
+        run it."""
+        self.inst.handler = self.adaptive
+        self.countdown = QUICKEN_BACKOFF
+        # Specialized handlers may be passed defaults, such as
+        # push_null, which the generic handler of older versions
+        # doesn't take.
+        return self.generic(*arguments[: len(self.inst.arguments)])
+
+
+def quicken(vm, instructions: list) -> None:
+    """Set up quickening for the instructions in `instructions`
+    which have a specializer."""
+    seen = set()
+    for inst in instructions:
+        if inst is None or inst in seen:
+            continue
+        seen.add(inst)
+        if hasattr(inst, "first"):
+            # A superinstruction; quicken its parts.
+            parts = (inst.first, inst.second)
+        else:
+            parts = (inst,)
+        for part in parts:
+            specializer = SPECIALIZERS.get(part.opname)
+            if specializer is not None and part.handler is not None:
+                if part.opname == "BINARY_OP" and part.int_arg not in NB_OPS:
+                    continue
+                part.handler = Site(vm, part, specializer).adaptive
+
+
+def names_namespace(frame, name: str):
+    """Return the dictionary LOAD_GLOBAL finds `name` in when run in
+    `frame`: its globals or its builtins. Return None if neither has
+    it."""
+    if name in frame.f_globals:
+        return frame.f_globals
+    if name in frame.f_builtins:
+        return frame.f_builtins
+    return None
+
+
+def specialize_load_global(site, name, push_null=False, module_code=False):
+    """LOAD_GLOBAL_CACHED: the name is looked up only in the
+    dictionary, globals or builtins, it was found in last time.
+
+    Where a name is found only changes when a name is added to or
+    deleted from the globals or the builtins, and the VM counts those
+    changes in PyVM.names_version. While that hasn't changed, we look
+    only in the dictionary the name was found in last time. Frames
+    sharing globals share builtins, see find_builtins(), so checking
+    the globals is enough.
+
+    `module_code` is set for LOAD_NAME, which works the same when the
+    locals are the globals."""
+    vm = site.vm
+    if vm.names_version is None:
+        return specialize_load_global_guarded(site, name, push_null)
+
+    frame = vm.frame
+    f_globals = frame.f_globals
+    namespace = names_namespace(frame, name)
+    if namespace is None:
+        return None
+    version = vm.names_version
+    if push_null:
+        from xpython.byteop.byteop37 import NULL
+    else:
+        NULL = None
+
+    def LOAD_GLOBAL_CACHED(name, push_null=False):
+        nonlocal namespace, version
+        frame = vm.frame
+        if frame.f_globals is not f_globals or (
+            module_code and frame.f_locals is not f_globals
+        ):
+            return site.deoptimize(name, push_null)
+        if vm.names_version != version:
+            # Some name was added or deleted; see where this one is now.
+            namespace = names_namespace(frame, name)
+            if namespace is None or vm.names_version is None:
+                return site.deoptimize(name, push_null)
+            version = vm.names_version
+        try:
+            value = namespace[name]
+        except KeyError:
+            return site.deoptimize(name, push_null)
+        if push_null:
+            frame.stack.append(NULL)
+        frame.stack.append(value)
+
+    return LOAD_GLOBAL_CACHED
+
+
+def specialize_load_name(site, name):
+    """LOAD_NAME in module code, where the locals are the globals,
+    looks names up as LOAD_GLOBAL does."""
+    frame = site.vm.frame
+    if frame.f_locals is not frame.f_globals or site.vm.names_version is None:
+        return None
+    return specialize_load_global(site, name, module_code=True)
+
+
+def specialize_load_global_guarded(site, name, push_null=False):
+    """LOAD_GLOBAL_MODULE and LOAD_GLOBAL_BUILTIN for when
+    PyVM.names_version can't be trusted: check where the name is
+    found each time."""
+    vm = site.vm
+    frame = vm.frame
+    f_globals, f_builtins = frame.f_globals, frame.f_builtins
+    if push_null:
+        from xpython.byteop.byteop37 import NULL
+    else:
+        NULL = None
+
+    if name in f_globals:
+
+        def LOAD_GLOBAL_MODULE(name, push_null=False):
+            frame = vm.frame
+            if frame.f_globals is not f_globals or name not in f_globals:
+                return site.deoptimize(name, push_null)
+            if push_null:
+                frame.stack.append(NULL)
+            frame.stack.append(f_globals[name])
+
+        return LOAD_GLOBAL_MODULE
+
+    elif name in f_builtins:
+
+        def LOAD_GLOBAL_BUILTIN(name, push_null=False):
+            frame = vm.frame
+            if (
+                frame.f_globals is not f_globals
+                or frame.f_builtins is not f_builtins
+                or name in f_globals
+                or name not in f_builtins
+            ):
+                return site.deoptimize(name, push_null)
+            if push_null:
+                frame.stack.append(NULL)
+            frame.stack.append(f_builtins[name])
+
+        return LOAD_GLOBAL_BUILTIN
+
+    return None
+
+
+def class_attribute(cls, name: str):
+    """Return the attribute `name` of class `cls` as found in the
+    __dict__ of the first class in its MRO which has it, without
+    running any descriptor, or _MISSING if there is none."""
+    for klass in cls.__mro__:
+        attribute = klass.__dict__.get(name, _MISSING)
+        if attribute is not _MISSING:
+            return attribute
+    return _MISSING
+
+
+def plain_instances(cls) -> bool:
+    """Return True if instances of `cls` get and set attributes the
+    usual way: with object's __getattribute__ and __setattr__, and the
+    usual __dict__ if they have one."""
+    return (
+        cls.__getattribute__ is object.__getattribute__
+        and cls.__setattr__ is object.__setattr__
+        and not issubclass(cls, types.ModuleType)
+        and (
+            not cls.__dictoffset__
+            or type(class_attribute(cls, "__dict__")) is types.GetSetDescriptorType
+        )
+    )
+
+
+def attribute_kind(cls, name: str) -> tuple:
+    """Return how getattr() gets attribute `name` of an instance of
+    `cls`, and what from:
+
+    * "method" and the interpreted Function in the class, which is
+      bound to the instance unless the instance has its own `name`,
+    * "property" and the interpreted Function which is its getter, or
+    * "value" and None, for anything else, which we leave to getattr().
+    """
+    if plain_instances(cls):
+        attribute = class_attribute(cls, name)
+        if type(attribute) is Function:
+            return "method", attribute
+        if (
+            type(attribute) is property
+            and type(attribute.fget) is Function
+            and class_attribute(cls, "__getattr__") is _MISSING
+        ):
+            return "property", attribute.fget
+    return "value", None
+
+
+def stores_to_dict(cls, name: str) -> bool:
+    """Return True if setting attribute `name` of an instance of `cls`
+    just sets it in the instance's __dict__."""
+    if not cls.__dictoffset__ or not plain_instances(cls):
+        return False
+    kind = type(class_attribute(cls, name))
+    return not (hasattr(kind, "__set__") or hasattr(kind, "__delete__"))
+
+
+def lookup_guard(cls, name: str):
+    """Return a function of no arguments which returns True while
+    instances of `cls` still get and set attribute `name` as they do
+    now: `cls` has the same MRO, it still gets and sets attributes the
+    usual way (see plain_instances()), and looking `name` up in the
+    __dict__ of each class of its MRO finds the same thing.
+
+    It looks at the classes themselves rather than at what the VM has
+    seen happen to them, so it notices changes however they are made,
+    even by host Python code."""
+    mro = cls.__mro__
+    found = class_attribute(cls, name)
+    if found is _MISSING:
+        shadows, owner = mro, None
+    else:
+        i = next(i for i, klass in enumerate(mro) if name in klass.__dict__)
+        # The classes before the one `name` is found in mustn't get one.
+        shadows, owner = mro[:i], mro[i]
+    getattribute = object.__getattribute__
+    setattribute = object.__setattr__
+
+    def unchanged() -> bool:
+        if (
+            cls.__mro__ is not mro
+            or cls.__getattribute__ is not getattribute
+            or cls.__setattr__ is not setattribute
+        ):
+            return False
+        for klass in shadows:
+            if name in klass.__dict__:
+                return False
+        return owner is None or owner.__dict__.get(name, _MISSING) is found
+
+    return unchanged
+
+
+def specialize_load_attr(site, name, push_null=False):
+    """LOAD_ATTR_MODULE, LOAD_ATTR_METHOD, LOAD_ATTR_PROPERTY and
+    LOAD_ATTR_INSTANCE_VALUE: the attribute of an object of the same
+    type as before, found the same way as before. See
+    attribute_kind().
+
+    Methods and property getters are taken from here rather than looked
+    up, for as long as lookup_guard() finds the class unchanged.
+    Property getters are called like any other interpreted function,
+    in the eval loop running the instruction."""
+    vm = site.vm
+    cls = type(vm.frame.stack[-1])
+    if cls is types.ModuleType:
+        return None if push_null else specialize_load_attr_module(site)
+
+    if push_null:
+        from xpython.byteop.byteop37 import NULL
+    else:
+        NULL = None
+
+    kind, attribute = attribute_kind(cls, name)
+    if kind == "value":
+
+        def LOAD_ATTR_INSTANCE_VALUE(name, push_null=False):
+            stack = vm.frame.stack
+            obj = stack[-1]
+            if type(obj) is not cls:
+                return site.deoptimize(name, push_null)
+            if push_null:
+                stack[-1] = NULL
+                stack.append(getattr(obj, name))
+            else:
+                stack[-1] = getattr(obj, name)
+
+        return LOAD_ATTR_INSTANCE_VALUE
+
+    unchanged = lookup_guard(cls, name)
+    if kind == "method":
+        has_dict = bool(cls.__dictoffset__)
+
+        def LOAD_ATTR_METHOD(name, push_null=False):
+            stack = vm.frame.stack
+            obj = stack[-1]
+            if type(obj) is not cls or not unchanged():
+                return site.deoptimize(name, push_null)
+            if has_dict and name in obj.__dict__:
+                return site.deoptimize(name, push_null)
+            if push_null:
+                # As LOAD_METHOD does.
+                stack[-1] = attribute
+                stack.append(obj)
+            else:
+                stack[-1] = Method(obj, cls, attribute)
+
+        return LOAD_ATTR_METHOD
+
+    # The getter is only ours to call while there is no __getattr__ to
+    # fall back on.
+    no_getattr = lookup_guard(cls, "__getattr__")
+
+    def LOAD_ATTR_PROPERTY(name, push_null=False):
+        stack = vm.frame.stack
+        obj = stack[-1]
+        if type(obj) is not cls or not unchanged() or not no_getattr():
+            return site.deoptimize(name, push_null)
+        if push_null:
+            stack[-1] = NULL
+        else:
+            del stack[-1]
+        return vm.call_interpreted(attribute, [obj], {})
+
+    return LOAD_ATTR_PROPERTY
+
+
+def specialize_load_attr_module(site):
+    """LOAD_ATTR_MODULE: the attribute of a module, which is an
+    entry of its __dict__."""
+    vm = site.vm
+
+    def LOAD_ATTR_MODULE(name, push_null=False):
+        stack = vm.frame.stack
+        module = stack[-1]
+        if type(module) is not types.ModuleType or name not in module.__dict__:
+            return site.deoptimize(name, push_null)
+        stack[-1] = module.__dict__[name]
+
+    return LOAD_ATTR_MODULE
+
+
+def specialize_load_method(site, name):
+    """LOAD_METHOD_CACHED: LOAD_METHOD finding the same interpreted
+    Function in the class of an object of the same type as before,
+    for as long as lookup_guard() finds the class unchanged."""
+    vm = site.vm
+    if vm.is_pypy:
+        return None
+    from xpython.byteop.byteop37 import find_unbound_method
+
+    obj = vm.frame.stack[-1]
+    cls = type(obj)
+    method = find_unbound_method(obj, name)
+    if method is None or not plain_instances(cls):
+        return None
+    unchanged = lookup_guard(cls, name)
+    has_dict = bool(cls.__dictoffset__)
+
+    def LOAD_METHOD_CACHED(name):
+        stack = vm.frame.stack
+        obj = stack[-1]
+        if type(obj) is not cls or not unchanged():
+            return site.deoptimize(name)
+        if has_dict and name in obj.__dict__:
+            return site.deoptimize(name)
+        stack[-1] = method
+        stack.append(obj)
+
+    return LOAD_METHOD_CACHED
+
+
+def specialize_store_attr(site, name):
+    """STORE_ATTR_INSTANCE_VALUE: setting an attribute of an object of
+    the same type as before, which is set in the object's __dict__.
+    See stores_to_dict()."""
+    vm = site.vm
+    cls = type(vm.frame.stack[-1])
+    if not stores_to_dict(cls, name):
+        return None
+    unchanged = lookup_guard(cls, name)
+
+    def STORE_ATTR_INSTANCE_VALUE(name):
+        stack = vm.frame.stack
+        obj = stack[-1]
+        if type(obj) is not cls or not unchanged():
+            return site.deoptimize(name)
+        obj.__dict__[name] = stack[-2]
+        del stack[-2:]
+
+    return STORE_ATTR_INSTANCE_VALUE
+
+
+# The operations we specialize for operands of the same exact type:
+# each one's Python operator and the types it is specialized for. Their
+# operators never run interpreted code for these types.
+ARITHMETIC_OPERATIONS = {
+    "ADD": ("+", (int, float, str)),
+    "SUBTRACT": ("-", (int, float)),
+    "MULTIPLY": ("*", (int, float)),
+    "TRUE_DIVIDE": ("/", (int, float)),
+    "FLOOR_DIVIDE": ("//", (int, float)),
+    "MODULO": ("%", (int, float)),
+    "POWER": ("**", (int, float)),
+    "LSHIFT": ("<<", (int,)),
+    "RSHIFT": (">>", (int,)),
+    "AND": ("&", (int,)),
+    "OR": ("|", (int,)),
+    "XOR": ("^", (int,)),
+}
+
+# The BINARY_OP operand values we specialize, and the operation each is.
+NB_OPS = {
+    i: name[len("NB_") :].replace("INPLACE_", "")
+    for i, (name, _) in enumerate(_nb_ops)
+    if name[len("NB_") :].replace("INPLACE_", "") in ARITHMETIC_OPERATIONS
+}
+
+# The COMPARE_OP operand values for <, <=, ==, !=, > and >=, and their
+# operators.
+RICH_COMPARISONS = ("<", "<=", "==", "!=", ">", ">=")
+
+# Containers whose "in" test is native. For lists and tuples it may
+# still compare items with an interpreted __eq__, as the generic
+# handler's does.
+BUILTIN_CONTAINER_TYPES = (dict, set, frozenset, str, list, tuple)
+
+
+def make_operator_handlers() -> dict:
+    """Return a function for each operator of ARITHMETIC_OPERATIONS and
+    RICH_COMPARISONS which, given a Site and a type, returns a handler
+    applying the operator inline to TOS1 and TOS when both are of that
+    type. Calling the operator module's function instead would cost a
+    call per instruction."""
+    symbols = {symbol for symbol, _ in ARITHMETIC_OPERATIONS.values()}
+    symbols.update(RICH_COMPARISONS)
+    makers = {}
+    for symbol in symbols:
+        namespace = {}
+        lines = [
+            "def make(site, kind):",
+            "    vm = site.vm",
+            "    def handler(*arguments):",
+            "        stack = vm.frame.stack",
+            "        right = stack[-1]",
+            "        left = stack[-2]",
+            "        if type(left) is not kind or type(right) is not kind:",
+            "            return site.deoptimize(*arguments)",
+            "        del stack[-1]",
+            "        stack[-1] = left %s right" % symbol,
+            "    return handler",
+        ]
+        exec(compile("\n".join(lines), "<%s handler>" % symbol, "exec"), namespace)
+        makers[symbol] = namespace["make"]
+    return makers
+
+
+OPERATOR_HANDLERS = make_operator_handlers()
+
+
+def specialize_binary(site, *arguments):
+    """BINARY_OP_ADD_INT, BINARY_OP_MULTIPLY_FLOAT and so on: the
+    operations of ARITHMETIC_OPERATIONS where both operands are of one of
+    the types listed for it. The in-place forms are the same, since these
+    types are immutable."""
+    vm = site.vm
+    inst = site.inst
+    if inst.opname == "BINARY_OP":
+        operation = NB_OPS[inst.int_arg]
+    else:
+        operation = inst.opname.split("_", 1)[1]
+    symbol, kinds = ARITHMETIC_OPERATIONS[operation]
+
+    stack = vm.frame.stack
+    kind = type(stack[-1])
+    if type(stack[-2]) is not kind or kind not in kinds:
+        return None
+    return OPERATOR_HANDLERS[symbol](site, kind)
+
+
+def specialize_contains(site, invert: bool):
+    """CONTAINS_OP_DICT, CONTAINS_OP_SET and so on, for CONTAINS_OP and
+    for COMPARE_OP before 3.9: "in", or "not in" if `invert`, where TOS
+    is of one of BUILTIN_CONTAINER_TYPES."""
+    vm = site.vm
+    kind = type(vm.frame.stack[-1])
+    if kind not in BUILTIN_CONTAINER_TYPES:
+        return None
+
+    def CONTAINS_OP(*arguments):
+        stack = vm.frame.stack
+        container = stack[-1]
+        if type(container) is not kind:
+            return site.deoptimize(*arguments)
+        del stack[-1]
+        stack[-1] = (stack[-1] in container) is not invert
+
+    return CONTAINS_OP
+
+
+def specialize_is(site, invert: bool):
+    """IS_OP, and COMPARE_OP before 3.9: "is", or "is not" if `invert`.
+    This holds whatever the operands are, so there is no guard."""
+    vm = site.vm
+
+    def IS_OP(*arguments):
+        stack = vm.frame.stack
+        right = stack.pop()
+        stack[-1] = (stack[-1] is right) is not invert
+
+    return IS_OP
+
+
+def specialize_compare_op(site, opname: int):
+    """COMPARE_OP_INT, COMPARE_OP_FLOAT and COMPARE_OP_STR: <, <=, ==,
+    !=, > and >= where both operands are of one of these types. Before
+    3.9, COMPARE_OP also does "in", "not in", "is" and "is not"; see
+    specialize_contains_op() and specialize_is_op()."""
+    vm = site.vm
+    if vm.version >= (3, 12):
+        opname >>= 4
+    if opname in (6, 7):
+        return specialize_contains(site, opname == 7)
+    if opname in (8, 9):
+        return specialize_is(site, opname == 9)
+    if opname > 5:
+        return None
+
+    stack = vm.frame.stack
+    kind = type(stack[-1])
+    if type(stack[-2]) is not kind or kind not in (int, float, str):
+        return None
+    return OPERATOR_HANDLERS[RICH_COMPARISONS[opname]](site, kind)
+
+
+def specialize_contains_op(site, invert: int):
+    """CONTAINS_OP specialized to the type of the container."""
+    return specialize_contains(site, bool(invert))
+
+
+def specialize_is_op(site, invert: int):
+    """IS_OP without going through the VM's stack methods."""
+    return specialize_is(site, bool(invert))
+
+
+def store_targets(vm, inst) -> Optional[tuple]:
+    """If FOR_ITER `inst` is followed by a STORE_FAST, or by an
+    UNPACK_SEQUENCE and a STORE_FAST for each item, return the number of
+    items unpacked (None if there is no UNPACK_SEQUENCE), the numbers of
+    the local variables stored to, in order, and the offset of the
+    instruction after the stores. Otherwise return None."""
+    instructions = vm.decode_code(vm.frame.f_code).instructions
+
+    def following(offset: int):
+        """The instruction at `offset`, stepping over CACHE entries."""
+        while offset < len(instructions):
+            inst = instructions[offset]
+            if inst is None or inst.opname != "CACHE":
+                return inst
+            offset = inst.next_offset
+        return None
+
+    count = None
+    store = following(inst.next_offset)
+    if store is not None and store.opname == "UNPACK_SEQUENCE":
+        count = store.arguments[0]
+        store = following(store.next_offset)
+    var_nums = []
+    for _ in range(count or 1):
+        if store is None or store.opname != "STORE_FAST":
+            return None
+        var_nums.append(store.arguments[0])
+        resume_offset = store.next_offset
+        store = following(resume_offset)
+    return count, tuple(var_nums), resume_offset
+
+
+def inner_builtin_iterator(iterator) -> bool:
+    """Return True if enumerate object `iterator` enumerates an
+    iterator over a builtin container."""
+    return type(iterator.__reduce__()[1][0]) in BUILTIN_ITERATOR_TYPES
+
+
+def specialize_for_iter(site, jump_offset):
+    """FOR_ITER_RANGE, FOR_ITER_LIST, FOR_ITER_DICT_ITEMS and so on:
+    FOR_ITER over an iterator of a builtin container, or an enumerate
+    of one; we can tell it has run out without catching StopIteration.
+
+    When each item is just stored in local variables, with a STORE_FAST
+    or with an UNPACK_SEQUENCE of a tuple of the right length and
+    STORE_FASTs, we store it here and go on after the stores."""
+    vm = site.vm
+    iterator = vm.frame.stack[-1]
+    kind = type(iterator)
+    if kind is enumerate:
+        if not inner_builtin_iterator(iterator):
+            return None
+    elif kind not in BUILTIN_ITERATOR_TYPES:
+        return None
+    # For enumerate, the last iterator we have checked enumerates a
+    # builtin iterator.
+    checked = iterator
+
+    # Up until 3.11 the iterator is popped when it runs out.
+    pop_iterator = vm.version < (3, 12)
+
+    targets = store_targets(vm, site.inst)
+    if targets is None:
+        count = var_nums = resume_offset = None
+    else:
+        count, var_nums, resume_offset = targets
+
+    def FOR_ITER(jump_offset):
+        nonlocal checked
+        frame = vm.frame
+        stack = frame.stack
+        iterator = stack[-1]
+        if type(iterator) is not kind:
+            return site.deoptimize(jump_offset)
+        if iterator is not checked and kind is enumerate:
+            if not inner_builtin_iterator(iterator):
+                return site.deoptimize(jump_offset)
+            checked = iterator
+        value = next(iterator, _EXHAUSTED)
+        if value is _EXHAUSTED:
+            if pop_iterator:
+                del stack[-1]
+            frame.f_lasti = jump_offset
+            frame.fallthrough = False
+        elif var_nums is None:
+            stack.append(value)
+        elif count is None:
+            frame.fast_locals[var_nums[0]] = value
+            frame.f_lasti = resume_offset
+            frame.fallthrough = False
+        elif type(value) is tuple and len(value) == count:
+            fast_locals = frame.fast_locals
+            for var_num, item in zip(var_nums, value):
+                fast_locals[var_num] = item
+            frame.f_lasti = resume_offset
+            frame.fallthrough = False
+        else:
+            # Let UNPACK_SEQUENCE deal with it.
+            stack.append(value)
+
+    return FOR_ITER
+
+
+def specialize_unpack_sequence(site, count):
+    """UNPACK_SEQUENCE_TWO_TUPLE, UNPACK_SEQUENCE_TUPLE and
+    UNPACK_SEQUENCE_LIST: unpacking a tuple or list of exactly the
+    length expected."""
+    vm = site.vm
+    kind = type(vm.frame.stack[-1])
+    if kind not in (tuple, list) or len(vm.frame.stack[-1]) != count:
+        return None
+
+    if kind is tuple and count == 2:
+
+        def UNPACK_SEQUENCE_TWO_TUPLE(count):
+            stack = vm.frame.stack
+            seq = stack[-1]
+            if type(seq) is not tuple or len(seq) != 2:
+                return site.deoptimize(count)
+            stack[-1] = seq[1]
+            stack.append(seq[0])
+
+        return UNPACK_SEQUENCE_TWO_TUPLE
+
+    def UNPACK_SEQUENCE(count):
+        stack = vm.frame.stack
+        seq = stack[-1]
+        if type(seq) is not kind or len(seq) != count:
+            return site.deoptimize(count)
+        stack[-1:] = seq[::-1]
+
+    return UNPACK_SEQUENCE
+
+
+def is_plain_callable(func) -> bool:
+    """Return True if the generic call handlers just call `func` with
+    the arguments given, with no special treatment."""
+    if hasattr(func, "im_func") or id(func) in SPECIAL_BUILTINS:
+        return False
+    return inspect.isbuiltin(func) or inspect.isclass(func)
+
+
+def is_bound_function(func) -> bool:
+    """Is `func` a Method binding an interpreted Function to an instance
+    of its class?"""
+    return (
+        type(func) is Method
+        and type(func.im_func) is Function
+        and func.im_self is not None
+        and isinstance(func.im_self, func.im_class)
+    )
+
+
+def call_guard(func):
+    """Return a function which tells whether a callable is of the same
+    kind as `func`, so that a call of it can take the same path as the
+    call of `func` did, or None if `func` is called in some special way.
+
+    The kinds are: interpreted Functions, bound Methods of interpreted
+    Functions, builtin methods of objects of one type, and particular
+    plain builtin functions and classes.
+    """
+    kind = type(func)
+    if kind is Function:
+
+        def guard(func):
+            return type(func) is Function
+
+    elif kind is Method:
+        if not is_bound_function(func):
+            return None
+        guard = is_bound_function
+
+    elif kind is types.BuiltinMethodType and not isinstance(
+        func.__self__, types.ModuleType
+    ):
+        # A method of a builtin type, such as list.append. A new one
+        # is made each time it is looked up, so we check its type and
+        # name, not its identity.
+        self_type = type(func.__self__)
+        name = func.__name__
+
+        def guard(func):
+            return (
+                type(func) is types.BuiltinMethodType
+                and type(func.__self__) is self_type
+                and func.__name__ == name
+            )
+
+    elif is_plain_callable(func):
+        builtin = func
+
+        def guard(func):
+            return func is builtin
+
+    else:
+        return None
+    return guard
+
+
+def specialize_call(site, argc: int):
+    """CALL_PY, CALL_BOUND_METHOD and CALL_BUILTIN: an inline cache
+    of the kind of callable the call saw last (see call_guard()). While
+    the callable is of that kind, the call goes straight to it, with none
+    of the checks for callables needing special treatment that the
+    generic handlers make.
+
+    3.11+ CALL may have keyword arguments; the other call opcodes must
+    have positional arguments only."""
+    vm = site.vm
+    frame = vm.frame
+    stack = frame.stack
+    opname = site.inst.opname
+    # KW_NAMES has already taken the keyword arguments off the stack.
+    kwnames = frame.call_shape_kwnames
+    nargs = argc - len(kwnames) if kwnames else argc
+    if opname in ("CALL", "CALL_METHOD"):
+        from xpython.byteop.byteop37 import NULL
+
+        # There is a NULL below the callable for calls that are not
+        # method calls.
+        below_callable = stack[-nargs - 2]
+        if type(below_callable) is Function and not vm.is_pypy:
+            return specialize_method_call(site)
+        if below_callable is not NULL:
+            return None
+        below = 2
+    else:
+        # Up until 3.6 the high byte of argc counts keyword arguments.
+        if argc > 255:
+            return None
+        NULL = None
+        below = 1
+    # Only CALL_FUNCTION turns a TypeError into an exception of the
+    # interpreted program itself; see CALL_FUNCTION.
+    catch_type_error = opname == "CALL_FUNCTION"
+
+    guard = call_guard(stack[-nargs - 1])
+    if guard is None:
+        return None
+
+    def CALL(argc):
+        frame = vm.frame
+        stack = frame.stack
+        kwnames = frame.call_shape_kwnames
+        nargs = argc - len(kwnames) if kwnames else argc
+        func = stack[-nargs - 1]
+        if not guard(func) or NULL is not None and stack[-nargs - 2] is not NULL:
+            return site.deoptimize(argc)
+        args = stack[-nargs:] if nargs else []
+        del stack[-nargs - below :]
+        if kwnames:
+            frame.call_shape_kwnames = None
+        else:
+            kwnames = {}
+
+        try:
+            if type(func) is Function:
+                return vm.call_interpreted(func, args, kwnames)
+            if type(func) is Method:
+                return vm.call_interpreted(func.im_func, [func.im_self] + args, kwnames)
+            stack.append(func(*args, **kwnames))
+        except TypeError as exc:
+            if not catch_type_error:
+                raise
+            tb = vm.last_traceback = vm.byteop.traceback_from_frame()
+            vm.last_exception = (TypeError, exc, tb)
+            return "exception"
+
+    return CALL
+
+
+def specialize_method_call(site):
+    """CALL_PY_METHOD: for CALL and CALL_METHOD where LOAD_METHOD
+    found an interpreted Function, and pushed it and self rather than
+    NULL and a bound Method. While that is so, the call goes straight to
+    the Function."""
+    vm = site.vm
+
+    def CALL_PY_METHOD(argc):
+        frame = vm.frame
+        stack = frame.stack
+        kwnames = frame.call_shape_kwnames
+        nargs = argc - len(kwnames) if kwnames else argc
+        method = stack[-nargs - 2]
+        if type(method) is not Function:
+            return site.deoptimize(argc)
+        args = stack[-nargs - 1 :]
+        del stack[-nargs - 2 :]
+        if kwnames:
+            frame.call_shape_kwnames = None
+        else:
+            kwnames = {}
+        return vm.call_interpreted(method, args, kwnames)
+
+    return CALL_PY_METHOD
+
+
+SPECIALIZERS = {
+    "LOAD_GLOBAL": specialize_load_global,
+    "LOAD_NAME": specialize_load_name,
+    "LOAD_ATTR": specialize_load_attr,
+    "LOAD_METHOD": specialize_load_method,
+    "STORE_ATTR": specialize_store_attr,
+    "BINARY_OP": specialize_binary,
+    "COMPARE_OP": specialize_compare_op,
+    "CONTAINS_OP": specialize_contains_op,
+    "IS_OP": specialize_is_op,
+    "FOR_ITER": specialize_for_iter,
+    "UNPACK_SEQUENCE": specialize_unpack_sequence,
+    "CALL": specialize_call,
+    "CALL_FUNCTION": specialize_call,
+    "CALL_METHOD": specialize_call,
+}
+for operation in ARITHMETIC_OPERATIONS:
+    SPECIALIZERS["BINARY_" + operation] = specialize_binary
+    SPECIALIZERS["INPLACE_" + operation] = specialize_binary
@@ -6,25 +6,33 @@ import linecache
 import logging
 import os
 import sys
-from types import TracebackType
+from types import MethodType, TracebackType
 from typing import Any, List
 
 from xdis import (
     CO_NEWLOCALS,
+    CO_OPTIMIZED,
     PYTHON_IMPLEMENTATION,
     PYTHON_VERSION_TRIPLE,
     code2num,
     next_offset,
     op_has_argument,
 )
-from xdis.bytecode import parse_exception_table
-from xdis.cross_types import UnicodeForPython3
 from xdis.op_imports import get_opcode_module
-from xdis.opcodes.opcode_3x.opcode_311 import _nb_ops
 from xdis.version_info import PythonImplementation
 
 from xpython.byteop import get_byteop
-from xpython.pyobj import Block, Frame, Traceback, traceback_from_frame
+from xpython.decode import DecodedCode, cell_names, decode_argument
+from xpython.framepool import FRAME_POOL_CODES, FRAME_POOL_SIZE, FramePool
+from xpython.loops import count_loop
+from xpython.pyobj import (
+    CO_GENERATOR_FLAGS,
+    UNBOUND,
+    Block,
+    Frame,
+    Traceback,
+    traceback_from_frame,
+)
 
 log = logging.getLogger(__name__)
 
@@ -120,6 +128,12 @@ def format_instruction(
         if vm.version >= (3, 12):
             int_arg >>= 4
         argrepr = opc.cmp_op[int_arg]
+    elif byte_code in opc.LOCAL_OPS and code is not None:
+        # The handlers of these take the index of the local variable.
+        argrepr = code.co_varnames[int_arg]
+    elif byte_code in opc.FREE_OPS and code is not None:
+        # Likewise, these take the index of the cell.
+        argrepr = cell_names(code)[arguments[0]]
     elif isinstance(arguments, list) and arguments:
         argrepr = arguments[0]
     else:
@@ -143,6 +157,14 @@ class PyVM(object):
         python_implementation=PYTHON_IMPLEMENTATION,
         vmtest_testing=False,
         format_instruction_func=format_instruction,
+        superinstructions=None,
+        quicken=None,
+        compile_threshold=None,
+        trace_loops=None,
+        eval_loop="reference",
+        frame_pool_size=FRAME_POOL_SIZE,
+        frame_pool_codes=FRAME_POOL_CODES,
+        switch_frames=None,
     ):
         # The call stack of frames.
         self.frames: List[Frame] = []
@@ -172,6 +194,65 @@ class PyVM(object):
 
         self.in_exception_processing = False
 
+        # Maps id(code) of the code objects we have run to their
+        # decoded instruction stream. See decode_code().
+        self.decoded_codes = {}
+
+        # Frames of returned function calls, kept for reuse. A size of
+        # 0 turns this off. See xpython.framepool.
+        self.frame_pool = FramePool(frame_pool_size, frame_pool_codes)
+
+        # The options below which are left as None are turned on for
+        # every eval loop but "reference", which runs instructions just
+        # as they are, so that the others have something to be checked
+        # against.
+        optimize = eval_loop != "reference"
+
+        # Run calls of interpreted functions in the eval loop making
+        # them, rather than in a new eval loop? See call_interpreted().
+        self.switch_frames = optimize if switch_frames is None else switch_frames
+
+        # Run common pairs of instructions as a single superinstruction?
+        # See xpython.decode.SUPERINSTRUCTIONS.
+        self.superinstructions = (
+            optimize if superinstructions is None else superinstructions
+        )
+
+        # Replace instructions by versions specialized to the types
+        # they see, once they have run a few times? See xpython.quicken.
+        self.quicken = optimize if quicken is None else quicken
+
+        # Counts the names added to or deleted from globals and builtins
+        # dictionaries by the code we run, so that quickened LOAD_GLOBAL
+        # and LOAD_NAME can remember which dictionary a name is in. None
+        # once code we can't follow might do that; see
+        # xpython.quicken.watch_names().
+        self.names_version = 0
+
+        # If not None, interpreted functions called this many times are
+        # compiled to host Python functions when possible. See
+        # xpython.compiler.
+        self.compile_threshold = compile_threshold
+
+        # Record and compile the instructions run by loops that go around
+        # often? See xpython.loops.
+        self.trace_loops = optimize if trace_loops is None else trace_loops
+
+        # The eval loop to run frames with. See EVAL_LOOPS.
+        if eval_loop not in EVAL_LOOPS:
+            raise PyVMError(
+                f"Unknown eval loop {eval_loop!r}; "
+                f"expecting one of: {', '.join(sorted(EVAL_LOOPS))}"
+            )
+        vm_class, loop = EVAL_LOOPS[eval_loop]
+        if not isinstance(self, vm_class):
+            raise PyVMError(
+                f"The {eval_loop!r} eval loop needs a {vm_class.__name__}"
+            )
+        self.eval_loop = eval_loop
+        if loop is not vm_class.eval_frame:
+            self.eval_frame = MethodType(loop, self)
+
         # This is somewhat hokey:
         # Give byteop routines a way to raise an error, without having
         # to import this file. We import from from byteops.
@@ -182,29 +263,28 @@ class PyVM(object):
         self.opc = get_opcode_module(python_version, python_implementation)
         self.byteop = get_byteop(self, python_version, python_implementation)
 
-    def exception_handling_311(self):
+    def exception_handling_311(self) -> bool:
         """In Python 3.11 exception handling blocks are handled off
         of a code co_exceptiontable.
 
-        Here, we find the exception block associated with a code offset,
-        determined by the frame's f_lasti, push the exception block,
-        and note we are in exception processing
-
+        Here, we look up the handler for the frame's f_lasti in the
+        code's exception table. If there is one, we trim the stack to
+        the depth the handler expects, push the exception, note we are in
+        exception processing, and jump to the handler. Return True if a
+        handler was found.
         """
         frame = self.frame
-        lasti = frame.f_lasti
-        encoded_exception_table = frame.f_code.co_exceptiontable
-        exception_entries = parse_exception_table(encoded_exception_table)
-        for exception_entry in exception_entries:
-            if exception_entry.start <= lasti <= exception_entry.end:
-                self.push_block(
-                    "setup-except311",
-                    exception_entry.target,
-                    exception_entry.depth,
-                )
-                self.in_exception_processing = True
-                break
-        return
+        entry = self.decode_code(frame.f_code).exception_handler(frame.f_lasti)
+        if entry is None:
+            return False
+
+        del frame.stack[entry.depth :]
+        # FIXME: Is this right?
+        self.push1(self.last_exception)
+        self.push_block("except-handler")
+        self.jump(entry.target)
+        self.in_exception_processing = True
+        return True
 
     ##############################################
     # Frame operations. First the frame stack....
@@ -228,6 +308,11 @@ class PyVM(object):
         except Exception:
             return 0
 
+    def peek_n(self, n: int):
+        """Return the `n`th value from the top of the stack, 1 being TOS.
+        Unlike peek(), `n` isn't checked."""
+        return self.frame.stack[-n]
+
     def pop(self, i=0):
         """Pop a value from the stack.
 
@@ -237,6 +322,23 @@ class PyVM(object):
         """
         return self.frame.stack.pop(-1 - i)
 
+    def pop1(self):
+        """Pop and return TOS."""
+        return self.frame.stack.pop()
+
+    def pop2(self) -> tuple:
+        """Pop TOS1 and TOS, returning them in that order."""
+        stack = self.frame.stack
+        tos = stack.pop()
+        return stack.pop(), tos
+
+    def pop3(self) -> tuple:
+        """Pop TOS2, TOS1 and TOS, returning them in that order."""
+        stack = self.frame.stack
+        tos = stack.pop()
+        tos1 = stack.pop()
+        return stack.pop(), tos1, tos
+
     def popn(self, n):
         """Pop a number of values from the value stack.
 
@@ -244,25 +346,21 @@ class PyVM(object):
 
         """
         if n:
-            ret = self.frame.stack[-n:]
-            self.frame.stack[-n:] = []
+            stack = self.frame.stack
+            ret = stack[-n:]
+            del stack[-n:]
             return ret
         else:
             return []
 
     def push(self, *vals):
-        """Push values onto the value stack."""
-        new_size = len(self.frame.stack) + len(vals)
-
-        if XPYTHON_STACKCHECK:
-            if new_size > self.frame.f_code.co_stacksize:
-                print(
-                    f"***Warning: exceeding declared max stacksize; have {new_size}, "
-                    f"max size: {self.f_code.co_stacksize}"
-                )
-
+        """Push values onto the value stack. Use push1() for a single value."""
         self.frame.stack.extend(vals)
 
+    def push1(self, val):
+        """Push `val` onto the value stack."""
+        self.frame.stack.append(val)
+
     def set(self, i: int, value):
         """Set a value at stack position i from the TOS.
         1 sets TOS, 2 sets TOS2, etc.
@@ -317,19 +415,36 @@ class PyVM(object):
         self.frame.f_lasti += delta
         self.frame.fallthrough = False
 
+    def names_changed(self) -> None:
+        """Note that a name was added to or deleted from a globals,
+        builtins or module dictionary. See names_version."""
+        if self.names_version is not None:
+            self.names_version += 1
+
     def make_frame(
-        self, code, callargs={}, f_globals=None, f_locals=None, closure=None
+        self,
+        code,
+        callargs={},
+        f_globals=None,
+        f_locals=None,
+        closure=None,
+        fast_locals=None,
     ):
+        """Return a new frame for running `code`. The arguments of the
+        call are given either by name in `callargs`, or, for optimized
+        code, already bound to the frame's fast locals in `fast_locals`;
+        see ArgBinder."""
         # The callargs default is safe because we never modify the dict.
         # pylint: disable=dangerous-default-value
 
-        log.debug(
-            "make_frame: code=%r, callargs=%s, f_globals=%r, f_locals=%r",
-            code,
-            repr(callargs),
-            (type(f_globals), id(f_globals)),
-            (type(f_locals), id(f_locals)),
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "make_frame: code=%r, callargs=%s, f_globals=%r, f_locals=%r",
+                code,
+                repr(callargs),
+                (type(f_globals), id(f_globals)),
+                (type(f_locals), id(f_locals)),
+            )
         if f_globals is not None:
             f_globals = f_globals
             if f_locals is None:
@@ -348,21 +463,30 @@ class PyVM(object):
             }
 
         # Implement NEWLOCALS flag. See Objects/frameobject.c in CPython.
+        poolable = False
         if code.co_flags & CO_NEWLOCALS:
-            f_locals = {"__locals__": {}}
-
-        f_locals.update(callargs)
-
-        # create a localsplusnames table that resolves duplicates.
-        varnames = code.co_varnames
-        cells = code.co_cellvars
-        freevars = code.co_freevars
-        localsplusnames = (varnames or tuple()) + tuple(
-            name for name in (freevars or tuple()) if name not in varnames
-            ) + tuple(
-            name for name in (cells or tuple()) if name not in varnames
-            )
+            if code.co_flags & CO_OPTIMIZED:
+                # The arguments go in the frame's fast locals, and the
+                # f_locals dict is made only if asked for; see Frame.
+                if fast_locals is None:
+                    fast_locals = [
+                        callargs.get(name, UNBOUND) for name in code.co_varnames
+                    ]
+                f_locals = None
+                if not code.co_flags & CO_GENERATOR_FLAGS:
+                    poolable = True
+                    frame = self.frame_pool.acquire(code)
+                    if frame is not None:
+                        frame.reset(f_globals, self.frame, fast_locals, closure)
+                        frame.poolable = True
+                        return frame
+            else:
+                f_locals = {"__locals__": {}}
+                f_locals.update(callargs)
+        else:
+            f_locals.update(callargs)
 
+        decoded = self.decode_code(code)
         frame = Frame(
             f_code=code,
             f_globals=f_globals,
@@ -370,13 +494,14 @@ class PyVM(object):
             f_back=self.frame,
             version=self.version,
             closure=closure,
-            localsplusnames=localsplusnames,
+            localsplusnames=decoded.localsplusnames,
+            line_table=decoded.line_table,
+            fast_locals=fast_locals,
         )
+        frame.poolable = poolable
 
-        # THINK ABOUT: should this go into making the frame?
-        frame.linestarts = dict(self.opc.findlinestarts(code, dup_lines=True))
-
-        log.debug("%r", frame)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%r", frame)
         return frame
 
     def push_frame(self, frame):
@@ -384,7 +509,10 @@ class PyVM(object):
         self.frame = frame
 
     def pop_frame(self):
-        self.frames.pop()
+        frame = self.frames.pop()
+        if frame.poolable and frame.generator is None:
+            # Nothing else refers to the frame now; keep it for reuse.
+            self.frame_pool.release(frame)
         if self.frames:
             self.frame = self.frames[-1]
         else:
@@ -421,6 +549,70 @@ class PyVM(object):
         frame.f_back = None
         return val
 
+    def call_interpreted(self, func, args, kwargs: dict):
+        """Call interpreted Function `func` with `args` and `kwargs` for
+        an instruction handler, which returns what this returns.
+
+        If switch_frames is set, the frame for the call is pushed and
+        "call" returned. The eval loop then runs that frame itself, and
+        pushes its return value when it returns, rather than a new eval
+        loop being started for it. Guest calls then don't use up host
+        stack. Otherwise, `func` is called and its return value pushed.
+        """
+        if self.switch_frames:
+            if len(self.frames) >= sys.getrecursionlimit():
+                raise RecursionError("maximum recursion depth exceeded")
+            frame = func.frame_to_enter(args, kwargs)
+            if frame is not None:
+                if frame.f_lasti == -1:
+                    frame.f_lasti = 0
+                    frame.fallthrough = False
+                self.push_frame(frame)
+                return "call"
+        self.push1(func(*args, **kwargs))
+        return None
+
+    def finish_call(self, next_offset=None):
+        """Run the frame call_interpreted() has just pushed in a new eval
+        loop, push its return value, and go on to the instruction after
+        the call, at `next_offset` if given, as return_to_caller() does.
+        This is for code running instruction handlers which can't switch
+        frames, such as loop traces, when a handler returns "call"."""
+        frame = self.frames.pop()
+        caller = self.frame = self.frames[-1]
+        caller.stack.append(self.eval_frame(frame))
+        if next_offset is None:
+            next_offset = self.call_instruction().next_offset
+        caller.f_lasti = next_offset
+        caller.fallthrough = False
+        return None
+
+    def return_to_caller(self, why) -> tuple:
+        """Finish the current frame, which an eval loop entered in place
+        (see call_interpreted()) and which stopped with `why`. The loop
+        carries on in the calling frame as it would have after running
+        the call instruction: the frame's return value is pushed and we
+        go on to the next instruction, or the call fails with an
+        exception. Return the call instruction and its `why`."""
+        try:
+            value = self.finish_frame(why)
+        except Exception:
+            inst = self.call_instruction()
+            return inst, self.instruction_failed(inst)
+        self.push1(value)
+        inst = self.call_instruction()
+        frame = self.frame
+        frame.f_lasti = inst.next_offset
+        frame.fallthrough = False
+        return inst, None
+
+    def call_instruction(self):
+        """Return the instruction the current frame is running."""
+        frame = self.frame
+        decoded = self.decode_code(frame.f_code)
+        instructions = decoded.runnable_instructions or decoded.instructions
+        return instructions[frame.f_lasti].part(frame.f_lasti)
+
     ##############################################
     # End Frame operations.
     ##############################################
@@ -481,14 +673,42 @@ class PyVM(object):
             offset = 0
 
         while len(self.frame.stack) > block.level + offset:
-            self.pop()
+            self.pop1()
 
         # Set self.last_exception which will filter its way to
         # sys.last_exception. 3.11+ has a already set this.
         if block.type == "except-handler" and self.version < (3, 11):
-            tb, value, exctype = self.popn(3)
+            tb, value, exctype = self.pop3()
             self.last_exception = exctype, value, tb
 
+    def decode_code(self, code) -> DecodedCode:
+        """Return the decoded instruction stream for `code`, decoding it
+        the first time we see it."""
+        decoded = self.decoded_codes.get(id(code))
+        if decoded is None or decoded.code is not code:
+            decoded = self.decoded_codes[id(code)] = DecodedCode(self, code)
+            if XPYTHON_STACKCHECK:
+                self.check_stack_size(decoded)
+        return decoded
+
+    def check_stack_size(self, decoded: DecodedCode) -> None:
+        """Warn if running `decoded` can take the value stack past the
+        declared stack size of its code. This is checked once, when the
+        code is decoded, rather than on each push, and only when
+        XPYTHON_STACKCHECK is set in the environment."""
+        code = decoded.code
+        depth = decoded.max_stack_depth()
+        if depth is not None and depth > code.co_stacksize:
+            print(
+                f"***Warning: exceeding declared max stacksize in {code.co_name}; "
+                f"have {depth}, max size: {code.co_stacksize}"
+            )
+
+    def invalidate_code(self, code) -> None:
+        """Forget the decoded instruction stream for `code`. This must be
+        called whenever co_code is changed, e.g. by adding a breakpoint."""
+        self.decoded_codes.pop(id(code), None)
+
     def parse_byte_and_args(self, byte_code, replay=False):
         """Parse 1 - 3 bytes of bytecode into
         an instruction and optionally arguments.
@@ -501,7 +721,8 @@ class PyVM(object):
         co_code = f_code.co_code
         extended_arg = 0
 
-        # Note: There is never more than one argument.
+        # Note: There is never more than one argument, except for
+        # 3.11+ LOAD_GLOBAL and 3.12+ LOAD_ATTR.
         # The list size is used to indicate whether an argument
         # exists or not.
         # FIMXE: remove and use int_arg as a indicator of whether
@@ -525,7 +746,6 @@ class PyVM(object):
             bytecode_name = self.opc.opname[byte_code]
 
             arg_offset = offset + 1
-            arg = None
 
             if op_has_argument(byte_code, self.opc):
                 if self.version >= (3, 6):
@@ -550,64 +770,16 @@ class PyVM(object):
                     else:
                         extended_arg = 0
 
-                if byte_code in self.opc.CONST_OPS:
-                    arg = f_code.co_consts[int_arg]
-                    if isinstance(arg, UnicodeForPython3):
-                        arg = str(arg)
-                elif byte_code in self.opc.FREE_OPS:
-                    if self.version >= (3, 11):
-                        arg = f.localsplusnames[int_arg]
-                    else:
-                        if int_arg < len(f_code.co_cellvars):
-                            arg = f_code.co_cellvars[int_arg]
-                        else:
-                            var_idx = int_arg - len(f.f_code.co_cellvars)
-                            arg = f_code.co_freevars[var_idx]
-                elif byte_code in self.opc.NAME_OPS:
-                    if self.version >= (3, 11) and (
-                        bytecode_name == "LOAD_GLOBAL"
-                        or (self.version >= (3, 12) and bytecode_name == "LOAD_ATTR")
-                    ):
-                        namei = f_code.co_names[int_arg >> 1]
-                        push_NULL = bool(int_arg & 1)
-                        arguments = [namei, push_NULL]
-                    else:
-                        arg = f_code.co_names[int_arg]
-                        if isinstance(arg, UnicodeForPython3):
-                            arg = str(arg)
-
-                elif byte_code in self.opc.JREL_OPS:
-                    # Many relative jumps are conditional,
-                    # so setting f.fallthrough is wrong.
-
-                    if self.version >= (3, 10):
-                        if bytecode_name.find("_BACKWARD") > 0 and self.version >= (
-                            3,
-                            11,
-                        ):
-                            int_arg = -int_arg
-                        int_arg += int_arg
-                    arg = arg_offset + int_arg
-                    if bytecode_name == "FOR_ITER" and self.version >= (3, 12):
-                        # 3.12 jumps one more instruction for reasons I can't find
-                        # well documented.
-                        arg += 2
-
-                elif byte_code in self.opc.JABS_OPS:
-                    # We probably could set fallthough, since many (all?)
-                    # of these are unconditional, but we'll make the jump do
-                    # the work of setting.
-                    if self.version >= (3, 10, 0):
-                        int_arg += int_arg
-                    arg = int_arg
-                elif byte_code in self.opc.LOCAL_OPS:
-                    arg = f_code.co_varnames[int_arg]
-                    if isinstance(arg, UnicodeForPython3):
-                        arg = str(arg)
-                else:
-                    arg = int_arg
-                if len(arguments) == 0:
-                    arguments = [arg]
+                int_arg, arguments = decode_argument(
+                    self.opc,
+                    self.version,
+                    f_code,
+                    f.localsplusnames,
+                    byte_code,
+                    bytecode_name,
+                    int_arg,
+                    arg_offset,
+                )
             break
 
         return bytecode_name, byte_code, int_arg, arguments, offset, line_number
@@ -641,44 +813,26 @@ class PyVM(object):
         self.in_exception_processing = False
         byteop = self.byteop
         try:
-            if bytecode_name.startswith("UNARY_"):
-                byteop.unaryOperator(bytecode_name[6:])
-            elif (
-                bytecode_name.startswith("BINARY_") and bytecode_name != "BINARY_SLICE"
-            ):
-                if self.version < (3, 11) or int_arg is None:
-                    byteop.binary_operator(bytecode_name[7:])
-                else:
-                    byteop.binary_operator(_nb_ops[int_arg][0][3:])
-
-            elif bytecode_name.startswith("INPLACE_"):
-                byteop.inplace_operator(bytecode_name[8:])
-            elif "SLICE+" in bytecode_name:
-                self.sliceOperator(bytecode_name)
-            else:
-                # dispatch
-                if hasattr(byteop, bytecode_name):
-                    bytecode_fn = getattr(byteop, bytecode_name, None)
-                else:
-                    bytecode_fn = None
-                if not bytecode_fn:  # pragma: no cover
-                    raise PyVMError(
-                        "Unknown bytecode type: %s\n\t%s"
-                        % (
-                            self.format_instruction(
-                                self.frame,
-                                self.opc,
-                                bytecode_name,
-                                int_arg,
-                                arguments,
-                                offset,
-                                line_number,
-                                False,
-                            ),
+            byte_code = self.opc.opmap.get(bytecode_name)
+            bytecode_fn = None if byte_code is None else byteop.dispatch_table[byte_code]
+            if not bytecode_fn:  # pragma: no cover
+                raise PyVMError(
+                    "Unknown bytecode type: %s\n\t%s"
+                    % (
+                        self.format_instruction(
+                            self.frame,
+                            self.opc,
                             bytecode_name,
-                        )
+                            int_arg,
+                            arguments,
+                            offset,
+                            line_number,
+                            False,
+                        ),
+                        bytecode_name,
                     )
-                why = bytecode_fn(*arguments)
+                )
+            why = bytecode_fn(*arguments)
 
         except Exception:
             # Deal with exceptions encountered while executing the op.
@@ -711,6 +865,74 @@ class PyVM(object):
 
         return why
 
+    def dispatch_instruction(self, inst):
+        """Run decoded instruction `inst`. This is the same as dispatch(),
+        but the method to call and its arguments have already been
+        worked out."""
+
+        why = None
+        self.in_exception_processing = False
+        try:
+            handler = inst.handler
+            if handler is None:  # pragma: no cover
+                raise PyVMError(
+                    "Unknown bytecode type: %s\n\t%s"
+                    % (
+                        self.format_instruction(
+                            self.frame,
+                            self.opc,
+                            inst.opname,
+                            inst.int_arg,
+                            inst.arguments,
+                            inst.offset,
+                            inst.line_number,
+                            False,
+                        ),
+                        inst.opname,
+                    )
+                )
+            why = handler(*inst.arguments)
+
+        except Exception:
+            why = self.instruction_failed(inst)
+
+        return why
+
+    def instruction_failed(self, inst) -> str:
+        """Record the exception raised while running decoded instruction
+        `inst`, and return the `why` for it."""
+        # Deal with exceptions encountered while executing the op.
+        self.last_traceback = self.byteop.traceback_from_frame()
+        self.last_exception = sys.exc_info()
+
+        # Report the part of a superinstruction or loop trace that
+        # failed.
+        inst = inst.part(self.frame.f_lasti)
+
+        # FIXME: dry code
+        if not self.in_exception_processing:
+            if self.last_exception[0] != SystemExit and log.isEnabledFor(logging.INFO):
+                log.info(
+                    (
+                        "exception in the execution of "
+                        "instruction:\n\t%s"
+                        % self.format_instruction(
+                            self.frame,
+                            self.opc,
+                            inst.opname,
+                            inst.int_arg,
+                            inst.arguments,
+                            inst.offset,
+                            inst.line_number,
+                            False,
+                            vm=self,
+                        )
+                    )
+                )
+            self.in_exception_processing = True
+
+        return "exception"
+
     def manage_block_stack(self, why):
         """Manage a frame's block stack.
         Manipulate the block stack and data stack for looping,
@@ -723,9 +945,7 @@ class PyVM(object):
             why = None
             return why
 
-        if not (
-            block.type in ("except-handler", "setup-except311") and why == "silenced"
-        ):
+        if not (block.type == "except-handler" and why == "silenced"):
             self.pop_block()
             self.unwind_block(block)
 
@@ -746,8 +966,8 @@ class PyVM(object):
                     self.push(tb, value, exctype)
                 else:
                     if why in ("return", "continue"):
-                        self.push(self.return_value)
-                    self.push(why)
+                        self.push1(self.return_value)
+                    self.push1(why)
 
                 why = None
                 self.jump(block.handler)
@@ -771,24 +991,10 @@ class PyVM(object):
                 self.push(exc_traceback, exc_value, exc_type)
                 return why
 
-            if why == "exception" and block.type == "setup-except311":
-                # FIXME: Is this right?
-                self.push(self.last_exception)
-                self.push_block("except-handler")
-                why = None
-
-                # Make the raw exception data available to the
-                # handler, so a program can emulate the Python main
-                # loop.
-
-                # PyErr_NormalizeException goes here
-                self.jump(block.handler)
-                return why
-
-            elif block.type == "finally":
+            if block.type == "finally":
                 if why in ("return", "continue"):
-                    self.push(self.return_value)
-                self.push(why)
+                    self.push1(self.return_value)
+                self.push1(why)
 
                 why = None
                 self.jump(block.handler)
@@ -814,78 +1020,225 @@ class PyVM(object):
         This code does includes frame tracing (ftrace) support used in debugging. For that,
         see the corresponding code in vmtrace.py
         """
-        self.f_code = frame.f_code
+        self.f_code = code = frame.f_code
         if frame.f_lasti == -1:
             # We were started new, not yielded back from.
             frame.f_lasti = 0
             # Don't increment before fetching next instruction.
             frame.fallthrough = False
-            byte_code = None
-        else:
-            byte_code = byteint(self.f_code.co_code[frame.f_lasti])
-            # byte_code == opcode["YIELD_VALUE"]?
 
         self.push_frame(frame)
-        offset = 0
+        # Frames of calls made by this frame's code are entered in place
+        # (see call_interpreted()) and run until they return to here.
+        entry_frame = frame
+        decoded = self.decode_code(code)
+        # When logging, we want to see each instruction by itself.
+        logging_instructions = log.isEnabledFor(logging.INFO)
+        if logging_instructions:
+            instructions = decoded.instructions
+            trace_loops = False
+        else:
+            instructions = decoded.runnable()
+            trace_loops = self.trace_loops
+        inst = None
         while True:
-            (
-                bytecode_name,
-                byte_code,
-                int_arg,
-                arguments,
-                offset,
-                line_number,
-            ) = self.parse_byte_and_args(byte_code)
+            # Find the next instruction. Usually this is the one
+            # after the one we just ran; jumps set frame.fallthrough to False
+            # and put the offset to go to in frame.f_lasti.
+            if frame.fallthrough:
+                inst = instructions[frame.f_lasti]
+                if inst is None:
+                    # We are resuming somewhere odd. YIELD_FROM, for
+                    # example, backs f_lasti up.
+                    offset = next_offset(
+                        byteint(code.co_code[frame.f_lasti]), self.opc, frame.f_lasti
+                    )
+                else:
+                    offset = inst.next_offset
+            else:
+                # Jump instructions must set this False.
+                frame.fallthrough = True
+                offset = frame.f_lasti
+            inst = instructions[offset]
+            if inst is None:
+                inst = decoded.decode_at(offset)
+            frame.f_lasti = offset = inst.offset
+            if inst.lineno is not None:
+                frame.f_lineno = inst.lineno
+
+            bytecode_name = inst.opname
+            int_arg = inst.int_arg
+            arguments = inst.arguments
+            line_number = inst.line_number
 
             if log.isEnabledFor(logging.INFO):
                 self.log(bytecode_name, int_arg, arguments, offset, line_number)
 
             # When unwinding the block stack, we need to keep track of why we
             # are doing it.
-            why = self.dispatch(bytecode_name, int_arg, arguments, offset, line_number)
-
-            if why == "exception":
-                # Deal with exceptions encountered while executing the op.
-                # TODO: ceval calls PyTraceBack_Here, not sure what that does.
-
-                if self.version >= (3, 11):
-                    self.exception_handling_311()
-
-                if not self.in_exception_processing:
-                    # FIXME: DRY code
-                    if self.last_exception[0] != SystemExit:
-                        log.info(
-                            (
-                                "exception in the execution of "
-                                "instruction:\n\t%s"
-                                % self.format_instruction(
-                                    frame,
-                                    self.opc,
-                                    bytecode_name,
-                                    int_arg,
-                                    arguments,
-                                    offset,
-                                    line_number,
-                                    False,
-                                )
+            why = self.dispatch_instruction(inst)
+
+            if why is None:
+                if trace_loops and not frame.fallthrough and frame.f_lasti <= offset:
+                    # A backward jump; frame.f_lasti is the head of a loop.
+                    count_loop(self, decoded, instructions, frame.f_lasti)
+                continue
+
+            if why != "call":
+                why = self.unwind(frame, inst, why)
+                if not why:
+                    continue
+                if frame is entry_frame:
+                    break
+                while True:
+                    inst, why = self.return_to_caller(why)
+                    frame = self.frame
+                    if why:
+                        why = self.unwind(frame, inst, why)
+                    if not why or frame is entry_frame:
+                        break
+                if why:
+                    break
+
+            # We have switched to another frame.
+            frame = self.frame
+            self.f_code = code = frame.f_code
+            decoded = self.decode_code(code)
+            if logging_instructions:
+                instructions = decoded.instructions
+            else:
+                instructions = decoded.runnable()
+
+        return self.finish_frame(why)
+
+    def eval_frame_fast(self, frame: Frame):
+        """Run a frame until it returns (somehow), as eval_frame() does,
+        but without logging instructions.
+
+        This is the "fast" eval loop; see EVAL_LOOPS.
+        """
+        self.f_code = frame.f_code
+        if frame.f_lasti == -1:
+            frame.f_lasti = 0
+            frame.fallthrough = False
+
+        self.push_frame(frame)
+        entry_frame = frame
+        decoded = self.decode_code(frame.f_code)
+        instructions = decoded.runnable()
+        trace_loops = self.trace_loops
+        while True:
+            if frame.fallthrough:
+                inst = instructions[frame.f_lasti]
+                if inst is None:
+                    offset = next_offset(
+                        byteint(frame.f_code.co_code[frame.f_lasti]),
+                        self.opc,
+                        frame.f_lasti,
+                    )
+                else:
+                    offset = inst.next_offset
+            else:
+                frame.fallthrough = True
+                offset = frame.f_lasti
+            inst = instructions[offset]
+            if inst is None:
+                inst = decoded.decode_at(offset)
+            frame.f_lasti = offset = inst.offset
+            if inst.lineno is not None:
+                frame.f_lineno = inst.lineno
+
+            self.in_exception_processing = False
+            try:
+                why = inst.handler(*inst.arguments)
+            except Exception:
+                why = self.instruction_failed(inst)
+
+            if why is None:
+                if trace_loops and not frame.fallthrough and frame.f_lasti <= offset:
+                    count_loop(self, decoded, instructions, frame.f_lasti)
+                continue
+
+            if why != "call":
+                why = self.unwind(frame, inst, why)
+                if not why:
+                    continue
+                if frame is entry_frame:
+                    break
+                while True:
+                    inst, why = self.return_to_caller(why)
+                    frame = self.frame
+                    if why:
+                        why = self.unwind(frame, inst, why)
+                    if not why or frame is entry_frame:
+                        break
+                if why:
+                    break
+
+            frame = self.frame
+            self.f_code = frame.f_code
+            decoded = self.decode_code(frame.f_code)
+            instructions = decoded.runnable()
+
+        return self.finish_frame(why)
+
+    def unwind(self, frame: Frame, inst, why):
+        """Deal with instruction `inst` of `frame` having finished with
+        `why` set, and return what the eval loop should do next."""
+        if why == "exception":
+            # Deal with exceptions encountered while executing the op.
+            # TODO: ceval calls PyTraceBack_Here, not sure what that does.
+
+            inst = inst.part(frame.f_lasti)
+            bytecode_name = inst.opname
+            int_arg = inst.int_arg
+            arguments = inst.arguments
+            offset = inst.offset
+            line_number = inst.line_number
+
+            if self.version >= (3, 11) and self.exception_handling_311():
+                # The code's exception table has a handler, which we
+                # run next.
+                return None
+
+            if not self.in_exception_processing:
+                # FIXME: DRY code
+                if self.last_exception[0] != SystemExit and log.isEnabledFor(
+                    logging.INFO
+                ):
+                    log.info(
+                        (
+                            "exception in the execution of "
+                            "instruction:\n\t%s"
+                            % self.format_instruction(
+                                frame,
+                                self.opc,
+                                bytecode_name,
+                                int_arg,
+                                arguments,
+                                offset,
+                                line_number,
+                                False,
                             )
                         )
-                    self.last_traceback = traceback_from_frame(frame)
-                    self.in_exception_processing = True
-
-            elif why == "reraise":
-                why = "exception"
-                if self.version >= (3, 11):
-                    self.exception_handling_311()
+                    )
+                self.last_traceback = traceback_from_frame(frame)
+                self.in_exception_processing = True
 
-            if why != "yield":
-                while why and frame.block_stack:
-                    # Deal with any block management we need to do.
-                    why = self.manage_block_stack(why)
+        elif why == "reraise":
+            if self.version >= (3, 11) and self.exception_handling_311():
+                return None
+            why = "exception"
 
-            if why:
-                break
+        if why != "yield":
+            while why and frame.block_stack:
+                # Deal with any block management we need to do.
+                why = self.manage_block_stack(why)
+        return why
 
+    def finish_frame(self, why):
+        """Pop the frame an eval loop has finished running with `why`,
+        and return its return value or raise its exception."""
         # TODO: handle generator exception state
 
         self.pop_frame()
@@ -911,28 +1264,16 @@ class PyVM(object):
         self.in_exception_processing = False
         return self.return_value
 
-    # Operators
-
-    def sliceOperator(self, op):
-        start = 0
-        end = None  # we will take this to mean end
-        op, count = op[:-2], int(op[-1])
-        if count == 1:
-            start = self.pop()
-        elif count == 2:
-            end = self.pop()
-        elif count == 3:
-            end = self.pop()
-            start = self.pop()
-        slice_len = self.pop()
-        if end is None:
-            end = len(slice_len)
-        if op.startswith("STORE_"):
-            slice_len[start:end] = self.pop()
-        elif op.startswith("DELETE_"):
-            del slice_len[start:end]
-        else:
-            self.push(slice_len[start:end])
+
+# The eval loops a PyVM can run frames with, by name. Each entry is the
+# class of VM the loop needs and the loop itself, which is used as the
+# eval_frame() method of the VM. vmtrace adds "traced". Unless asked
+# for, "reference" runs without the optimizations the others have; see
+# PyVM.__init__().
+EVAL_LOOPS = {
+    "reference": (PyVM, PyVM.eval_frame),
+    "fast": (PyVM, PyVM.eval_frame_fast),
+}
 
 
 if __name__ == "__main__":
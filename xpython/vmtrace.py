@@ -11,7 +11,14 @@ from xdis import IS_PYPY, PYTHON_VERSION_TRIPLE, codeType2Portable
 from xdis.opcodes.base import def_op
 
 from xpython.pyobj import Frame, Traceback, traceback_from_frame
-from xpython.vm import PyVM, PyVMError, PyVMUncaughtException, byteint, format_instruction
+from xpython.vm import (
+    EVAL_LOOPS,
+    PyVM,
+    PyVMError,
+    PyVMUncaughtException,
+    byteint,
+    format_instruction,
+)
 
 log = logging.getLogger(__name__)
 
@@ -89,9 +96,16 @@ class PyVMTraced(PyVM):
             is_pypy,
             vmtest_testing,
             format_instruction_func=format_instruction_func,
+            eval_loop="traced",
+            # Callbacks may hold on to frames after they return.
+            frame_pool_size=0,
+            # The traced eval loop runs each call's frame itself.
+            switch_frames=False,
         )
         self.event_flags = event_flags
         self.callback = callback
+        # Compiled functions can't be traced.
+        self.compile_threshold = None
         # Add a new opcode to allow us high-speed breakpoints
 
         # FIXME: older xdis uses  "self.opc.l" instead of "self.opc.loc"
@@ -99,6 +113,7 @@ class PyVMTraced(PyVM):
             if hasattr(self.opc, "l"):
                 self.opc.loc = self.opc.l
         def_op(self.opc.loc, "BRKPT", BREAKPOINT_OP, 0, 0)
+        self.byteop.dispatch_table[BREAKPOINT_OP] = self.byteop.BRKPT
 
     def add_breakpoint(self, frame: Frame, offset: int) -> None:
         """
@@ -112,10 +127,13 @@ class PyVMTraced(PyVM):
         # Convert its bytecode bytes to a list, update the list and replace this back in
         # the code.
         code = codeType2Portable(frame.f_code, self.version)
+        if frame.brkpt is None:
+            frame.brkpt = {}
         frame.brkpt[offset] = code.co_code[offset]
         bytecode = list(code.co_code)
         bytecode[offset] = BREAKPOINT_OP
         code.co_code = bytes(bytecode)
+        self.invalidate_code(code)
         frame.f_code = code
 
     def remove_breakpoint(self, frame: Frame, offset: int) -> None:
@@ -130,6 +148,7 @@ class PyVMTraced(PyVM):
         bytecode = list(code.co_code)
         bytecode[offset] = frame.brkpt[offset]
         code.co_code = bytes(bytecode)
+        self.invalidate_code(code)
 
     # FIXME: put callback in f_trace, and update it accordingly
     # Interpreter main loop
@@ -215,10 +234,6 @@ class PyVMTraced(PyVM):
             elif result == "return":
                 return self.return_value
 
-        self.frame.linestarts = dict(
-            self.opc.findlinestarts(frame.f_code, dup_lines=True)
-        )
-
         offset = 0
         while True:
             (
@@ -290,18 +305,17 @@ class PyVMTraced(PyVM):
                 # Deal with exceptions encountered while executing the op.
                 # TODO: ceval calls PyTraceBack_Here, not sure what that does.
 
-                if self.version >= (3, 11):
-                    self.exception_handling_311()
+                if self.version >= (3, 11) and self.exception_handling_311():
+                    why = None
 
-                if not self.in_exception_processing:
+                elif not self.in_exception_processing:
                     self.last_traceback = traceback_from_frame(self.frame)
                     self.in_exception_processing = True
 
             elif why == "reraise":
                 why = "exception"
-                if self.version >= (3, 11):
-                    self.exception_handling_311()
-
+                if self.version >= (3, 11) and self.exception_handling_311():
+                    why = None
 
             if why != "yield":
                 while why and frame.block_stack:
@@ -388,6 +402,9 @@ class PyVMTraced(PyVM):
         return self.return_value
 
 
+EVAL_LOOPS["traced"] = (PyVMTraced, PyVMTraced.eval_frame)
+
+
 if __name__ == "__main__":
 
     def sample_callback_hook(